@@ -1,7 +1,14 @@
 import streamlit as st
 import json
+import os
 import time
 
+from analysis_session import AnalysisSession
+from instrumentation import STAGE_TIMINGS
+from knowledge_base import SqliteKnowledgeBase
+from medical_analyzer import DrugInfo, MedicalAnalyzer, analysis_cache_key, build_report
+from result_cache import ResultCache
+
 # Simple page config (avoid complex settings)
 st.set_page_config(
     page_title="AI Medical Prescription Verification",
@@ -9,263 +16,15 @@ st.set_page_config(
     layout="wide"
 )
 
-# Simple classes without complex features
-class DrugInfo:
-    def _init_(self, name, dosage, frequency, route="oral"):
-        self.name = name
-        self.dosage = dosage
-        self.frequency = frequency
-        self.route = route
+@st.cache_resource
+def get_analyzer(kb_path):
+    """One analyzer per process, shared by every session and rerun"""
+    return MedicalAnalyzer(SqliteKnowledgeBase(kb_path) if kb_path else None)
 
-class AnalysisResult:
-    def _init_(self, interactions, recommendations, alternatives, warnings, safety_score):
-        self.interactions = interactions
-        self.recommendations = recommendations
-        self.alternatives = alternatives
-        self.warnings = warnings
-        self.safety_score = safety_score
-
-class MedicalAnalyzer:
-    def _init_(self):
-        # Comprehensive drug interaction database
-        self.interactions_db = {
-            ('aspirin', 'ibuprofen'): {
-                'severity': 'high',
-                'message': 'Increased bleeding risk and GI ulceration - monitor closely',
-                'score_impact': -0.25
-            },
-            ('aspirin', 'warfarin'): {
-                'severity': 'critical',
-                'message': 'Major bleeding risk - requires immediate medical review',
-                'score_impact': -0.4
-            },
-            ('paracetamol', 'ibuprofen'): {
-                'severity': 'low',
-                'message': 'Generally safe combination - monitor for GI irritation',
-                'score_impact': -0.05
-            },
-            ('tramadol', 'codeine'): {
-                'severity': 'high',
-                'message': 'Risk of respiratory depression and oversedation',
-                'score_impact': -0.3
-            },
-            ('omeprazole', 'aspirin'): {
-                'severity': 'beneficial',
-                'message': 'PPI provides gastroprotection with aspirin',
-                'score_impact': 0.1
-            }
-        }
-        
-        # Drug information database
-        self.drug_database = {
-            'paracetamol': {
-                'max_daily_dose': '4000mg',
-                'elderly_caution': True,
-                'pediatric_safe': True,
-                'contraindications': ['severe liver disease'],
-                'monitoring': ['liver function if long-term use']
-            },
-            'ibuprofen': {
-                'max_daily_dose': '2400mg',
-                'elderly_caution': True,
-                'pediatric_safe': True,
-                'contraindications': ['severe heart failure', 'severe kidney disease'],
-                'monitoring': ['kidney function', 'blood pressure']
-            },
-            'aspirin': {
-                'max_daily_dose': '4000mg',
-                'elderly_caution': True,
-                'pediatric_safe': False,
-                'contraindications': ['age < 16 years', 'bleeding disorders'],
-                'monitoring': ['bleeding signs', 'GI symptoms']
-            },
-            'codeine': {
-                'max_daily_dose': '240mg',
-                'elderly_caution': True,
-                'pediatric_safe': False,
-                'contraindications': ['age < 12 years', 'respiratory depression'],
-                'monitoring': ['respiratory rate', 'sedation level']
-            },
-            'tramadol': {
-                'max_daily_dose': '400mg',
-                'elderly_caution': True,
-                'pediatric_safe': False,
-                'contraindications': ['seizure history', 'age < 12 years'],
-                'monitoring': ['seizure risk', 'serotonin syndrome']
-            }
-        }
-    
-    def extract_drugs_from_text(self, text):
-        """Extract drug information from prescription text"""
-        drugs = []
-        text_lower = text.lower()
-        
-        # Simple but effective drug detection patterns
-        drug_keywords = {
-            'paracetamol': ['paracetamol', 'acetaminophen', 'tylenol'],
-            'ibuprofen': ['ibuprofen', 'advil', 'nurofen'],
-            'aspirin': ['aspirin', 'acetylsalicylic acid'],
-            'codeine': ['codeine', 'co-codamol'],
-            'tramadol': ['tramadol'],
-            'omeprazole': ['omeprazole', 'prilosec'],
-            'simvastatin': ['simvastatin', 'zocor']
-        }
-        
-        for standard_name, keywords in drug_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    # Try to extract dosage
-                    dosage = self._extract_dosage_from_text(text_lower, keyword)
-                    frequency = self._extract_frequency_from_text(text_lower, keyword)
-                    
-                    drugs.append(DrugInfo(
-                        name=standard_name.capitalize(),
-                        dosage=dosage,
-                        frequency=frequency,
-                        route='oral'
-                    ))
-                    break  # Only add once per drug
-        
-        return drugs[:5]  # Limit to 5 drugs for safety
-    
-    def _extract_dosage_from_text(self, text, drug_name):
-        """Extract dosage for a specific drug"""
-        # Find text around the drug name
-        import re
-        
-        # Look for patterns like "drug 500mg" or "drug 500 mg"
-        pattern = rf'{drug_name}.?(\d+\.?\d\s*mg)'
-        match = re.search(pattern, text)
-        if match:
-            return match.group(1)
-        
-        # Default dosages for common drugs
-        defaults = {
-            'paracetamol': '500mg',
-            'ibuprofen': '400mg',
-            'aspirin': '75mg',
-            'codeine': '30mg',
-            'tramadol': '50mg',
-            'omeprazole': '20mg'
-        }
-        
-        return defaults.get(drug_name, '500mg')
-    
-    def _extract_frequency_from_text(self, text, drug_name):
-        """Extract frequency for a specific drug"""
-        import re
-        
-        # Look for frequency patterns near the drug
-        frequency_patterns = [
-            (r'once.?daily|1.?daily|daily', 'Once daily'),
-            (r'twice.?daily|2.?daily|bd', 'Twice daily'),
-            (r'three.?times.?daily|3.*?daily|tds', 'Three times daily'),
-            (r'four.?times.?daily|4.*?daily|qds', 'Four times daily'),
-            (r'as.?needed|prn|when.?required', 'As needed')
-        ]
-        
-        for pattern, frequency in frequency_patterns:
-            if re.search(pattern, text):
-                return frequency
-        
-        return 'As prescribed'
-    
-    def analyze_prescription(self, drugs, age):
-        """Comprehensive prescription analysis"""
-        interactions = []
-        warnings = []
-        recommendations = []
-        alternatives = []
-        safety_score = 0.9
-        
-        drug_names = [drug.name.lower() for drug in drugs]
-        
-        # 1. Drug Interaction Analysis
-        for i, drug1_name in enumerate(drug_names):
-            for drug2_name in drug_names[i+1:]:
-                pair = tuple(sorted([drug1_name, drug2_name]))
-                if pair in self.interactions_db:
-                    interaction = self.interactions_db[pair]
-                    interactions.append(
-                        f"⚠ {drug1_name.capitalize()} + {drug2_name.capitalize()}: {interaction['message']}"
-                    )
-                    safety_score += interaction['score_impact']
-        
-        # 2. Age-Specific Analysis
-        if age < 2:
-            warnings.append("👶 Infant: Very limited medication options - specialist consultation required")
-            safety_score -= 0.2
-        elif age < 12:
-            warnings.append("👶 Child: Weight-based dosing required")
-            for drug in drugs:
-                if drug.name.lower() in self.drug_database:
-                    if not self.drug_database[drug.name.lower()]['pediatric_safe']:
-                        warnings.append(f"🚨 {drug.name}: Not recommended for children")
-                        safety_score -= 0.3
-        elif age < 18:
-            warnings.append("👦 Adolescent: Verify age-appropriate formulations")
-            if 'aspirin' in drug_names:
-                warnings.append("🚨 Aspirin: Risk of Reye's syndrome in adolescents")
-                safety_score -= 0.4
-        elif age > 75:
-            warnings.append("👴 Very elderly: High risk for drug sensitivity and interactions")
-            recommendations.append("Consider 25-50% dose reduction for most medications")
-            recommendations.append("Implement frequent monitoring protocols")
-            safety_score -= 0.15
-        elif age > 65:
-            warnings.append("👴 Elderly patient: Increased risk of adverse effects")
-            recommendations.append("Start with lower doses and titrate carefully")
-            recommendations.append("Monitor for falls risk and cognitive effects")
-            safety_score -= 0.1
-        
-        # 3. Drug-Specific Analysis
-        for drug in drugs:
-            drug_name = drug.name.lower()
-            if drug_name in self.drug_database:
-                drug_info = self.drug_database[drug_name]
-                
-                # Age-specific cautions
-                if age > 65 and drug_info['elderly_caution']:
-                    recommendations.append(f"{drug.name}: Consider dose reduction in elderly")
-                
-                # Contraindication checks
-                for contraindication in drug_info['contraindications']:
-                    if 'age' in contraindication and age < 16:
-                        warnings.append(f"🚨 {drug.name}: {contraindication}")
-                
-                # Monitoring requirements
-                for monitor in drug_info['monitoring']:
-                    recommendations.append(f"{drug.name}: Monitor {monitor}")
-        
-        # 4. Generate Alternatives
-        if safety_score < 0.7:
-            alternatives.append("🔄 Consider paracetamol as first-line analgesic")
-            alternatives.append("🔄 Topical NSAIDs for localized pain")
-            alternatives.append("🔄 Non-pharmacological interventions (physiotherapy, heat/cold)")
-        
-        if 'aspirin' in drug_names and age < 18:
-            alternatives.append("🔄 Replace aspirin with paracetamol or ibuprofen")
-        
-        if 'ibuprofen' in drug_names and age > 70:
-            alternatives.append("🔄 Consider topical diclofenac instead of oral ibuprofen")
-        
-        # 5. Ensure minimum content
-        if not interactions:
-            interactions.append("✅ No significant drug interactions detected in current database")
-        
-        if not warnings:
-            warnings.append("ℹ Standard monitoring and precautions apply")
-        
-        if not recommendations:
-            recommendations.append("💊 Current dosages and frequencies appear appropriate")
-        
-        if not alternatives:
-            alternatives.append("✅ Current medication choices are clinically sound")
-        
-        # 6. Ensure safety score bounds
-        safety_score = max(0.1, min(1.0, safety_score))
-        
-        return AnalysisResult(interactions, recommendations, alternatives, warnings, safety_score)
+@st.cache_resource
+def get_result_cache():
+    """Recent analyses shared across sessions, keyed by analysis_cache_key"""
+    return ResultCache(maxsize=1024, ttl=3600.0)
 
 def main():
     # Simple CSS (avoid complex styling that might break)
@@ -283,8 +42,10 @@ def main():
     st.markdown('<h1 class="main-header">💊 AI Medical Prescription Verification</h1>', unsafe_allow_html=True)
     st.markdown("*Advanced Drug Interaction Analysis & Safety Verification System*")
     
-    # Initialize analyzer (avoid session state complexity initially)
-    analyzer = MedicalAnalyzer()
+    # Shared analyzer and result cache (built once, not on every rerun); a
+    # compiled knowledge base is used when PRESCRIPTION_KB points at one
+    analyzer = get_analyzer(os.environ.get("PRESCRIPTION_KB"))
+    result_cache = get_result_cache()
     
     # Create layout
     col1, col2 = st.columns([1, 1])
@@ -299,6 +60,7 @@ def main():
         input_method = st.radio("Input Method:", ["Manual Entry", "Text Analysis"])
         
         current_drugs = []
+        manual_session = None
         
         if input_method == "Text Analysis":
             st.subheader("📄 Prescription Text Analysis")
@@ -348,16 +110,42 @@ def main():
                     route = st.selectbox(f"Route", ["Oral", "Topical", "Injectable", "Inhalation"], key=f"route_{i}")
                 
                 if drug_name:
+                    # Synonyms and misspellings map to the standard name the checks use
+                    standard_name = analyzer.resolve_drug_name(drug_name)
+                    if standard_name is None:
+                        suggestions = analyzer.suggest_drug_names(drug_name)
+                        if suggestions:
+                            st.caption("Did you mean: " + ", ".join(name.capitalize() for name in suggestions) + "?")
+                    else:
+                        if standard_name != drug_name.strip().lower():
+                            st.caption(f"Checked as {standard_name.capitalize()}")
+                        drug_name = standard_name.capitalize()
                     current_drugs.append(DrugInfo(drug_name, dosage, frequency, route))
                 
                 st.markdown("---")
+            
+            # One incremental session per browser session: an edit to one field
+            # only re-checks that medication and its pairs with the others
+            manual_session = st.session_state.get("analysis_session")
+            if manual_session is None or manual_session.analyzer is not analyzer:
+                manual_session = st.session_state["analysis_session"] = AnalysisSession(analyzer, age)
+            manual_session.sync(current_drugs, age)
     
     with col2:
         st.header("🔍 Analysis Results")
         
         if current_drugs and st.button("🚀 Analyze Prescription", type="primary"):
+            clock = STAGE_TIMINGS.clock()
             with st.spinner("Performing comprehensive medical analysis..."):
-                analysis = analyzer.analyze_prescription(current_drugs, age)
+                if manual_session is not None:
+                    analysis = manual_session.result()
+                else:
+                    analysis = result_cache.get_or_compute(
+                        analysis_cache_key(analyzer, current_drugs, age),
+                        lambda: analyzer.analyze_prescription(current_drugs, age)
+                    )
+            if clock:
+                clock.lap('ui.analyze')
             
             # Safety Score Display
             if analysis.safety_score >= 0.8:
@@ -397,18 +185,7 @@ def main():
             st.markdown("---")
             st.subheader("📄 Export Analysis")
             
-            report_data = {
-                "patient_age": age,
-                "medications": [{"name": drug.name, "dosage": drug.dosage, "frequency": drug.frequency, "route": drug.route} for drug in current_drugs],
-                "safety_score": analysis.safety_score,
-                "analysis": {
-                    "interactions": analysis.interactions,
-                    "recommendations": analysis.recommendations,
-                    "warnings": analysis.warnings,
-                    "alternatives": analysis.alternatives
-                },
-                "analysis_timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
+            report_data = build_report(current_drugs, age, analysis)
             
             st.download_button(
                 "📥 Download Analysis Report (JSON)",
@@ -416,6 +193,8 @@ def main():
                 file_name=f"prescription_analysis_{time.strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
+            if clock:
+                clock.lap('ui.render')
         
         elif not current_drugs:
             st.info("👆 Enter prescription details above to begin comprehensive analysis")
@@ -428,7 +207,10 @@ def main():
             with col_demo1:
                 if st.button("✅ Safe Combination"):
                     demo_drugs = [DrugInfo("Paracetamol", "500mg", "Twice daily")]
-                    demo_analysis = analyzer.analyze_prescription(demo_drugs, 30)
+                    demo_analysis = result_cache.get_or_compute(
+                        analysis_cache_key(analyzer, demo_drugs, 30),
+                        lambda: analyzer.analyze_prescription(demo_drugs, 30)
+                    )
                     st.success("Demo: Paracetamol 500mg - High Safety")
                     st.info("Single medication with good safety profile")
             
@@ -438,7 +220,10 @@ def main():
                         DrugInfo("Aspirin", "100mg", "Once daily"),
                         DrugInfo("Ibuprofen", "400mg", "Three times daily")
                     ]
-                    demo_analysis = analyzer.analyze_prescription(demo_drugs, 70)
+                    demo_analysis = result_cache.get_or_compute(
+                        analysis_cache_key(analyzer, demo_drugs, 70),
+                        lambda: analyzer.analyze_prescription(demo_drugs, 70)
+                    )
                     st.warning("Demo: Aspirin + Ibuprofen - Bleeding Risk")
                     st.error("Increased GI bleeding risk in elderly patient")
     
@@ -462,6 +247,34 @@ def main():
         • And many more...
         """)
         
+        # Result cache counters (shared by all sessions)
+        cache_stats = result_cache.stats()
+        col_hits, col_misses, col_evictions = st.columns(3)
+        col_hits.metric("Cache hits", cache_stats['hits'])
+        col_misses.metric("Misses", cache_stats['misses'])
+        col_evictions.metric("Evictions", cache_stats['evictions'])
+        st.caption(f"Cached analyses: {cache_stats['size']} / {cache_stats['maxsize']}")
+        
+        # Per-stage latency (PRESCRIPTION_TIMING=1); histograms are process-wide
+        if STAGE_TIMINGS.enabled:
+            with st.expander("⏱ Stage Timings"):
+                histograms = STAGE_TIMINGS.histograms()
+                st.table([
+                    {
+                        "Stage": stage,
+                        "Calls": histogram.count,
+                        "Mean (µs)": round(histogram.total / histogram.count * 1e6, 1),
+                        "p95 ≤ (µs)": histogram.quantile(0.95) * 1e6
+                    }
+                    for stage, histogram in histograms.items() if histogram.count
+                ])
+                st.download_button(
+                    "📥 Timings (Prometheus)",
+                    data=STAGE_TIMINGS.to_prometheus(),
+                    file_name="stage_timings.prom",
+                    mime="text/plain"
+                )
+        
         st.header("🎯 Quick Actions")
         st.button("🔄 Refresh Analysis")
         
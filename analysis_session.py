@@ -0,0 +1,120 @@
+"""Incremental re-analysis for prescriptions edited one medication at a time
+
+    session = AnalysisSession(analyzer, age=72)
+    session.add(DrugInfo("Aspirin", "75mg", "Once daily"))
+    session.replace(0, DrugInfo("Aspirin", "100mg", "Once daily"))
+    result = session.result()     # same as analyzer.analyze_prescription(session.drugs, 72)
+
+Each drug keeps its own findings and each interacting pair its finding, so
+an add, remove or change only re-checks that drug and its pairs with the
+others: O(n) per edit instead of the O(n^2) full pass.
+"""
+
+
+class _Entry:
+    __slots__ = ('key', 'drug', 'name', 'part')
+
+    def __init__(self, key, drug, name, part):
+        self.key = key
+        self.drug = drug
+        self.name = name
+        self.part = part
+
+
+class AnalysisSession:
+    """A medication list with cached per-drug and per-pair findings"""
+
+    def __init__(self, analyzer, age, drugs=()):
+        self.analyzer = analyzer
+        self.age = age
+        self._entries = []
+        self._pairs = {}        # entry key -> {other entry key: interaction finding}
+        self._next_key = 0
+        for drug in drugs:
+            self.add(drug)
+
+    @property
+    def drugs(self):
+        return [entry.drug for entry in self._entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, drug):
+        """Append a medication; returns its index"""
+        self._insert(len(self._entries), drug)
+        return len(self._entries) - 1
+
+    def remove(self, index):
+        entry = self._entries.pop(index)
+        for other in self._pairs.pop(entry.key):
+            del self._pairs[other][entry.key]
+
+    def replace(self, index, drug):
+        """Change one medication; pairs are only re-checked if its name changed"""
+        entry = self._entries[index]
+        name = drug.name.lower()
+        if name != entry.name:
+            self.remove(index)
+            self._insert(index, drug)
+            return
+        entry.drug = drug
+        entry.part = self.analyzer.drug_findings(drug, self.age)
+
+    def set_age(self, age):
+        """New age: per-drug checks are redone, interactions are unaffected"""
+        if age == self.age:
+            return
+        self.age = age
+        for entry in self._entries:
+            entry.part = self.analyzer.drug_findings(entry.drug, age)
+
+    def sync(self, drugs, age):
+        """Apply the edits that turn the session into `drugs` at `age`"""
+        self.set_age(age)
+        for index, drug in enumerate(drugs):
+            if index >= len(self._entries):
+                self.add(drug)
+            elif self._entries[index].drug != drug:
+                self.replace(index, drug)
+        while len(self._entries) > len(drugs):
+            self.remove(len(self._entries) - 1)
+
+    def result(self):
+        """AnalysisResult for the current medications, assembled from cached parts"""
+        entries = self._entries
+        positions = {entry.key: position for position, entry in enumerate(entries)}
+        found = []
+        for key, neighbors in self._pairs.items():
+            i = positions[key]
+            for other, finding in neighbors.items():
+                j = positions[other]
+                if i < j:
+                    found.append((i, j, finding))
+        found.sort(key=lambda pair: (pair[0], pair[1]))
+
+        interactions = [finding for _, _, finding in found]
+        return self.analyzer.assemble_result(interactions, [entry.part for entry in entries], self.age)
+
+    def _insert(self, index, drug):
+        key = self._next_key
+        self._next_key += 1
+        name = drug.name.lower()
+        entry = _Entry(key, drug, name, self.analyzer.drug_findings(drug, self.age))
+
+        # Only the new drug's pairs with the others need checking. Edits elsewhere
+        # never change the relative order of two entries, so each pair's finding
+        # (which names the earlier drug first) is built once here.
+        neighbors = {}
+        lookup = self.analyzer.interaction_index.lookup
+        for position, other in enumerate(self._entries):
+            interaction = lookup(name, other.name)
+            if interaction is not None:
+                if position < index:
+                    finding = self.analyzer.interaction_finding(other.name, name, interaction)
+                else:
+                    finding = self.analyzer.interaction_finding(name, other.name, interaction)
+                neighbors[other.key] = finding
+                self._pairs[other.key][key] = finding
+        self._pairs[key] = neighbors
+        self._entries.insert(index, entry)
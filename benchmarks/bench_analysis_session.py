@@ -0,0 +1,121 @@
+"""Benchmark: AnalysisSession edits vs full re-analysis
+
+Usage: python benchmarks/bench_analysis_session.py [--drugs 5 20 50 100] [--edits 500]
+
+For each medication-list length, applies random add/remove/change edits and
+times the incremental result against analyze_prescription on the same list
+after every edit. tests/test_analysis_session.py checks the two agree.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis_session import AnalysisSession
+from interaction_index import InteractionIndex
+from medical_analyzer import DrugInfo, MedicalAnalyzer
+
+VOCABULARY = [f'drug{i}' for i in range(2000)]
+
+
+def synthetic_analyzer(pair_count, rng):
+    """Built-in analyzer extended with a synthetic formulary, so long lists rarely repeat a drug"""
+    analyzer = MedicalAnalyzer()
+    index = InteractionIndex(analyzer.interactions_db)
+    while len(index) < pair_count:
+        drug1, drug2 = rng.sample(VOCABULARY, 2)
+        index.add(drug1, drug2, {'severity': 'high', 'message': 'Synthetic interaction',
+                                 'score_impact': -rng.choice([0.05, 0.1, 0.2])})
+    analyzer.interaction_index = index
+    for name in VOCABULARY[::2]:
+        analyzer.drug_database[name] = {
+            'max_daily_dose': '1000mg',
+            'elderly_caution': rng.random() < 0.5,
+            'pediatric_safe': rng.random() < 0.5,
+            'contraindications': ['age < 12 years'],
+            'monitoring': ['kidney function']
+        }
+    return analyzer
+
+
+def random_drug(rng):
+    return DrugInfo(rng.choice(VOCABULARY).capitalize(), f'{rng.choice([10, 75, 500])}mg', 'Once daily')
+
+
+def random_edits(length, count, rng):
+    drugs = [random_drug(rng) for _ in range(length)]
+    edits = []
+    for _ in range(count):
+        kind = rng.choice(['add', 'remove', 'replace', 'replace'])
+        if kind == 'add' or not drugs:
+            drug = random_drug(rng)
+            drugs.append(drug)
+            edits.append(('add', None, drug))
+        elif kind == 'remove':
+            index = rng.randrange(len(drugs))
+            drugs.pop(index)
+            edits.append(('remove', index, None))
+        else:
+            index = rng.randrange(len(drugs))
+            drugs[index] = random_drug(rng)
+            edits.append(('replace', index, drugs[index]))
+    return edits
+
+
+def apply(session, drugs, edit):
+    kind, index, drug = edit
+    if kind == 'add':
+        session.add(drug)
+        drugs.append(drug)
+    elif kind == 'remove':
+        session.remove(index)
+        drugs.pop(index)
+    else:
+        session.replace(index, drug)
+        drugs[index] = drug
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drugs', type=int, nargs='+', default=[5, 20, 50, 100])
+    parser.add_argument('--edits', type=int, default=500)
+    parser.add_argument('--pairs', type=int, default=100000, help='synthetic interaction pairs')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    analyzer = synthetic_analyzer(args.pairs, rng)
+    print(f"{'drugs':>6} {'full us/edit':>13} {'incremental us/edit':>20} {'speedup':>8}")
+    for length in args.drugs:
+        age = rng.randint(1, 100)
+        start_drugs = [random_drug(rng) for _ in range(length)]
+        edits = random_edits(length, args.edits, random.Random(rng.random()))
+
+        session = AnalysisSession(analyzer, age, start_drugs)
+        drugs = list(start_drugs)
+        start = time.perf_counter()
+        for edit in edits:
+            apply(session, drugs, edit)
+            session.result()
+        incremental = (time.perf_counter() - start) / len(edits)
+
+        drugs = list(start_drugs)
+        start = time.perf_counter()
+        for kind, index, drug in edits:
+            if kind == 'add':
+                drugs.append(drug)
+            elif kind == 'remove':
+                drugs.pop(index)
+            else:
+                drugs[index] = drug
+            analyzer.analyze_prescription(drugs, age)
+        full = (time.perf_counter() - start) / len(edits)
+
+        print(f"{length:>6} {full * 1e6:>13.1f} {incremental * 1e6:>20.1f} {full / incremental:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
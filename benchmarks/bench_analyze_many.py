@@ -0,0 +1,53 @@
+"""Benchmark: analyze_many throughput in prescriptions per second at 1, 4 and N cores
+
+Usage: python benchmarks/bench_analyze_many.py [--prescriptions 100000] [--chunk-size 256]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from medical_analyzer import DrugInfo, MedicalAnalyzer
+
+DRUGS = ['Paracetamol', 'Ibuprofen', 'Aspirin', 'Codeine', 'Tramadol', 'Omeprazole', 'Warfarin', 'Simvastatin']
+
+
+def synthetic_batch(count, regimens, rng):
+    # Real exports repeat a limited set of regimens; draw from a fixed pool of them
+    pool = [rng.sample(DRUGS, rng.randint(1, 5)) for _ in range(regimens)]
+    for _ in range(count):
+        names = rng.choice(pool)
+        yield [DrugInfo(name, '500mg', 'Twice daily') for name in names], rng.randint(1, 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prescriptions', type=int, default=100000)
+    parser.add_argument('--regimens', type=int, default=2000,
+                        help='distinct drug combinations in the synthetic export')
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = MedicalAnalyzer()
+    batch = list(synthetic_batch(args.prescriptions, args.regimens, random.Random(args.seed)))
+
+    start = time.perf_counter()
+    for drugs, age in batch:
+        analyzer.analyze_prescription(drugs, age)
+    elapsed = time.perf_counter() - start
+    print(f"one-at-a-time      {len(batch) / elapsed:12,.0f} prescriptions/s")
+
+    for workers in sorted({1, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        for _ in analyzer.analyze_many(batch, workers=workers, chunk_size=args.chunk_size):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"analyze_many x{workers:<3}  {len(batch) / elapsed:12,.0f} prescriptions/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark: per-drug checks as the legacy runtime scan vs compiled rule tables
+
+Usage: python benchmarks/bench_clinical_rules.py [--drugs 2000] [--rules-per-drug 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from clinical_rules import RuleTables
+from findings import Finding
+
+
+def synthetic_database(drug_count, rules_per_drug, rng):
+    """Drug records with free-text contraindications and monitoring lists, half of them age limits"""
+    database = {}
+    for i in range(drug_count):
+        contraindications = [
+            f'age < {rng.choice((2, 6, 12, 16))} years' if rng.random() < 0.5 else f'condition {j}'
+            for j in range(rules_per_drug // 2)
+        ]
+        database[f'drug{i}'] = {
+            'elderly_caution': rng.random() < 0.5,
+            'pediatric_safe': rng.random() < 0.5,
+            'contraindications': contraindications,
+            'monitoring': [f'marker {j}' for j in range(rules_per_drug - len(contraindications))],
+        }
+    return database
+
+
+def legacy_drug_findings(database, name, age):
+    """The original per-drug checks: flag tests plus a substring scan of every contraindication"""
+    drug_info = database.get(name.lower())
+    if drug_info is None:
+        return []
+    found = []
+    if 2 <= age < 12 and not drug_info['pediatric_safe']:
+        found.append(Finding('not_pediatric', name, None, 'high', -0.3))
+    if age > 65 and drug_info['elderly_caution']:
+        found.append(Finding('elderly_dose_reduction', name, None, None, 0.0))
+    for contraindication in drug_info['contraindications']:
+        if 'age' in contraindication and age < 16:
+            found.append(Finding('contraindication', name, contraindication, 'high', 0.0))
+    for monitor in drug_info['monitoring']:
+        found.append(Finding('monitor', name, monitor, None, 0.0))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drugs', type=int, default=2000)
+    parser.add_argument('--rules-per-drug', type=int, default=100)
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    database = synthetic_database(args.drugs, args.rules_per_drug, rng)
+    names = [f'Drug{i}' for i in range(args.drugs)]
+    cases = [(rng.choice(names), rng.randint(0, 95)) for _ in range(args.lookups)]
+
+    tables = RuleTables(database)
+    report = tables.report(repeat=1)
+    print(f"{report['rules']} rules over {report['drugs']} drugs, compiled in {report['compile_ms']:.0f} ms "
+          f"({report['drug_bands']} drug bands)")
+
+    for name, age in cases[:2000]:
+        compiled = [finding for _, finding, _ in tables.drug_findings(name, age)]
+        assert sorted(compiled) == sorted(legacy_drug_findings(database, name, age)), (name, age)
+
+    start = time.perf_counter()
+    for name, age in cases:
+        legacy_drug_findings(database, name, age)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, age in cases:
+        tables.drug_findings(name, age)
+    compiled_time = time.perf_counter() - start
+
+    print(f"legacy scan:     {legacy_time / len(cases) * 1e6:8.2f} us/lookup")
+    print(f"compiled tables: {compiled_time / len(cases) * 1e6:8.2f} us/lookup  "
+          f"({legacy_time / compiled_time:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
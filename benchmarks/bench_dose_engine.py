@@ -0,0 +1,55 @@
+"""Benchmark: dose parsing cached per distinct string vs parsed every time, and daily-total checks per regimen
+
+Usage: python benchmarks/bench_dose_engine.py [--prescriptions 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dose_engine import DoseEngine, parse_dose, parse_doses_per_day
+from medical_analyzer import MedicalAnalyzer
+from synthetic import PrescriptionGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prescriptions', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = MedicalAnalyzer()
+    batch = PrescriptionGenerator(args.seed).prescriptions(args.prescriptions)
+    entries = [drug for drugs, _ in batch for drug in drugs]
+    distinct = len({(drug.dosage, drug.frequency) for drug in entries})
+    print(f"{len(batch)} prescriptions, {len(entries)} entries, {distinct} distinct dosage/frequency pairs")
+
+    start = time.perf_counter()
+    for drug in entries:
+        parse_dose(drug.dosage)
+        parse_doses_per_day(drug.frequency)
+    uncached = time.perf_counter() - start
+
+    engine = DoseEngine(analyzer.drug_database)
+    start = time.perf_counter()
+    for drug in entries:
+        engine.dose(drug.dosage)
+        engine.doses_per_day(drug.frequency)
+    cached = time.perf_counter() - start
+    print(f"parse every entry:   {uncached:7.3f} s  ({len(entries) / uncached:12,.0f} entries/s)")
+    print(f"parse cached:        {cached:7.3f} s  ({len(entries) / cached:12,.0f} entries/s)")
+
+    start = time.perf_counter()
+    flagged = 0
+    for drugs, age in batch:
+        amounts = [(drug.name.lower(), engine.daily_amounts(drug)) for drug in drugs]
+        flagged += bool(engine.regimen_findings(amounts, age))
+    checked = time.perf_counter() - start
+    print(f"daily totals check:  {checked:7.3f} s  ({checked / len(batch) * 1e6:8.2f} us/prescription, "
+          f"{flagged / len(batch):.1%} flagged)")
+
+
+if __name__ == '__main__':
+    main()
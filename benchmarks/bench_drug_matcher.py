@@ -0,0 +1,96 @@
+"""Benchmark: single-pass DrugMatcher vs the per-synonym substring loop
+
+Usage: python benchmarks/bench_drug_matcher.py [--prescriptions 100000] [--extra-keywords 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from drug_matcher import DrugMatcher
+
+DRUG_KEYWORDS = {
+    'paracetamol': ['paracetamol', 'acetaminophen', 'tylenol'],
+    'ibuprofen': ['ibuprofen', 'advil', 'nurofen'],
+    'aspirin': ['aspirin', 'acetylsalicylic acid'],
+    'codeine': ['codeine', 'co-codamol'],
+    'tramadol': ['tramadol'],
+    'omeprazole': ['omeprazole', 'prilosec'],
+    'simvastatin': ['simvastatin', 'zocor']
+}
+
+FILLER = ['patient', 'prescribed', 'take', 'with', 'food', 'for', 'pain', 'relief',
+          'and', 'review', 'in', 'two', 'weeks', 'twice', 'daily', 'mg', 'tablets']
+
+
+def synthetic_formulary(extra, rng):
+    """Pad the real keyword table with made-up brand names"""
+    keywords = {name: list(synonyms) for name, synonyms in DRUG_KEYWORDS.items()}
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    for i in range(extra):
+        name = ''.join(rng.choice(letters) for _ in range(rng.randint(6, 12)))
+        keywords.setdefault(f'synthetic{i // 4}', []).append(name)
+    return keywords
+
+
+def synthetic_prescriptions(count, rng):
+    synonyms = [k for keywords in DRUG_KEYWORDS.values() for k in keywords]
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(8, 30))]
+        for _ in range(rng.randint(1, 4)):
+            words.insert(rng.randrange(len(words) + 1), f'{rng.choice(synonyms)} {rng.choice([75, 400, 500])}mg')
+        texts.append(' '.join(words))
+    return texts
+
+
+def legacy_scan(text_lower, drug_keywords):
+    """The original loop: one substring test per synonym"""
+    found = []
+    for standard_name, keywords in drug_keywords.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                found.append(standard_name)
+                break
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prescriptions', type=int, default=100000)
+    parser.add_argument('--extra-keywords', type=int, default=0,
+                        help='synthetic brand names added to the formulary')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    drug_keywords = synthetic_formulary(args.extra_keywords, rng)
+    texts = [t.lower() for t in synthetic_prescriptions(args.prescriptions, rng)]
+    keyword_total = sum(len(k) for k in drug_keywords.values())
+
+    start = time.perf_counter()
+    matcher = DrugMatcher(drug_keywords)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        legacy_scan(text, drug_keywords)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        matcher.find_mentions(text)
+    matcher_time = time.perf_counter() - start
+
+    print(f"prescriptions: {len(texts)}  keywords: {keyword_total}")
+    print(f"matcher build:  {build_time * 1000:.1f} ms")
+    print(f"legacy loop:    {legacy_time:.3f} s  ({len(texts) / legacy_time:,.0f} docs/s)")
+    print(f"aho-corasick:   {matcher_time:.3f} s  ({len(texts) / matcher_time:,.0f} docs/s)")
+    print(f"speedup:        {legacy_time / matcher_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: fuzzy drug-name lookup latency by vocabulary size
+
+Usage: python benchmarks/bench_drug_resolver.py [--sizes 1000,10000,100000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from drug_resolver import DrugNameResolver
+
+SYLLABLES = [consonant + vowel for consonant in 'bcdfghklmnprstvz' for vowel in 'aeiouy'] + \
+    ['bra', 'cla', 'dro', 'fla', 'gli', 'pro', 'tra', 'tri', 'xa', 'zo']
+STEMS = ['afil', 'azepam', 'azole', 'cillin', 'cycline', 'dipine', 'dronate', 'floxacin', 'gliptin', 'lukast',
+         'mab', 'mycin', 'olol', 'oxetine', 'parin', 'prazole', 'pril', 'sartan', 'semide', 'setron', 'statin',
+         'terol', 'tidine', 'tinib', 'triptan', 'vir', 'zosin', 'amine', 'ide', 'ine', 'ol', 'one']
+
+
+def synthetic_vocabulary(size, rng):
+    """{standard name: [generic, brand]}: syllable prefixes on real naming stems, plus brand-style words"""
+    names = set()
+    while len(names) < size:
+        names.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) + rng.choice(STEMS))
+    brands = set()
+    while len(brands) < size:
+        brand = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if brand not in names:
+            brands.add(brand)
+    return {name: [name, brand] for name, brand in zip(sorted(names), sorted(brands))}
+
+
+def misspell(name, rng):
+    """One random substitution, deletion, insertion or transposition"""
+    i = rng.randrange(1, len(name) - 1)
+    letter = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    edit = rng.randrange(4)
+    if edit == 0:
+        return name[:i] + letter + name[i + 1:]
+    if edit == 1:
+        return name[:i] + name[i + 1:]
+    if edit == 2:
+        return name[:i] + letter + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='standard names per vocabulary (2 keywords each)')
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>9} {'build ms':>9} {'exact us':>9} {'1 typo p50':>11} {'p99':>8} "
+          f"{'2 typos p50':>12} {'p99':>8} {'in top 5':>9}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        rng = random.Random(args.seed)
+        vocabulary = synthetic_vocabulary(size, rng)
+        start = time.perf_counter()
+        resolver = DrugNameResolver(vocabulary)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        targets = [rng.choice(resolver.keywords) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for name in targets:
+            resolver.candidates(name)
+        exact_us = (time.perf_counter() - start) / len(targets) * 1e6
+
+        one_typo, hits = timed_lookups(resolver, [(name, misspell(name, rng)) for name in targets])
+        long_names = [name for name in targets if len(name) >= 10]
+        two_typos, _ = timed_lookups(resolver, [(name, misspell(misspell(name, rng), rng)) for name in long_names])
+        print(f"{len(resolver):>9} {build_ms:>9.0f} {exact_us:>9.2f} {percentile(one_typo, 50):>9.0f}us "
+              f"{percentile(one_typo, 99):>6.0f}us {percentile(two_typos, 50):>10.0f}us "
+              f"{percentile(two_typos, 99):>6.0f}us {hits:>9.1%}")
+
+
+def timed_lookups(resolver, queries):
+    """Per-query seconds, and the share of queries whose intended keyword was returned"""
+    timings = []
+    hits = 0
+    for name, query in queries:
+        start = time.perf_counter()
+        found = resolver.candidates(query)
+        timings.append(time.perf_counter() - start)
+        hits += any(candidate.keyword == name for candidate in found)
+    return sorted(timings), hits / max(len(queries), 1)
+
+
+def percentile(timings, percent):
+    return timings[min(len(timings) - 1, len(timings) * percent // 100)] * 1e6 if timings else 0.0
+
+
+if __name__ == '__main__':
+    main()
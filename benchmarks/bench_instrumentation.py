@@ -0,0 +1,75 @@
+"""Benchmark: cost of stage timing on extraction + analysis, disabled vs enabled
+
+Usage: python benchmarks/bench_instrumentation.py [--texts 5000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_drug_matcher import synthetic_prescriptions
+from instrumentation import STAGE_TIMINGS
+from medical_analyzer import MedicalAnalyzer
+
+
+def run(analyzer, texts, ages, repeat):
+    """Best-of-repeat seconds per text for extract + analyze"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text, age in zip(texts, ages):
+            analyzer.analyze_prescription(analyzer.extract_drugs_from_text(text), age)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts)
+
+
+def disabled_check_cost(calls):
+    """Seconds per call of what an instrumented call does while disabled: one clock() and its checks"""
+    clock_source = STAGE_TIMINGS.clock
+    start = time.perf_counter()
+    for _ in range(calls):
+        clock = clock_source()
+        if clock:
+            clock.lap('x')
+        if clock:
+            clock.lap('x')
+        if clock:
+            clock.stop('x')
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--texts', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = synthetic_prescriptions(args.texts, rng)
+    ages = [rng.randint(1, 95) for _ in texts]
+    analyzer = MedicalAnalyzer()
+    run(analyzer, texts[:200], ages[:200], 1)       # warm the matcher, resolver and rule tables
+
+    STAGE_TIMINGS.disable()
+    disabled = run(analyzer, texts, ages, args.repeat)
+    STAGE_TIMINGS.enable()
+    enabled = run(analyzer, texts, ages, args.repeat)
+    STAGE_TIMINGS.disable()
+    check = disabled_check_cost(200000) * 2       # one clock per extract and per analyze
+
+    print(f"timing disabled: {disabled * 1e6:8.2f} us/prescription "
+          f"(of which ~{check * 1e9:.0f} ns is the disabled checks, {check / disabled:.2%})")
+    print(f"timing enabled:  {enabled * 1e6:8.2f} us/prescription  (+{enabled / disabled - 1:.1%})")
+    print()
+    print(f"{'stage':24} {'calls':>9} {'mean us':>9} {'p95 <= us':>10}")
+    for stage, histogram in STAGE_TIMINGS.histograms().items():
+        print(f"{stage:24} {histogram.count:>9} {histogram.total / histogram.count * 1e6:>9.2f} "
+              f"{histogram.quantile(0.95) * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
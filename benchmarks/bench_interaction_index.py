@@ -0,0 +1,69 @@
+"""Benchmark: interaction check for polypharmacy regimens, pair loop vs InteractionIndex
+
+Usage: python benchmarks/bench_interaction_index.py [--pairs 100000] [--drugs 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from interaction_index import InteractionIndex
+
+
+def synthetic_interactions(pair_count, vocabulary, rng):
+    interactions = {}
+    while len(interactions) < pair_count:
+        drug1, drug2 = sorted(rng.sample(vocabulary, 2))
+        interactions[(drug1, drug2)] = {'severity': 'high', 'message': 'synthetic', 'score_impact': -0.1}
+    return interactions
+
+
+def legacy_check(drug_names, interactions_db):
+    """The original nested loop with a sorted tuple per pair"""
+    found = []
+    for i, drug1_name in enumerate(drug_names):
+        for drug2_name in drug_names[i+1:]:
+            pair = tuple(sorted([drug1_name, drug2_name]))
+            if pair in interactions_db:
+                found.append(interactions_db[pair])
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    parser.add_argument('--drugs', type=int, default=20, help='drugs per prescription')
+    parser.add_argument('--prescriptions', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [f'drug{i}' for i in range(args.vocabulary)]
+    interactions_db = synthetic_interactions(args.pairs, vocabulary, rng)
+    regimens = [rng.sample(vocabulary, args.drugs) for _ in range(args.prescriptions)]
+
+    start = time.perf_counter()
+    index = InteractionIndex(interactions_db)
+    print(f"index build: {(time.perf_counter() - start) * 1000:.0f} ms for {len(index)} pairs")
+
+    start = time.perf_counter()
+    legacy_hits = sum(len(legacy_check(names, interactions_db)) for names in regimens)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_hits = sum(len(index.find_interactions(names)) for names in regimens)
+    index_time = time.perf_counter() - start
+
+    assert legacy_hits == index_hits
+    print(f"{args.drugs}-drug regimens, {len(regimens)} prescriptions, {index_hits} interactions found")
+    print(f"pair loop: {legacy_time / len(regimens) * 1e6:8.1f} us/prescription")
+    print(f"index:     {index_time / len(regimens) * 1e6:8.1f} us/prescription")
+    print(f"speedup:   {legacy_time / index_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
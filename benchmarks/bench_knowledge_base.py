@@ -0,0 +1,117 @@
+"""Benchmark: cold start and RSS of the compiled knowledge base vs eager JSON/CSV tables
+
+Usage: python benchmarks/bench_knowledge_base.py [--sizes 1000 10000 100000]
+
+Each measurement runs in a fresh interpreter so start-up time and peak RSS
+are not polluted by earlier runs.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from knowledge_base import build_knowledge_base, load_source
+
+
+def write_synthetic_source(directory, drug_count, rng):
+    names = [f'drug{i}' for i in range(drug_count)]
+    drugs = {
+        name: {
+            'synonyms': [name, f'{name}brand'],
+            'max_daily_dose': f'{rng.choice([400, 2400, 4000])}mg',
+            'elderly_caution': rng.random() < 0.5,
+            'pediatric_safe': rng.random() < 0.5,
+            'contraindications': ['severe liver disease', 'age < 12 years'],
+            'monitoring': ['kidney function', 'blood pressure']
+        }
+        for name in names
+    }
+    drugs_path = os.path.join(directory, 'drugs.json')
+    with open(drugs_path, 'w') as f:
+        json.dump(drugs, f)
+
+    interactions_path = os.path.join(directory, 'interactions.csv')
+    with open(interactions_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['drug1', 'drug2', 'severity', 'message', 'score_impact'])
+        for _ in range(drug_count * 5):
+            drug1, drug2 = rng.sample(names, 2)
+            writer.writerow([drug1, drug2, 'high', 'Synthetic interaction', -0.1])
+    return drugs_path, interactions_path
+
+
+def peak_rss_mb():
+    # ru_maxrss survives exec on Linux, so prefer this process's own high-water mark
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, drugs_path, interactions_path, kb_path):
+    """Start up one way, answer one prescription, report time and peak RSS"""
+    start = time.perf_counter()
+    if mode == 'eager':
+        from interaction_index import InteractionIndex
+        drug_database, interactions, _ = load_source(drugs_path, interactions_path)
+        index = InteractionIndex(interactions)
+    else:
+        from knowledge_base import SqliteKnowledgeBase
+        kb = SqliteKnowledgeBase(kb_path)
+        drug_database, index = kb.drug_database, kb.interaction_index
+    ready = time.perf_counter() - start
+
+    names = ['drug1', 'drug2', 'drug3', 'drug4']
+    index.find_interactions(names)
+    records = [drug_database.get(name) for name in names]
+    first_answer = time.perf_counter() - start
+    assert all(records)
+
+    rss_mb = peak_rss_mb()
+    print(json.dumps({'ready': ready, 'first_answer': first_answer, 'rss_mb': rss_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    rng = random.Random(args.seed)
+    print(f"{'drugs':>8} {'mode':>6} {'ready ms':>9} {'first ms':>9} {'RSS MB':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            drugs_path, interactions_path = write_synthetic_source(directory, size, rng)
+            kb_path = os.path.join(directory, f'kb_{size}.sqlite')
+            build_knowledge_base(kb_path, *load_source(drugs_path, interactions_path))
+
+            for mode in ('eager', 'sqlite'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, drugs_path, interactions_path, kb_path],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                stats = json.loads(output)
+                print(f"{size:>8} {mode:>6} {stats['ready'] * 1000:>9.1f} "
+                      f"{stats['first_answer'] * 1000:>9.1f} {stats['rss_mb']:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark: vectorized PopulationScorer vs scalar analyze_prescription scores
+
+Usage: python benchmarks/bench_population_scoring.py [--prescriptions 200000]
+
+Score agreement is tested in tests/test_population_scoring.py; the max
+difference printed here is for information only.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_analyze_many import synthetic_batch
+from medical_analyzer import MedicalAnalyzer
+from population_scoring import PopulationScorer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prescriptions', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = MedicalAnalyzer()
+    batch = list(synthetic_batch(args.prescriptions, args.prescriptions, random.Random(args.seed)))
+
+    start = time.perf_counter()
+    scalar = np.array([analyzer.analyze_prescription(drugs, age).safety_score for drugs, age in batch])
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scorer = PopulationScorer(analyzer)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    drug_ids, ages, daily_doses = scorer.encode(batch)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = scorer.score(drug_ids, ages, daily_doses)
+    score_time = time.perf_counter() - start
+
+    max_error = float(np.max(np.abs(scalar - vectorized)))
+    count = len(batch)
+    print(f"{count} prescriptions, max |scalar - vectorized| = {max_error:.2e}")
+    print(f"scalar analyze_prescription: {scalar_time:7.3f} s  ({count / scalar_time:12,.0f}/s)")
+    print(f"vectorized tables build:     {build_time * 1000:7.1f} ms")
+    print(f"vectorized encode:           {encode_time:7.3f} s  ({count / encode_time:12,.0f}/s)")
+    print(f"vectorized score:            {score_time:7.3f} s  ({count / score_time:12,.0f}/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark: per-document parse latency, span tokenizer vs whole-text regexes
+
+Usage: python benchmarks/bench_prescription_parser.py [--prescriptions 20000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_drug_matcher import legacy_scan, synthetic_formulary, synthetic_prescriptions
+from drug_matcher import DrugMatcher
+from prescription_parser import extract_dosage, extract_frequency, split_drug_spans
+
+LEGACY_FREQUENCY_PATTERNS = [
+    (r'once.?daily|1.?daily|daily', 'Once daily'),
+    (r'twice.?daily|2.?daily|bd', 'Twice daily'),
+    (r'three.?times.?daily|3.*?daily|tds', 'Three times daily'),
+    (r'four.?times.?daily|4.*?daily|qds', 'Four times daily'),
+    (r'as.?needed|prn|when.?required', 'As needed')
+]
+
+
+def legacy_parse(text_lower, drug_keywords):
+    """The original flow: substring scan, then regexes built per call over the whole text"""
+    parsed = []
+    for standard_name in legacy_scan(text_lower, drug_keywords):
+        keyword = next(k for k in drug_keywords[standard_name] if k in text_lower)
+        match = re.search(rf'{keyword}.?(\d+\.?\d\s*mg)', text_lower)
+        dosage = match.group(1) if match else '500mg'
+        frequency = 'As prescribed'
+        for pattern, label in LEGACY_FREQUENCY_PATTERNS:
+            if re.search(pattern, text_lower):
+                frequency = label
+                break
+        parsed.append((standard_name, dosage, frequency))
+    return parsed
+
+
+def span_parse(text_lower, matcher):
+    parsed = []
+    for mention, span in split_drug_spans(text_lower, matcher.find_mentions(text_lower)):
+        parsed.append((mention.drug, extract_dosage(span, mention.drug), extract_frequency(span)))
+    return parsed
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def time_per_document(parse, texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        parse(text)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prescriptions', type=int, default=20000)
+    parser.add_argument('--extra-keywords', type=int, default=0,
+                        help='synthetic brand names added to the formulary')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    drug_keywords = synthetic_formulary(args.extra_keywords, rng)
+    texts = [t.lower() for t in synthetic_prescriptions(args.prescriptions, rng)]
+    matcher = DrugMatcher(drug_keywords)
+
+    for label, parse in (('legacy', lambda t: legacy_parse(t, drug_keywords)),
+                         ('spans', lambda t: span_parse(t, matcher))):
+        latencies = time_per_document(parse, texts)
+        mean = sum(latencies) / len(latencies)
+        print(f"{label:8} mean {mean * 1e6:7.1f} us  p50 {percentile(latencies, 0.5) * 1e6:7.1f} us  "
+              f"p99 {percentile(latencies, 0.99) * 1e6:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
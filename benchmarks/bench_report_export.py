@@ -0,0 +1,67 @@
+"""Benchmark: report export throughput and size per format, against indented JSON per report
+
+Usage: python benchmarks/bench_report_export.py [--reports 50000] [--batch-size 256]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from medical_analyzer import MedicalAnalyzer, build_report
+from report_export import FORMATS, ReportExporter, read_reports
+from synthetic import PrescriptionGenerator
+
+SUFFIXES = {'jsonl': '.jsonl', 'jsonl.gz': '.jsonl.gz', 'binary': '.rxb'}
+
+
+def legacy_export(path, cases):
+    """The app's download path per report: a timestamped dict dumped with indent=2"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for drugs, age, analysis in cases:
+            f.write(json.dumps(build_report(drugs, age, analysis), indent=2))
+            f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = MedicalAnalyzer()
+    generator = PrescriptionGenerator(args.seed)
+    cases = [(drugs, age, analyzer.analyze_prescription(drugs, age))
+             for drugs, age in generator.prescriptions(args.reports)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'legacy.json')
+        start = time.perf_counter()
+        legacy_export(path, cases)
+        elapsed = time.perf_counter() - start
+        print(f"{'format':14} {'reports/s':>11} {'bytes/report':>13} {'submit us':>10} {'read back/s':>12}")
+        print(f"{'indent=2 JSON':14} {len(cases) / elapsed:>11,.0f} {os.path.getsize(path) / len(cases):>13.0f}")
+
+        for export_format in FORMATS:
+            path = os.path.join(directory, 'reports' + SUFFIXES[export_format])
+            start = time.perf_counter()
+            exporter = ReportExporter(path, batch_size=args.batch_size)
+            for drugs, age, analysis in cases:
+                exporter.submit(drugs, age, analysis)
+            submit_seconds = time.perf_counter() - start      # what the analysis loop waits for
+            exporter.close()
+            elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            count = sum(1 for _ in read_reports(path))
+            read_elapsed = time.perf_counter() - start
+            assert count == len(cases)
+            print(f"{export_format:14} {len(cases) / elapsed:>11,.0f} {exporter.bytes / len(cases):>13.0f} "
+                  f"{submit_seconds / len(cases) * 1e6:>10.2f} {count / read_elapsed:>12,.0f}")
+
+if __name__ == '__main__':
+    main()
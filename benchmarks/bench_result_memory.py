@@ -0,0 +1,74 @@
+"""Benchmark: memory and serialized size per result, structured findings vs rendered strings
+
+Usage: python benchmarks/bench_result_memory.py [--results 200000]
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_analyze_many import synthetic_batch
+from medical_analyzer import MedicalAnalyzer
+
+
+class RenderedResult:
+    """The previous layout: a plain object holding four lists of formatted strings"""
+
+    def __init__(self, interactions, recommendations, alternatives, warnings, safety_score):
+        self.interactions = interactions
+        self.recommendations = recommendations
+        self.alternatives = alternatives
+        self.warnings = warnings
+        self.safety_score = safety_score
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return results, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--results', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = MedicalAnalyzer()
+    # Every prescription distinct so nothing is shared through deduplication
+    batch = list(synthetic_batch(args.results, args.results, random.Random(args.seed)))
+
+    structured, structured_bytes = measure(
+        lambda: [analyzer.analyze_prescription(drugs, age) for drugs, age in batch])
+    rendered, rendered_bytes = measure(
+        lambda: [RenderedResult(r.interactions, r.recommendations, r.alternatives, r.warnings, r.safety_score)
+                 for r in structured])
+
+    count = len(batch)
+    sample = structured[:10000]
+    rendered_sample = rendered[:10000]
+    rows = [
+        ('memory (bytes/result)', rendered_bytes / count, structured_bytes / count),
+        ('pickle (bytes/result)', len(pickle.dumps(rendered_sample, protocol=pickle.HIGHEST_PROTOCOL)) / len(sample),
+         len(pickle.dumps(sample, protocol=pickle.HIGHEST_PROTOCOL)) / len(sample)),
+        ('json (bytes/result)',
+         sum(len(json.dumps([r.safety_score, r.interactions, r.recommendations, r.alternatives, r.warnings]))
+             for r in rendered_sample) / len(sample),
+         sum(len(json.dumps(r.to_codes())) for r in sample) / len(sample)),
+    ]
+    print(f"{count} results")
+    print(f"{'':24} {'rendered':>10} {'structured':>11}")
+    for label, before, after in rows:
+        print(f"{label:24} {before:>10.0f} {after:>11.0f}   ({before / after:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
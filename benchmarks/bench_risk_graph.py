@@ -0,0 +1,91 @@
+"""Benchmark: cumulative risk checks per regimen, cached risk vectors vs a pairwise search
+
+Usage: python benchmarks/bench_risk_graph.py [--drugs 10000] [--sizes 2,5,10,20,40]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from risk_graph import DRUG_CLASSES, MIN_CONTRIBUTORS, RISK_CATEGORIES, RiskGraph
+
+
+def synthetic_database(drug_count, rng):
+    """Drug records where about a third carry one or two risk classes"""
+    classes = sorted(DRUG_CLASSES)
+    database = {}
+    for i in range(drug_count):
+        record = {'monitoring': ['kidney function']}
+        if rng.random() < 0.35:
+            record['classes'] = rng.sample(classes, rng.randint(1, 2))
+        database[f'drug{i}'] = record
+    return database
+
+
+def class_weights(database, name):
+    weights = {}
+    for drug_class in database.get(name, {}).get('classes', ()):
+        for category, weight in DRUG_CLASSES[drug_class].items():
+            weights[category] = weights.get(category, 0.0) + weight
+    return weights
+
+
+def pairwise_search(database, names):
+    """Categories reached, found the way pair checks extend: every drug pair sharing a category"""
+    names = list(dict.fromkeys(names))
+    members = {category['category']: set() for category in RISK_CATEGORIES}
+    for first, second in combinations(names, 2):
+        first_weights = class_weights(database, first)
+        second_weights = class_weights(database, second)
+        for category in first_weights.keys() & second_weights.keys():
+            members[category].update((first, second))
+    return {
+        category['category'] for category in RISK_CATEGORIES
+        if len(members[category['category']]) >= MIN_CONTRIBUTORS
+        and sum(class_weights(database, name)[category['category']] for name in members[category['category']])
+        >= category['threshold']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drugs', type=int, default=10000)
+    parser.add_argument('--sizes', default='2,5,10,20,40', help='drugs per regimen')
+    parser.add_argument('--regimens', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    labels = {category['category']: category['label'] for category in RISK_CATEGORIES}
+    rng = random.Random(args.seed)
+    database = synthetic_database(args.drugs, rng)
+    names = list(database)
+    start = time.perf_counter()
+    graph = RiskGraph(database)
+    print(f"{args.drugs} drugs, risk vectors built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print(f"{'drugs/regimen':>13} {'cached us':>10} {'pairwise us':>12} {'flagged':>8}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        regimens = [rng.sample(names, size) for _ in range(args.regimens)]
+        flagged = 0
+        start = time.perf_counter()
+        for regimen in regimens:
+            flagged += bool(graph.regimen_findings(regimen))
+        cached = (time.perf_counter() - start) / len(regimens)
+
+        sample = regimens[:2000]
+        for regimen in sample[:200]:
+            expected = {finding.detail for finding in graph.regimen_findings(regimen)}
+            assert {labels[key] for key in pairwise_search(database, regimen)} == expected, regimen
+        start = time.perf_counter()
+        for regimen in sample:
+            pairwise_search(database, regimen)
+        pairwise = (time.perf_counter() - start) / len(sample)
+        print(f"{size:>13} {cached * 1e6:>10.2f} {pairwise * 1e6:>12.2f} {flagged / len(regimens):>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
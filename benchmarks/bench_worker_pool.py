@@ -0,0 +1,125 @@
+"""Benchmark: verify_cli worker pool scaling and per-worker memory, shared segment vs per-worker SQLite
+
+Usage: python benchmarks/bench_worker_pool.py [--sizes 1000,10000,50000] [--records 20000] [--workers 1,2,4]
+
+For each synthetic knowledge base size, every worker of a pool verifies the
+same structured records, drawn from a fixed formulary of --formulary drugs
+(no free text, so the text matcher is never built), and then reports its
+private memory: pages it does not share with the parent or the other
+workers. Then the largest knowledge base is verified by pools of 1 worker
+up to all cores; the segment is built once beforehand, and its build time
+is reported separately.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import verify_cli
+from bench_knowledge_base import write_synthetic_source
+from knowledge_base import build_knowledge_base, load_source
+from shared_kb import SharedKnowledgeBase
+from synthetic import PrescriptionGenerator
+
+
+def private_kib():
+    """This process's private (unshared) memory, from /proc; None where unavailable"""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            return sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+    except OSError:
+        return None
+
+
+def _probe(_):
+    time.sleep(0.05)        # long enough for every worker to take one probe
+    return os.getpid(), private_kib()
+
+
+def worker_memory(chunks, workers, kb_path, shared):
+    """Mean private KiB per worker after verifying every chunk"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=verify_cli._init_worker,
+                             initargs=(kb_path, False, shared)) as pool:
+        for _ in pool.map(verify_cli.verify_chunk, chunks, ['jsonl'] * len(chunks)):
+            pass
+        per_worker = dict(pool.map(_probe, range(workers * 4)))
+    if None in per_worker.values():
+        return None
+    return sum(per_worker.values()) / len(per_worker)
+
+
+def throughput(chunks, workers, kb_path, shared):
+    """Records per second through a pool of `workers`, worker start-up included"""
+    start = time.perf_counter()
+    count = sum(result[1] for result in verify_cli._run_pool(
+        iter(chunks), 'jsonl', workers, True, 'jsonl', (kb_path, False, shared)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000', help='drugs per synthetic knowledge base')
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--formulary', type=int, default=500, help='distinct drugs the records prescribe')
+    parser.add_argument('--workers', help='comma-separated worker counts (default: 1, 2, 4, ... all cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        worker_counts = [int(count) for count in args.workers.split(',')]
+    else:
+        worker_counts = sorted({min(1 << power, cores) for power in range(cores.bit_length() + 1)})
+    memory_workers = max(2, min(4, cores))
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{memory_workers} workers, {args.records} structured records")
+        print(f"{'drugs':>7} {'segment MiB':>12} {'build s':>8} {'sqlite MiB/worker':>18} {'shared MiB/worker':>18}")
+        sizes = [int(size) for size in args.sizes.split(',')]
+        for size in sizes:
+            drugs_path, interactions_path = write_synthetic_source(directory, size, rng)
+            drug_database, interactions, drug_keywords = load_source(drugs_path, interactions_path)
+            kb_path = os.path.join(directory, f'kb{size}.sqlite')
+            build_knowledge_base(kb_path, drug_database, interactions, drug_keywords)
+            del drug_database, interactions
+
+            formulary = {name: drug_keywords[name] for name in list(drug_keywords)[:args.formulary]}
+            generator = PrescriptionGenerator(args.seed, drug_keywords=formulary)
+            lines = [json.dumps(record) for record in generator.records(args.records, text_share=0.0)]
+            chunks = list(verify_cli._chunks(enumerate(lines, 1), 500))
+
+            start = time.perf_counter()
+            shared = SharedKnowledgeBase.from_knowledge_base(kb_path)
+            build = time.perf_counter() - start
+            sqlite_memory = worker_memory(chunks, memory_workers, kb_path, None)
+            shared_memory = worker_memory(chunks, memory_workers, None, shared)
+            if sqlite_memory is None:
+                memory = f"{'n/a':>18} {'n/a':>18}"
+            else:
+                memory = f"{sqlite_memory / 1024:>18.1f} {shared_memory / 1024:>18.1f}"
+            print(f"{size:>7} {shared.size / 2**20:>12.1f} {build:>8.2f} {memory}")
+            if size != sizes[-1]:
+                shared.close()
+
+        try:
+            print(f"\nscaling over {size} drugs ({cores} cores)")
+            print(f"{'workers':>7} {'shared rec/s':>13} {'speedup':>8} {'sqlite rec/s':>13}")
+            single = None
+            for workers in worker_counts:
+                shared_rate = throughput(chunks, workers, None, shared)
+                single = single or shared_rate
+                sqlite_rate = throughput(chunks, workers, kb_path, None)
+                print(f"{workers:>7} {shared_rate:>13,.0f} {shared_rate / single:>7.2f}x {sqlite_rate:>13,.0f}")
+        finally:
+            shared.close()
+
+
+if __name__ == '__main__':
+    main()
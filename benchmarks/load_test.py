@@ -0,0 +1,125 @@
+"""Load test for verification_server: p50/p99 latency and requests per second on localhost
+
+Usage:
+    python benchmarks/load_test.py --spawn [--workers 4]     # start a server for the run
+    python benchmarks/load_test.py --port 8080               # hit one already running
+
+Each client holds one keep-alive connection and sends requests back to back.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DRUGS = ['Paracetamol', 'Ibuprofen', 'Aspirin', 'Codeine', 'Tramadol', 'Omeprazole', 'Warfarin']
+
+
+def synthetic_body(endpoint, rng):
+    if endpoint == '/extract':
+        return {'text': f"{rng.choice(DRUGS)} 500mg twice daily and {rng.choice(DRUGS)} 75mg once daily"}
+    prescription = {
+        'age': rng.randint(1, 100),
+        'medications': [{'name': name, 'dosage': '500mg', 'frequency': 'Twice daily'}
+                        for name in rng.sample(DRUGS, rng.randint(1, 5))]
+    }
+    if endpoint == '/verify/batch':
+        return {'prescriptions': [prescription] * 50}
+    return prescription
+
+
+async def client(host, port, endpoint, count, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            body = json.dumps(synthetic_body(endpoint, rng)).encode()
+            start = time.perf_counter()
+            writer.write(
+                f"POST {endpoint} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode().partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if b' 200 ' not in status:
+                raise RuntimeError(f"unexpected response: {status!r}")
+    finally:
+        writer.close()
+
+
+async def wait_for_server(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run(args):
+    await wait_for_server(args.host, args.port)
+    rng = random.Random(args.seed)
+    latencies = []
+    per_client = args.requests // args.connections
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(args.host, args.port, args.endpoint, per_client, random.Random(rng.random()), latencies)
+        for _ in range(args.connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{args.endpoint}: {len(latencies)} requests over {args.connections} connections in {elapsed:.2f} s")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} req/s")
+    print(f"latency:    p50 {p50 * 1000:.2f} ms  p99 {p99 * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--endpoint', default='/verify', choices=['/verify', '/verify/batch', '/extract'])
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--spawn', action='store_true', help='start verification_server for this run')
+    parser.add_argument('--workers', type=int, default=None, help='server workers when spawning')
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        command = [sys.executable, os.path.join(ROOT, 'verification_server.py'),
+                   '--host', args.host, '--port', str(args.port)]
+        if args.workers is not None:
+            command += ['--workers', str(args.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Benchmark suite: throughput, latency percentiles and peak memory per hot path, with a regression gate
+
+Usage:
+    python benchmarks/run_suite.py --output benchmarks/baseline.json        # record a baseline
+    python benchmarks/run_suite.py --baseline benchmarks/baseline.json      # fails on a regression
+
+Every case runs over a seeded synthetic workload (benchmarks/synthetic.py),
+so runs with the same --seed, --scale and --kb are comparable. Latencies are
+per item from the fastest of --repeat passes; peak memory is the traced
+allocation high-water mark of a separate pass on a fresh analyzer, build
+included. The exit status is 1 when a gated metric of any case is worse than
+the baseline by more than its threshold, 2 when the baseline was recorded
+with a different workload.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis_session import AnalysisSession
+from medical_analyzer import MedicalAnalyzer
+from synthetic import PrescriptionGenerator
+
+# Metric -> whether larger is better; memory gets its own threshold
+GATED_METRICS = {'throughput': True, 'p50_us': False, 'p95_us': False, 'peak_kib': False}
+
+# Workload items per case at --scale 1
+CASE_SIZES = {
+    'extract': 5000,
+    'extract_misspelled': 2000,
+    'analyze': 20000,
+    'extract_analyze': 5000,
+    'session_edit': 10000,
+    'analyze_many': 50000,
+    'verify_pipeline': 5000,
+    'population_scoring': 200000,
+}
+
+
+def _extract(analyzer, texts):
+    for text in texts:
+        yield analyzer.extract_drugs_from_text(text)
+
+
+def _analyze(analyzer, prescriptions):
+    for drugs, age in prescriptions:
+        yield analyzer.analyze_prescription(drugs, age)
+
+
+def _extract_analyze(analyzer, cases):
+    for text, age in cases:
+        yield analyzer.analyze_prescription(analyzer.extract_drugs_from_text(text), age)
+
+
+def _session_edit(analyzer, edits):
+    # One medication changed per step, re-analyzed incrementally as in the app's manual entry
+    session = None
+    for drugs, age, index, drug in edits:
+        if session is None or session.age != age or len(session) != len(drugs):
+            session = AnalysisSession(analyzer, age, drugs)
+        session.replace(index % len(session), drug)
+        yield session.result()
+
+
+def _session_workload(generator, count):
+    edits = []
+    drugs, age = generator.prescription()
+    for i in range(count):
+        if i % 20 == 0:
+            drugs, age = generator.prescription()
+        replacement = generator.prescription()[0][0]
+        edits.append((drugs, age, generator.rng.randrange(len(drugs)), replacement))
+    return edits
+
+
+def _analyze_many(analyzer, prescriptions):
+    # One item: the whole batch, so the case reports throughput only
+    yield list(analyzer.analyze_many(prescriptions))
+
+
+def _verify_pipeline(analyzer, lines):
+    import verify_cli
+    # The single-worker pipeline, on this case's analyzer rather than one run_pipeline would load
+    verify_cli._worker_analyzer = analyzer
+    chunks = verify_cli._chunks(enumerate(lines, 1), 500)
+    yield [verify_cli.verify_chunk(chunk, 'jsonl')[0] for chunk in chunks]
+
+
+def _population_scoring(analyzer, prescriptions):
+    from population_scoring import PopulationScorer
+    scorer = PopulationScorer(analyzer)
+    drug_ids, ages, daily_doses = scorer.encode(prescriptions)
+    yield scorer.score(drug_ids, ages, daily_doses)
+
+
+def build_cases(seed, scale):
+    """{name: (runner, workload)}; a runner yields one result per item, or one for a whole batch"""
+    sizes = {name: max(1, int(size * scale)) for name, size in CASE_SIZES.items()}
+    generator = PrescriptionGenerator(seed)
+    cases = {
+        'extract': (_extract, generator.texts(sizes['extract'])),
+        'extract_misspelled': (_extract, PrescriptionGenerator(seed, misspell_rate=0.3).texts(
+            sizes['extract_misspelled'])),
+        'analyze': (_analyze, generator.prescriptions(sizes['analyze'])),
+        'extract_analyze': (_extract_analyze, [(generator.text(), generator.age())
+                                               for _ in range(sizes['extract_analyze'])]),
+        'session_edit': (_session_edit, _session_workload(generator, sizes['session_edit'])),
+        'analyze_many': (_analyze_many, PrescriptionGenerator(seed, ages='uniform').prescriptions(
+            sizes['analyze_many'])),
+        'verify_pipeline': (_verify_pipeline, [json.dumps(record) for record in
+                                               generator.records(sizes['verify_pipeline'])]),
+    }
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        cases['population_scoring'] = (_population_scoring, generator.prescriptions(sizes['population_scoring']))
+    return cases
+
+
+def percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * percent // 100)]
+
+
+def measure(runner, workload, make_analyzer, repeat):
+    """Throughput, latency percentiles and peak memory of one case"""
+    # Peak memory: a fresh analyzer, so its lazily built indexes count
+    tracemalloc.start()
+    for _ in runner(make_analyzer(), workload):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    analyzer = make_analyzer()
+    for _ in runner(analyzer, workload[:100]):      # warm the matcher, resolver and rule tables
+        pass
+    best_total = float('inf')
+    best_latencies = None
+    clock = time.perf_counter
+    for _ in range(repeat):
+        latencies = []
+        started = clock()
+        last = started
+        for _ in runner(analyzer, workload):
+            now = clock()
+            latencies.append(now - last)
+            last = now
+        total = last - started
+        if total < best_total:
+            best_total, best_latencies = total, latencies
+
+    result = {
+        'items': len(workload),
+        'seconds': best_total,
+        'throughput': len(workload) / best_total,
+        'peak_kib': peak / 1024,
+    }
+    if len(best_latencies) == len(workload):
+        best_latencies.sort()
+        for percent in (50, 95, 99):
+            result[f'p{percent}_us'] = percentile(best_latencies, percent) * 1e6
+    return result
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """(case, metric, baseline value, current value, change) for every gated regression"""
+    regressions = []
+    for name, current in results['cases'].items():
+        previous = baseline['cases'].get(name)
+        if previous is None:
+            continue
+        for metric, larger_is_better in GATED_METRICS.items():
+            if metric not in current or not previous.get(metric):
+                continue
+            change = current[metric] / previous[metric] - 1
+            if larger_is_better:
+                change = -change
+            limit = memory_threshold if metric == 'peak_kib' else threshold
+            if change > limit:
+                regressions.append((name, metric, previous[metric], current[metric], change))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'case':20} {'items':>7} {'items/s':>12} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} "
+          f"{'peak MiB':>9} {'vs base':>8}")
+    for name, case in results['cases'].items():
+        previous = (baseline or {}).get('cases', {}).get(name)
+        versus = f"{case['throughput'] / previous['throughput']:7.2f}x" if previous else ''
+        latencies = ' '.join(
+            f"{case[metric]:9.1f}" if metric in case else f"{'-':>9}" for metric in ('p50_us', 'p95_us', 'p99_us')
+        )
+        print(f"{name:20} {case['items']:>7} {case['throughput']:>12,.0f} {latencies} "
+              f"{case['peak_kib'] / 1024:>9.1f} {versus:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', help='comma-separated case names (default: all)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier on every workload size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--kb', help='SQLite knowledge base to analyze against (default: built-in data)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown in throughput, p50 and p95 (0.25 = 25%%)')
+    parser.add_argument('--memory-threshold', type=float, default=0.10, help='allowed growth in peak memory')
+    args = parser.parse_args()
+
+    workload = {'seed': args.seed, 'scale': args.scale, 'kb': args.kb and os.path.basename(args.kb)}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['workload'] != workload:
+            print(f"baseline workload {baseline['workload']} differs from this run's {workload}", file=sys.stderr)
+            return 2
+
+    if args.kb:
+        from knowledge_base import SqliteKnowledgeBase
+        make_analyzer = lambda: MedicalAnalyzer(SqliteKnowledgeBase(args.kb))
+    else:
+        make_analyzer = MedicalAnalyzer
+
+    cases = build_cases(args.seed, args.scale)
+    if args.cases:
+        unknown = set(args.cases.split(',')) - set(cases)
+        if unknown:
+            parser.error(f"unknown cases {sorted(unknown)}; available: {', '.join(cases)}")
+        cases = {name: case for name, case in cases.items() if name in args.cases.split(',')}
+
+    results = {
+        'workload': workload,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': {},
+    }
+    for name, (runner, items) in cases.items():
+        results['cases'][name] = measure(runner, items, make_analyzer, args.repeat)
+
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+    for name, metric, previous, current, change in regressions:
+        print(f"REGRESSION {name} {metric}: {previous:,.1f} -> {current:,.1f} ({change:.0%} worse)",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Seeded synthetic prescriptions for the benchmark suite
+
+    generator = PrescriptionGenerator(seed=42, drugs=(1, 5), ages='elderly')
+    texts = generator.texts(1000)                 # free-text prescriptions
+    prescriptions = generator.prescriptions(1000)  # [(drugs, age), ...]
+    records = generator.records(1000)              # verify_cli JSONL records
+
+The same seed and settings always produce the same workload.
+"""
+import random
+
+from medical_analyzer import DrugInfo
+
+# Built-in drug names and synonyms, plus interaction-only drugs written as-is
+DRUG_KEYWORDS = {
+    'paracetamol': ['paracetamol', 'acetaminophen', 'tylenol'],
+    'ibuprofen': ['ibuprofen', 'advil', 'nurofen'],
+    'aspirin': ['aspirin', 'acetylsalicylic acid'],
+    'codeine': ['codeine'],
+    'co-codamol': ['co-codamol'],
+    'tramadol': ['tramadol'],
+    'omeprazole': ['omeprazole', 'prilosec'],
+    'simvastatin': ['simvastatin', 'zocor'],
+    'warfarin': ['warfarin']
+}
+
+DOSAGES = ['{} mg', '{}mg', '{} MG', '{}mg tablets', '{} mg tabs']
+DOSE_AMOUNTS = [5, 10, 20, 30, 50, 75, 100, 200, 400, 500, 1000]
+OTHER_DOSAGES = ['0.5 g', '1g', '10 ml', '5ml', '75mcg', '8/500mg', '2 tablets', '']
+
+FREQUENCIES = [
+    'once daily', 'once a day', 'daily', 'od', 'twice daily', 'twice a day', '2 times a day', 'bd', 'bid',
+    'three times a day', '3x daily', 'tds', 'four times a day', 'qds', 'every 4 hours', 'every 6 hrs',
+    'as needed', 'prn', 'when required', ''
+]
+
+FILLER = ['patient', 'prescribed', 'take', 'with', 'food', 'for', 'pain', 'relief', 'and', 'review',
+          'in', 'two', 'weeks', 'after', 'meals', 'continue', 'stop', 'if', 'rash', 'develops',
+          'orally', 'reassess', 'at', 'follow-up', 'clinic', 'history', 'of', 'hypertension']
+
+# Age distributions: (low, high, weight) ranges sampled uniformly within
+AGE_DISTRIBUTIONS = {
+    'uniform': ((0, 100, 1),),
+    'pediatric': ((0, 1, 2), (2, 11, 5), (12, 17, 3)),
+    'adult': ((18, 65, 1),),
+    'elderly': ((66, 75, 3), (76, 100, 2)),
+    'mixed': ((0, 11, 1), (12, 17, 1), (18, 65, 5), (66, 75, 2), (76, 100, 1)),
+}
+
+
+class PrescriptionGenerator:
+    """Random prescriptions with a controlled mix of drugs, phrasing, length and ages
+
+    drugs and words are (min, max) ranges for drugs per prescription and
+    filler words per text; misspell_rate is the share of drug names written
+    with one typo.
+    """
+
+    def __init__(self, seed=42, drug_keywords=DRUG_KEYWORDS, drugs=(1, 5), words=(8, 30), ages='mixed',
+                 misspell_rate=0.0):
+        if ages not in AGE_DISTRIBUTIONS:
+            raise ValueError(f"Unknown age distribution {ages!r}; expected one of {sorted(AGE_DISTRIBUTIONS)}")
+        self.rng = random.Random(seed)
+        self.drug_keywords = drug_keywords
+        self.names = sorted(drug_keywords)
+        self.drugs = drugs
+        self.words = words
+        self.misspell_rate = misspell_rate
+        ranges = AGE_DISTRIBUTIONS[ages]
+        self._age_ranges = [(low, high) for low, high, _ in ranges]
+        self._age_weights = [weight for _, _, weight in ranges]
+
+    def age(self):
+        low, high = self.rng.choices(self._age_ranges, self._age_weights)[0]
+        return self.rng.randint(low, high)
+
+    def dosage(self):
+        if self.rng.random() < 0.15:
+            return self.rng.choice(OTHER_DOSAGES)
+        return self.rng.choice(DOSAGES).format(self.rng.choice(DOSE_AMOUNTS))
+
+    def frequency(self):
+        return self.rng.choice(FREQUENCIES)
+
+    def spelling(self, name):
+        """A synonym of a standard name, sometimes with one typo"""
+        keyword = self.rng.choice(self.drug_keywords[name])
+        if len(keyword) > 5 and self.rng.random() < self.misspell_rate:
+            i = self.rng.randrange(2, len(keyword) - 1)
+            keyword = keyword[:i] + keyword[i + 1:]
+        return keyword
+
+    def _regimen(self):
+        return self.rng.sample(self.names, min(self.rng.randint(*self.drugs), len(self.names)))
+
+    def text(self):
+        """One free-text prescription"""
+        words = [self.rng.choice(FILLER) for _ in range(self.rng.randint(*self.words))]
+        for name in self._regimen():
+            phrase = ' '.join(part for part in (self.spelling(name), self.dosage(), self.frequency()) if part)
+            words.insert(self.rng.randrange(len(words) + 1), phrase)
+        return ' '.join(words)
+
+    def prescription(self):
+        """(drugs, age) as entered in the form"""
+        drugs = [
+            DrugInfo(name.capitalize(), self.dosage(), self.frequency().capitalize())
+            for name in self._regimen()
+        ]
+        return drugs, self.age()
+
+    def record(self, text_share=0.5):
+        """A verify_cli input record, free text or structured"""
+        if self.rng.random() < text_share:
+            return {'age': self.age(), 'text': self.text()}
+        drugs, age = self.prescription()
+        return {'age': age, 'medications': [
+            {'name': drug.name, 'dosage': drug.dosage, 'frequency': drug.frequency} for drug in drugs
+        ]}
+
+    def texts(self, count):
+        return [self.text() for _ in range(count)]
+
+    def prescriptions(self, count):
+        return [self.prescription() for _ in range(count)]
+
+    def records(self, count, text_share=0.5):
+        return [self.record(text_share) for _ in range(count)]
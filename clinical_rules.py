@@ -0,0 +1,272 @@
+"""Clinical rules as structured data, compiled into per-age-band lookup tables
+
+A rule is a dict naming a finding code plus optional conditions:
+
+    {'code': 'reye_syndrome', 'age': {'ge': 12, 'lt': 18},
+     'severity': 'critical', 'score_delta': -0.4, 'once': True}
+
+`age` bounds use lt/le/gt/ge, `detail` fills the finding's {detail}, and
+`once` reports the rule once per prescription however often the drug is
+listed. Each drug record contributes rules derived from its flags
+(pediatric_safe, elderly_caution), contraindications and monitoring lists,
+plus any explicit "rules" entries. Compilation splits every drug's rules at
+their age thresholds, so analysis is a bisect over a handful of cut points
+and a table lookup, however many rules a drug has.
+
+    python clinical_rules.py [KB_SQLITE]      # rule count and lookup timings
+"""
+import sys
+import time
+from bisect import bisect_left, bisect_right
+
+from findings import ALTERNATIVES, FINDING_TYPES, RECOMMENDATIONS, WARNINGS, Finding
+
+# Report slots for drug findings, in the order they follow the age-band findings
+AGE_WARNINGS = 0
+DRUG_WARNINGS = 1
+DRUG_RECOMMENDATIONS = 2
+DRUG_ALTERNATIVES = 3
+
+SLOT_BY_CODE = {'not_pediatric': AGE_WARNINGS, 'reye_syndrome': AGE_WARNINGS}
+SLOT_BY_SECTION = {WARNINGS: DRUG_WARNINGS, RECOMMENDATIONS: DRUG_RECOMMENDATIONS, ALTERNATIVES: DRUG_ALTERNATIVES}
+
+# Prescription-wide rules, one set of findings per age band
+AGE_BAND_RULES = (
+    {'code': 'infant', 'age': {'lt': 2}, 'severity': 'high', 'score_delta': -0.2},
+    {'code': 'child', 'age': {'ge': 2, 'lt': 12}, 'severity': 'info'},
+    {'code': 'adolescent', 'age': {'ge': 12, 'lt': 18}, 'severity': 'info'},
+    {'code': 'very_elderly', 'age': {'gt': 75}, 'severity': 'high', 'score_delta': -0.15},
+    {'code': 'reduce_doses', 'age': {'gt': 75}},
+    {'code': 'frequent_monitoring', 'age': {'gt': 75}},
+    {'code': 'elderly', 'age': {'gt': 65, 'le': 75}, 'severity': 'moderate', 'score_delta': -0.1},
+    {'code': 'start_low', 'age': {'gt': 65, 'le': 75}},
+    {'code': 'falls_risk', 'age': {'gt': 65, 'le': 75}},
+)
+
+# An age threshold as a sort key: ages at the value fall above a (value, 0) cut
+# and below a (value, 1) cut
+_CUT_SIDES = {'lt': 0, 'ge': 0, 'le': 1, 'gt': 1}
+_ABOVE_CUT = {'lt': False, 'ge': True, 'le': False, 'gt': True}
+
+
+def check_age(age, context):
+    """Raise ValueError for an age condition with bounds other than lt/le/gt/ge"""
+    unknown = set(age) - set(_CUT_SIDES)
+    if unknown:
+        raise ValueError(f"Unknown age bound {sorted(unknown)} in {context}")
+
+
+def age_cuts(age):
+    """Cut points of one age condition"""
+    return [(value, _CUT_SIDES[op]) for op, value in age.items()]
+
+
+def age_holds(age, cuts, band):
+    """Whether an age condition holds for every age in `band` of the partition made by `cuts`"""
+    for op, value in age.items():
+        above = cuts.index((value, _CUT_SIDES[op])) < band
+        if above != _ABOVE_CUT[op]:
+            return False
+    return True
+
+
+def drug_rules(record):
+    """Structured rules for one drug record"""
+    rules = []
+    if not record.get('pediatric_safe', True):
+        rules.append({'code': 'not_pediatric', 'age': {'ge': 2, 'lt': 12}, 'severity': 'high', 'score_delta': -0.3})
+    if record.get('elderly_caution'):
+        rules.append({'code': 'elderly_dose_reduction', 'age': {'gt': 65}})
+    for contraindication in record.get('contraindications', ()):
+        if isinstance(contraindication, str):
+            # Free-text entries: only age limits can be checked, against the under-16 band
+            if 'age' not in contraindication:
+                continue
+            contraindication = {'text': contraindication, 'age': {'lt': 16}}
+        rules.append({
+            'code': 'contraindication', 'detail': contraindication['text'],
+            'age': contraindication.get('age', {}), 'severity': contraindication.get('severity', 'high')
+        })
+    for monitor in record.get('monitoring', ()):
+        rules.append({'code': 'monitor', 'detail': monitor})
+    rules.extend(record.get('rules', ()))
+    return rules
+
+
+class _Rule:
+    __slots__ = ('code', 'slot', 'detail', 'severity', 'score_delta', 'once', 'age', 'named')
+
+    def __init__(self, rule):
+        self.code = rule['code']
+        if self.code not in FINDING_TYPES:
+            raise ValueError(f"Unknown finding code in rule {rule!r}")
+        self.age = rule.get('age', {})
+        check_age(self.age, f"rule {rule!r}")
+        section, template = FINDING_TYPES[self.code]
+        self.slot = SLOT_BY_CODE.get(self.code, SLOT_BY_SECTION.get(section))
+        self.detail = rule.get('detail')
+        self.severity = rule.get('severity')
+        self.score_delta = rule.get('score_delta', 0.0)
+        self.once = rule.get('once', False)
+        self.named = '{subject}' in template
+
+    def cuts(self):
+        return age_cuts(self.age)
+
+    def applies(self, cuts, band):
+        return age_holds(self.age, cuts, band)
+
+
+def _partition(rules):
+    """Sorted cuts over every rule threshold, and the rules holding in each band"""
+    cuts = sorted({cut for rule in rules for cut in rule.cuts()})
+    bands = tuple(
+        tuple(rule for rule in rules if rule.applies(cuts, band))
+        for band in range(len(cuts) + 1)
+    )
+    return cuts, bands
+
+
+def coarser_band(own_cuts, cuts, band):
+    """Band of the `own_cuts` partition holding `band` of a finer partition `cuts`"""
+    return bisect_right(own_cuts, cuts[band - 1]) if band else 0
+
+
+class DrugRules:
+    """One drug's rules split into age bands; findings are built per display name on first use"""
+    __slots__ = ('cuts', 'bands', '_by_subject')
+
+    # Spellings of one drug name kept with their built findings
+    MAX_SUBJECTS = 64
+
+    def __init__(self, rules):
+        self.cuts, self.bands = _partition(rules)
+        self._by_subject = {}
+
+    def lookup(self, subject, age, make_finding):
+        """(slot, finding, once) for every rule that holds at `age`"""
+        band = bisect_left(self.cuts, (age, 0.5))
+        tables = self._by_subject.get(subject)
+        if tables is None:
+            if len(self._by_subject) >= self.MAX_SUBJECTS:
+                self._by_subject.clear()
+            tables = self._by_subject[subject] = [None] * len(self.bands)
+        entries = tables[band]
+        if entries is None:
+            entries = tables[band] = tuple(
+                (rule.slot,
+                 make_finding(rule.code, subject if rule.named else None, rule.detail, rule.severity, rule.score_delta),
+                 rule.once)
+                for rule in self.bands[band]
+            )
+        return entries
+
+
+_NO_RULES = DrugRules(())
+
+
+class RuleTables:
+    """Age-band and per-drug rule tables for one drug database
+
+    With eager=False (lazily decoded knowledge bases) a drug's rules are
+    compiled the first time a prescription references it.
+    """
+
+    def __init__(self, drug_database, make_finding=Finding, eager=True, band_rules=AGE_BAND_RULES):
+        start = time.perf_counter()
+        self.drug_database = drug_database
+        self._make_finding = make_finding
+        self._drugs = {}
+
+        band_rules = [_Rule(rule) for rule in band_rules]
+        self.band_cuts, bands = _partition(band_rules)
+        self.band_tables = []
+        for rules in bands:
+            sections = {WARNINGS: [], RECOMMENDATIONS: []}
+            deltas = []
+            for rule in rules:
+                finding = make_finding(rule.code, None, rule.detail, rule.severity, rule.score_delta)
+                sections[FINDING_TYPES[rule.code][0]].append(finding)
+                if rule.score_delta:
+                    deltas.append(rule.score_delta)
+            self.band_tables.append((tuple(sections[WARNINGS]), tuple(sections[RECOMMENDATIONS]), tuple(deltas)))
+        self.rule_count = len(band_rules)
+
+        if eager:
+            for name in drug_database:
+                self.drug_rules(name)
+        self.compile_seconds = time.perf_counter() - start
+
+    def band_findings(self, age):
+        """(warnings, recommendations, score deltas) of the age band rules"""
+        return self.band_tables[bisect_left(self.band_cuts, (age, 0.5))]
+
+    def drug_rules(self, name):
+        """Compiled rules for a lowercased drug name; drugs outside the database have none"""
+        compiled = self._drugs.get(name)
+        if compiled is None:
+            record = self.drug_database.get(name)
+            if record is None:
+                return _NO_RULES
+            rules = [_Rule(rule) for rule in drug_rules(record)]
+            compiled = self._drugs[name] = DrugRules(rules)
+            self.rule_count += len(rules)
+        return compiled
+
+    def drug_findings(self, subject, age):
+        """(slot, finding, once) entries for one drug as written on the prescription"""
+        return self.drug_rules(subject.lower()).lookup(subject, age, self._make_finding)
+
+    def report(self, ages=range(0, 100), repeat=20):
+        """Rule and band counts, compile time and mean lookup times in nanoseconds"""
+        names = list(self._drugs)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for age in ages:
+                self.band_findings(age)
+        band_ns = (time.perf_counter() - start) / (repeat * len(ages)) * 1e9
+
+        drug_ns = 0.0
+        if names:
+            for name in names:
+                for age in ages:
+                    self.drug_findings(name, age)       # build the findings once
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for name in names:
+                    for age in ages:
+                        self.drug_findings(name, age)
+            drug_ns = (time.perf_counter() - start) / (repeat * len(names) * len(ages)) * 1e9
+
+        return {
+            'rules': self.rule_count,
+            'drugs': len(self._drugs),
+            'age_bands': len(self.band_tables),
+            'drug_bands': sum(len(compiled.bands) for compiled in self._drugs.values()),
+            'compile_ms': self.compile_seconds * 1000,
+            'band_lookup_ns': band_ns,
+            'drug_lookup_ns': drug_ns,
+        }
+
+
+def main(argv):
+    if len(argv) > 1:
+        print("usage: python clinical_rules.py [KB_SQLITE]", file=sys.stderr)
+        return 2
+    from medical_analyzer import MedicalAnalyzer
+    if argv:
+        from knowledge_base import SqliteKnowledgeBase
+        analyzer = MedicalAnalyzer(SqliteKnowledgeBase(argv[0]))
+        for name in analyzer.drug_database:
+            analyzer.rules.drug_rules(name)
+    else:
+        analyzer = MedicalAnalyzer()
+    report = analyzer.rules.report()
+    print(f"{report['rules']} rules over {report['drugs']} drugs: {report['age_bands']} age bands, "
+          f"{report['drug_bands']} drug bands, compiled in {report['compile_ms']:.1f} ms")
+    print(f"lookup: age band {report['band_lookup_ns']:.0f} ns, drug {report['drug_lookup_ns']:.0f} ns")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,246 @@
+"""Daily dose totals per ingredient, checked against per-drug, per-age-band limits
+
+Dosage and frequency strings are parsed once into numbers (mg per unit and
+units per dose; doses per day) and cached per distinct string, so batch
+runs pay for each spelling once. Drug records give the limits:
+
+    'paracetamol': {'max_daily_dose': '4000mg',
+                    'dose_limits': [{'age': {'lt': 12}, 'max_daily_dose': '2000mg'}]}
+
+and combination products name their ingredients and default strength:
+
+    'co-codamol': {'ingredients': ['codeine', 'paracetamol'], 'strength': '8/500mg'}
+
+A prescription's total per ingredient sums every entry that contains it,
+so paracetamol listed twice, or alongside co-codamol, counts against one
+limit. Where several limits hold for an age band the lowest applies.
+"""
+import re
+from bisect import bisect_left
+
+from clinical_rules import age_cuts, age_holds, check_age
+from findings import Finding
+from prescription_parser import FREQUENCY_PATTERN
+
+# Finding for a daily total over its limit
+OVER_LIMIT_SEVERITY = 'critical'
+OVER_LIMIT_SCORE_DELTA = -0.3
+
+# Distinct dosage or frequency strings kept parsed before the cache is reset
+MAX_PARSED = 100000
+
+UNIT_MG = {'g': 1000.0, 'mg': 1.0, 'mcg': 0.001, 'µg': 0.001, 'ug': 0.001}
+
+DOSES_PER_DAY = {
+    'every_4_hours': 6,
+    'every_6_hours': 4,
+    'four_times': 4,
+    'three_times': 3,
+    'twice': 2,
+    'once': 1,
+    'as_needed': None,
+}
+
+_NUMBER = r'\d+(?:\.\d+)?'
+_UNIT = r'(mg|mcg|µg|ug|g)'
+# 120mg/5ml (liquid strength) and a volume taken
+CONCENTRATION_PATTERN = re.compile(rf'({_NUMBER})\s*{_UNIT}\s*/\s*({_NUMBER})?\s*ml\b')
+VOLUME_PATTERN = re.compile(rf'({_NUMBER})\s*ml\b')
+# 500mg, 1 g, 30/500mg (one amount per ingredient)
+STRENGTH_PATTERN = re.compile(rf'({_NUMBER}(?:\s*/\s*{_NUMBER})*)\s*{_UNIT}\b')
+# 2 tablets, 2 x 500mg, 500mg x 2
+COUNT_PATTERN = re.compile(
+    rf'({_NUMBER})\s*(?:x\s*)?(?:tablets?|tabs?|capsules?|caps?)\b'
+    rf'|\b({_NUMBER})\s*x\s*(?={_NUMBER})'
+    rf'|(?:mg|mcg|µg|ug|g)\s*x\s*({_NUMBER})\b'
+)
+EVERY_HOURS_PATTERN = re.compile(r'\bevery\s*(\d+)\s*(?:hours|hrs|h)\b')
+
+
+def parse_amount(text):
+    """Milligrams per unit in a strength like '500mg' or '30/500mg', as a tuple; None if absent"""
+    match = STRENGTH_PATTERN.search(text.lower())
+    if not match:
+        return None
+    factor = UNIT_MG[match.group(2)]
+    return tuple(float(value) * factor for value in match.group(1).split('/'))
+
+
+def parse_dose(dosage):
+    """(mg per unit per ingredient or None, units per dose) for a dosage string, or None
+
+    '1g' -> ((1000.0,), 1.0); '2 tablets' -> (None, 2.0); '30/500mg x 2' ->
+    ((30.0, 500.0), 2.0); '120mg/5ml 10ml' -> ((240.0,), 1.0). Volumes
+    without a strength cannot be converted and give None, as does anything
+    that is not a string.
+    """
+    if not isinstance(dosage, str):
+        return None
+    text = dosage.lower()
+    concentration = CONCENTRATION_PATTERN.search(text)
+    if concentration:
+        rest = text[:concentration.start()] + ' ' + text[concentration.end():]
+        volume = VOLUME_PATTERN.search(rest)
+        if volume is None:
+            return None
+        per_ml = float(concentration.group(1)) * UNIT_MG[concentration.group(2)] / float(concentration.group(3) or 1)
+        return (per_ml * float(volume.group(1)),), 1.0
+
+    count = COUNT_PATTERN.search(text)
+    units = float(next(group for group in count.groups() if group)) if count else 1.0
+    amounts = parse_amount(text)
+    if amounts is None and count is None:
+        return None
+    return amounts, units
+
+
+def parse_doses_per_day(frequency):
+    """Doses per day for a frequency phrase; None for as-needed or unrecognised schedules"""
+    if not isinstance(frequency, str):
+        return None
+    text = frequency.lower()
+    every = EVERY_HOURS_PATTERN.search(text)
+    if every and int(every.group(1)):
+        return 24 / int(every.group(1))
+    match = FREQUENCY_PATTERN.search(text)
+    return DOSES_PER_DAY[match.lastgroup] if match else None
+
+
+class _Limits:
+    """One ingredient's maximum daily dose per age band"""
+    __slots__ = ('cuts', 'bands')
+
+    def __init__(self, record, name):
+        base = parse_amount(record['max_daily_dose'])[0] if record.get('max_daily_dose') else None
+        conditions = []
+        for entry in record.get('dose_limits', ()):
+            check_age(entry.get('age', {}), f"dose limit of {name!r}")
+            conditions.append((entry.get('age', {}), parse_amount(entry['max_daily_dose'])[0]))
+        self.cuts = sorted({cut for age, _ in conditions for cut in age_cuts(age)})
+        self.bands = []
+        for band in range(len(self.cuts) + 1):
+            limits = [limit for age, limit in conditions if age_holds(age, self.cuts, band)]
+            if base is not None:
+                limits.append(base)
+            self.bands.append(min(limits) if limits else None)
+
+    def at(self, age):
+        return self.bands[bisect_left(self.cuts, (age, 0.5))]
+
+
+class _Product:
+    """How one drug's entries turn into ingredient amounts"""
+    __slots__ = ('ingredients', 'strength')
+
+    def __init__(self, ingredients, strength):
+        self.ingredients = ingredients
+        self.strength = strength
+
+
+_NO_PRODUCT = _Product((), None)
+
+
+class DoseEngine:
+    """Parsed dose quantities and compiled daily limits for one drug database"""
+
+    def __init__(self, drug_database, make_finding=Finding):
+        self.drug_database = drug_database
+        self._make_finding = make_finding
+        self._doses = {}            # dosage string -> parse_dose()
+        self._frequencies = {}      # frequency string -> parse_doses_per_day()
+        self._products = {}         # drug name -> _Product
+        self._limits = {}           # ingredient -> _Limits, or None without limits
+
+    def dose(self, dosage):
+        """parse_dose(), cached per distinct string"""
+        try:
+            return self._doses[dosage]
+        except KeyError:
+            if len(self._doses) >= MAX_PARSED:
+                self._doses.clear()
+            parsed = self._doses[dosage] = parse_dose(dosage)
+            return parsed
+
+    def doses_per_day(self, frequency):
+        """parse_doses_per_day(), cached per distinct string"""
+        try:
+            return self._frequencies[frequency]
+        except KeyError:
+            if len(self._frequencies) >= MAX_PARSED:
+                self._frequencies.clear()
+            parsed = self._frequencies[frequency] = parse_doses_per_day(frequency)
+            return parsed
+
+    def limits(self, ingredient):
+        """Compiled limits for an ingredient, or None when it has none"""
+        try:
+            return self._limits[ingredient]
+        except KeyError:
+            record = self.drug_database.get(ingredient)
+            limits = None
+            if record is not None and (record.get('max_daily_dose') or record.get('dose_limits')):
+                limits = _Limits(record, ingredient)
+            self._limits[ingredient] = limits
+            return limits
+
+    def product(self, name):
+        """Ingredients with limits, and default strength, of a lowercased drug name"""
+        product = self._products.get(name)
+        if product is None:
+            record = self.drug_database.get(name)
+            if record is None:
+                return _NO_PRODUCT
+            ingredients = tuple(record.get('ingredients', (name,)))
+            strength = parse_amount(record['strength']) if record.get('strength') else None
+            if not any(self.limits(ingredient) for ingredient in ingredients):
+                ingredients = ()
+            product = self._products[name] = _Product(ingredients, strength)
+        return product
+
+    def daily_amounts(self, drug):
+        """((ingredient, mg per day), ...) for one entry; empty when the dose or schedule is unknown or assumed"""
+        product = self.product(drug.name.lower())
+        if not product.ingredients or not isinstance(drug.dosage, str) or not isinstance(drug.frequency, str):
+            return ()
+        if not drug.dosage or not drug.frequency or drug.dosage_assumed:
+            return ()
+        parsed = self.dose(drug.dosage)
+        per_day = self.doses_per_day(drug.frequency)
+        if parsed is None or per_day is None:
+            return ()
+        amounts, units = parsed
+        if amounts is None or (len(amounts) == 1 and len(product.ingredients) > 1
+                               and product.strength and amounts[0] in product.strength):
+            # A unit count, or one ingredient's part of the standard strength
+            amounts = product.strength
+        if amounts is None or len(amounts) != len(product.ingredients):
+            return ()
+        return tuple(
+            (ingredient, amount * units * per_day)
+            for ingredient, amount in zip(product.ingredients, amounts)
+            if self.limits(ingredient)
+        )
+
+    def regimen_findings(self, entries, age):
+        """'daily_dose_exceeded' findings for (lowercased name, daily_amounts()) entries"""
+        totals = {}
+        sources = {}
+        for name, amounts in entries:
+            for ingredient, amount in amounts:
+                totals[ingredient] = totals.get(ingredient, 0.0) + amount
+                sources.setdefault(ingredient, []).append(name)
+        found = []
+        for ingredient, total in totals.items():
+            limit = self._limits[ingredient].at(age)
+            if limit is None or total <= limit:
+                continue
+            names = sources[ingredient]
+            origin = ''
+            if len(names) > 1 or names[0] != ingredient:
+                origin = f" ({' + '.join(name.capitalize() for name in names)})"
+            found.append(self._make_finding(
+                'daily_dose_exceeded', ingredient.capitalize(),
+                f"{total:g} mg/day{origin} exceeds the {limit:g} mg/day maximum",
+                OVER_LIMIT_SEVERITY, OVER_LIMIT_SCORE_DELTA
+            ))
+        return found
@@ -0,0 +1,110 @@
+from collections import deque
+
+
+class DrugMention:
+    """A single drug mention found in prescription text"""
+    __slots__ = ('start', 'end', 'drug', 'keyword')
+
+    def __init__(self, start, end, drug, keyword):
+        self.start = start
+        self.end = end
+        self.drug = drug
+        self.keyword = keyword
+
+    def __repr__(self):
+        return f"DrugMention({self.start}, {self.end}, {self.drug!r}, {self.keyword!r})"
+
+
+class DrugMatcher:
+    """Aho-Corasick automaton over drug names and synonyms.
+
+    Built once from a {standard_name: [keywords]} mapping; each call to
+    find_mentions() scans the text in a single pass regardless of how many
+    keywords are loaded.
+    """
+
+    def __init__(self, drug_keywords):
+        # Trie stored as parallel lists indexed by state id
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]       # (keyword length, standard name, keyword) ending here
+        self._dict_link = [0]       # nearest proper suffix state with an output
+        self.keyword_count = 0
+
+        for standard_name, keywords in drug_keywords.items():
+            for keyword in keywords:
+                self._add(keyword.lower(), standard_name)
+        self._build_links()
+
+    def _add(self, keyword, standard_name):
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+            state = next_state
+        if self._output[state] is None:
+            self.keyword_count += 1
+            self._output[state] = (len(keyword), standard_name, keyword)
+
+    def _build_links(self):
+        # Breadth-first so every fail target is finalised before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fail_state = self._fail[child]
+                self._dict_link[child] = fail_state if self._output[fail_state] else self._dict_link[fail_state]
+
+    def find_mentions(self, text):
+        """Return non-overlapping, word-bounded mentions ordered by position.
+
+        `text` is expected to be lowercased already. Where candidate matches
+        overlap the leftmost one wins, and of those the longest.
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        dict_link = self._dict_link
+        text_length = len(text)
+
+        candidates = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            hit = state if output[state] else dict_link[state]
+            while hit:
+                length, standard_name, keyword = output[hit]
+                start = index - length + 1
+                end = index + 1
+                # Word boundaries: no alphanumeric character directly either side
+                if (start == 0 or not text[start - 1].isalnum()) and \
+                        (end == text_length or not text[end].isalnum()):
+                    candidates.append((start, -length, standard_name, keyword))
+                hit = dict_link[hit]
+
+        candidates.sort()
+        mentions = []
+        last_end = 0
+        for start, negative_length, standard_name, keyword in candidates:
+            if start < last_end:
+                continue
+            last_end = start - negative_length
+            mentions.append(DrugMention(start, last_end, standard_name, keyword))
+        return mentions
@@ -0,0 +1,233 @@
+from zlib import crc32
+
+# Trigram signature width: 512 bits
+SIGNATURE_MASK = 511
+
+
+class Candidate:
+    """A vocabulary entry close to a queried name"""
+    __slots__ = ('drug', 'keyword', 'distance')
+
+    def __init__(self, drug, keyword, distance):
+        self.drug = drug
+        self.keyword = keyword
+        self.distance = distance
+
+    def __repr__(self):
+        return f"Candidate({self.drug!r}, {self.keyword!r}, {self.distance})"
+
+
+def normalize(name):
+    """Lowercase with runs of whitespace collapsed"""
+    return ' '.join(name.lower().split())
+
+
+def max_edits(name):
+    """Typos tolerated for a name of this length: none below 4 characters, 1 up to 8, then 2"""
+    if len(name) < 4:
+        return 0
+    return 1 if len(name) <= 8 else 2
+
+
+def trigrams(name):
+    """Distinct trigrams of a name padded at both ends"""
+    padded = f'^{name}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def signature(name):
+    """Trigrams of a name hashed onto the bits of one integer (stable across processes)"""
+    bits = 0
+    for gram in trigrams(name):
+        bits |= 1 << (crc32(gram.encode()) & SIGNATURE_MASK)
+    return bits
+
+
+def segments(length, parts):
+    """(start, size) of `parts` near-equal pieces covering a string of `length`"""
+    size, longer = divmod(length, parts)
+    pieces = []
+    start = 0
+    for index in range(parts):
+        piece = size + (index >= parts - longer)
+        pieces.append((start, piece))
+        start += piece
+    return pieces
+
+
+def swap_positions(length, max_distance):
+    """Positions where a swap of adjacent letters can straddle a keyword's segment boundary"""
+    positions = set()
+    for keyword_length in range(max(1, length - max_distance), length + max_distance + 1):
+        for start, _ in segments(keyword_length, max_distance + 1)[1:]:
+            positions.update(range(max(0, start - max_distance), min(length - 1, start + max_distance)))
+    return sorted(positions)
+
+
+def edit_distance(a, b, limit):
+    """Edit distance counting a swap of adjacent letters as one typo
+
+    Returns limit + 1 as soon as the distance must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Only the part between a shared prefix and suffix needs the full table
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a or not b:
+        return max(len(a), len(b))
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class DrugNameResolver:
+    """Misspelling-tolerant lookup of drug names and synonyms.
+
+    Built once from a {standard_name: [keywords]} mapping. Each keyword is
+    indexed by its pieces when cut into 2 and into 3 near-equal segments. A
+    name within k edits of a keyword leaves at least one of the keyword's
+    k + 1 segments intact, at most k characters from where it started. A
+    query probes the exact (length, segment) keys for k + 1 parts; a single
+    segment hit is enough to shortlist a keyword. The shortlist is filtered
+    by a bitmask of trigrams, and only the few left get an edit distance
+    check. Swapped adjacent letters count as one typo and are tried
+    separately, since a swap can straddle two segments.
+    """
+
+    # Typos the segment index can find (keywords are cut into up to MAX_DISTANCE + 1 pieces)
+    MAX_DISTANCE = 2
+
+    def __init__(self, drug_keywords):
+        self.keywords = []          # keyword ID -> keyword
+        self.drugs = []             # keyword ID -> standard name
+        self._exact = {}            # keyword -> keyword ID
+        self._signatures = []       # keyword ID -> trigram signature
+        self._segments = {}         # (length, parts, index, piece) -> [keyword IDs]
+        for standard_name, keywords in drug_keywords.items():
+            for keyword in keywords:
+                self._add(normalize(keyword), standard_name)
+
+    def _add(self, keyword, standard_name):
+        if not keyword or keyword in self._exact:
+            return
+        keyword_id = self._exact[keyword] = len(self.keywords)
+        self.keywords.append(keyword)
+        self.drugs.append(standard_name)
+        self._signatures.append(signature(keyword))
+        length = len(keyword)
+        for parts in range(2, self.MAX_DISTANCE + 2):
+            if length < parts:
+                continue
+            for index, (start, piece) in enumerate(segments(length, parts)):
+                key = (length, parts, index, keyword[start:start + piece])
+                self._segments.setdefault(key, []).append(keyword_id)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def _near(self, name, max_distance, found, lost_per_typo=4):
+        """Add the IDs of keywords within reach of `name` to `found`
+
+        A typo removes at most lost_per_typo of the name's trigrams: 3 for an
+        edit, 4 for a swap of adjacent letters.
+        """
+        if not max_distance:
+            keyword_id = self._exact.get(name)
+            if keyword_id is not None:
+                found.add(keyword_id)
+            return
+        parts = max_distance + 1
+        length = len(name)
+        hits = set()
+        for keyword_length in range(max(parts, length - max_distance), length + max_distance + 1):
+            for index, (start, piece) in enumerate(segments(keyword_length, parts)):
+                for position in range(max(0, start - max_distance), min(length - piece, start + max_distance) + 1):
+                    keyword_ids = self._segments.get((keyword_length, parts, index, name[position:position + piece]))
+                    if keyword_ids:
+                        hits.update(keyword_ids)
+
+        # A match keeps all but lost_per_typo * k of the name's signature bits
+        bits = signature(name)
+        required = bin(bits).count('1') - lost_per_typo * max_distance
+        signatures = self._signatures
+        for keyword_id in hits:
+            if bin(bits & signatures[keyword_id]).count('1') >= required:
+                found.add(keyword_id)
+
+    def candidates(self, name, limit=5, max_distance=None):
+        """Closest keywords to `name`, best first, at most one per standard name
+
+        Searches one typo away first and only widens the search, up to
+        max_distance, when nothing closer exists.
+        """
+        name = normalize(name)
+        keyword_id = self._exact.get(name)
+        if keyword_id is not None:
+            return [Candidate(self.drugs[keyword_id], name, 0)]
+        if max_distance is None:
+            max_distance = max_edits(name)
+        for distance in range(1, min(max_distance, self.MAX_DISTANCE) + 1):
+            found = self._within(name, distance)
+            if found:
+                return sorted(found.values(), key=lambda candidate: (candidate.distance, candidate.keyword))[:limit]
+        return []
+
+    def _within(self, name, max_distance):
+        """{standard name: best Candidate} for keywords within max_distance typos"""
+        shortlist = set()
+        if max_distance == 1:
+            # Single swaps are cheap to undo everywhere, so the segment search
+            # only has to allow for edits
+            self._near(name, 1, shortlist, lost_per_typo=3)
+            positions = range(len(name) - 1)
+        else:
+            # A swap inside a segment is caught like any edit; one across a
+            # segment boundary breaks two segments, so retry with it undone
+            self._near(name, max_distance, shortlist)
+            positions = swap_positions(len(name), max_distance)
+        for position in positions:
+            if name[position] != name[position + 1]:
+                swapped = name[:position] + name[position + 1] + name[position] + name[position + 2:]
+                self._near(swapped, max_distance - 1, shortlist)
+
+        found = {}
+        for keyword_id in shortlist:
+            keyword = self.keywords[keyword_id]
+            distance = edit_distance(name, keyword, max_distance)
+            if distance > max_distance:
+                continue
+            drug = self.drugs[keyword_id]
+            best = found.get(drug)
+            if best is None or (distance, keyword) < (best.distance, best.keyword):
+                found[drug] = Candidate(drug, keyword, distance)
+        return found
+
+    def resolve(self, name):
+        """Standard name for an exact or unambiguous near match, else None"""
+        found = self.candidates(name, limit=2)
+        if not found:
+            return None
+        if len(found) > 1 and found[1].distance == found[0].distance:
+            return None
+        return found[0].drug
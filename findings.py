@@ -0,0 +1,120 @@
+"""Structured analysis findings and their lazily rendered report text
+
+A finding is a small tuple of (code, subject, detail, severity, score_delta).
+Subjects and details point at strings the knowledge base already holds, and
+findings with no subject are shared module-level constants, so a result
+costs a few pointers per finding. Text is produced only when a result is
+displayed or exported.
+"""
+from collections import namedtuple
+
+INTERACTIONS = 'interactions'
+WARNINGS = 'warnings'
+RECOMMENDATIONS = 'recommendations'
+ALTERNATIVES = 'alternatives'
+
+# code -> (report section, text template)
+FINDING_TYPES = {
+    # Interactions
+    'interaction': (INTERACTIONS, "⚠ {subject}: {detail}"),
+    'no_interactions': (INTERACTIONS, "✅ No significant drug interactions detected in current database"),
+    # Warnings
+    'infant': (WARNINGS, "👶 Infant: Very limited medication options - specialist consultation required"),
+    'child': (WARNINGS, "👶 Child: Weight-based dosing required"),
+    'not_pediatric': (WARNINGS, "🚨 {subject}: Not recommended for children"),
+    'adolescent': (WARNINGS, "👦 Adolescent: Verify age-appropriate formulations"),
+    'reye_syndrome': (WARNINGS, "🚨 Aspirin: Risk of Reye's syndrome in adolescents"),
+    'very_elderly': (WARNINGS, "👴 Very elderly: High risk for drug sensitivity and interactions"),
+    'elderly': (WARNINGS, "👴 Elderly patient: Increased risk of adverse effects"),
+    'contraindication': (WARNINGS, "🚨 {subject}: {detail}"),
+    'risk_burden': (WARNINGS, "⚠ Cumulative {detail}: {subject}"),
+    'daily_dose_exceeded': (WARNINGS, "🚨 Daily dose of {subject}: {detail}"),
+    'standard_precautions': (WARNINGS, "ℹ Standard monitoring and precautions apply"),
+    # Recommendations
+    'reduce_doses': (RECOMMENDATIONS, "Consider 25-50% dose reduction for most medications"),
+    'frequent_monitoring': (RECOMMENDATIONS, "Implement frequent monitoring protocols"),
+    'start_low': (RECOMMENDATIONS, "Start with lower doses and titrate carefully"),
+    'falls_risk': (RECOMMENDATIONS, "Monitor for falls risk and cognitive effects"),
+    'elderly_dose_reduction': (RECOMMENDATIONS, "{subject}: Consider dose reduction in elderly"),
+    'monitor': (RECOMMENDATIONS, "{subject}: Monitor {detail}"),
+    'dosing_appropriate': (RECOMMENDATIONS, "💊 Current dosages and frequencies appear appropriate"),
+    # Alternatives
+    'first_line_paracetamol': (ALTERNATIVES, "🔄 Consider paracetamol as first-line analgesic"),
+    'topical_nsaids': (ALTERNATIVES, "🔄 Topical NSAIDs for localized pain"),
+    'non_pharmacological': (ALTERNATIVES, "🔄 Non-pharmacological interventions (physiotherapy, heat/cold)"),
+    'replace_aspirin': (ALTERNATIVES, "🔄 Replace aspirin with paracetamol or ibuprofen"),
+    'topical_diclofenac': (ALTERNATIVES, "🔄 Consider topical diclofenac instead of oral ibuprofen"),
+    'choices_sound': (ALTERNATIVES, "✅ Current medication choices are clinically sound"),
+}
+
+
+class Finding(namedtuple('Finding', 'code subject detail severity score_delta')):
+    """One analysis finding; `subject` is a drug name or a (drug, drug) pair"""
+    __slots__ = ()
+
+    @property
+    def section(self):
+        return FINDING_TYPES[self.code][0]
+
+    def render(self):
+        template = FINDING_TYPES[self.code][1]
+        subject = self.subject
+        if isinstance(subject, tuple):
+            subject = ' + '.join(name.capitalize() for name in subject)
+        return template.format(subject=subject, detail=self.detail)
+
+
+def _constant(code, severity=None, score_delta=0.0):
+    return Finding(code, None, None, severity, score_delta)
+
+
+# Findings without a subject are shared by every result that reports them
+NO_INTERACTIONS = _constant('no_interactions')
+INFANT = _constant('infant', 'high', -0.2)
+CHILD = _constant('child', 'info')
+ADOLESCENT = _constant('adolescent', 'info')
+REYE_SYNDROME = _constant('reye_syndrome', 'critical', -0.4)
+VERY_ELDERLY = _constant('very_elderly', 'high', -0.15)
+ELDERLY = _constant('elderly', 'moderate', -0.1)
+STANDARD_PRECAUTIONS = _constant('standard_precautions')
+REDUCE_DOSES = _constant('reduce_doses')
+FREQUENT_MONITORING = _constant('frequent_monitoring')
+START_LOW = _constant('start_low')
+FALLS_RISK = _constant('falls_risk')
+DOSING_APPROPRIATE = _constant('dosing_appropriate')
+FIRST_LINE_PARACETAMOL = _constant('first_line_paracetamol')
+TOPICAL_NSAIDS = _constant('topical_nsaids')
+NON_PHARMACOLOGICAL = _constant('non_pharmacological')
+REPLACE_ASPIRIN = _constant('replace_aspirin')
+TOPICAL_DICLOFENAC = _constant('topical_diclofenac')
+CHOICES_SOUND = _constant('choices_sound')
+
+CONSTANT_FINDINGS = {
+    finding.code: finding for finding in (
+        NO_INTERACTIONS, INFANT, CHILD, ADOLESCENT, REYE_SYNDROME, VERY_ELDERLY, ELDERLY,
+        STANDARD_PRECAUTIONS, REDUCE_DOSES, FREQUENT_MONITORING, START_LOW, FALLS_RISK,
+        DOSING_APPROPRIATE, FIRST_LINE_PARACETAMOL, TOPICAL_NSAIDS, NON_PHARMACOLOGICAL,
+        REPLACE_ASPIRIN, TOPICAL_DICLOFENAC, CHOICES_SOUND
+    )
+}
+
+_DEFAULTS = (None, None, None, 0.0)
+
+
+def encode_finding(finding):
+    """Compact JSON-ready form: a bare code for constants, else a list without trailing defaults"""
+    if CONSTANT_FINDINGS.get(finding.code) == finding:
+        return finding.code
+    values = list(finding)
+    while len(values) > 1 and values[-1] == _DEFAULTS[len(values) - 2]:
+        values.pop()
+    return values
+
+
+def decode_finding(value):
+    if isinstance(value, str):
+        return CONSTANT_FINDINGS[value]
+    code, *rest = value
+    rest += _DEFAULTS[len(rest):]
+    subject = rest[0]
+    return Finding(code, tuple(subject) if isinstance(subject, list) else subject, *rest[1:])
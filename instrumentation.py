@@ -0,0 +1,192 @@
+"""Opt-in per-stage timing and single-request profiling for the verification pipeline
+
+    from instrumentation import STAGE_TIMINGS
+    STAGE_TIMINGS.enable()              # or PRESCRIPTION_TIMING=1 in the environment
+    analyzer.analyze_prescription(drugs, age)
+    print(STAGE_TIMINGS.to_prometheus())
+
+Stages record into fixed-bucket histograms. Hot paths take a lap clock once
+per call; while timing is disabled that clock is None and every lap is a
+skipped `if`, so the disabled cost is one attribute check per call.
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Histogram bucket upper bounds in seconds (the last bucket is +Inf)
+BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0
+)
+
+
+class Histogram:
+    """Observation counts per bucket, plus their count and sum"""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.total, 'buckets': list(self.counts)}
+
+
+class _Clock:
+    """Times consecutive phases of one call"""
+    __slots__ = ('_timings', '_start', '_last')
+
+    def __init__(self, timings):
+        self._timings = timings
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        """Record the time since the previous lap (or the start) under `stage`"""
+        now = time.perf_counter()
+        self._timings.observe(stage, now - self._last)
+        self._last = now
+
+    def stop(self, stage):
+        """Record the whole call, from the clock's start, under `stage`"""
+        self._timings.observe(stage, time.perf_counter() - self._start)
+
+
+class _Stage:
+    __slots__ = ('_timings', '_stage', '_start')
+
+    def __init__(self, timings, stage):
+        self._timings = timings
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._timings.observe(self._stage, time.perf_counter() - self._start)
+
+
+_DISABLED_STAGE = nullcontext()
+
+
+class StageTimings:
+    """Thread-safe registry of per-stage latency histograms"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clock(self):
+        """A lap clock for one call, or None while timing is disabled"""
+        return _Clock(self) if self.enabled else None
+
+    def stage(self, stage):
+        """Context manager timing a block under `stage`"""
+        return _Stage(self, stage) if self.enabled else _DISABLED_STAGE
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def histograms(self):
+        """{stage: Histogram} copy, sorted by stage name"""
+        with self._lock:
+            return {stage: self._copy(histogram) for stage, histogram in sorted(self._histograms.items())}
+
+    @staticmethod
+    def _copy(histogram):
+        copy = Histogram()
+        copy.counts = list(histogram.counts)
+        copy.total = histogram.total
+        copy.count = histogram.count
+        return copy
+
+    def snapshot(self):
+        """JSON-ready {stage: {"count", "sum", "buckets"}}"""
+        return {stage: histogram.to_dict() for stage, histogram in self.histograms().items()}
+
+    def drain(self):
+        """Snapshot and reset; worker processes hand their timings to the parent this way"""
+        with self._lock:
+            drained = {stage: histogram.to_dict() for stage, histogram in self._histograms.items()}
+            self._histograms = {}
+        return drained
+
+    def merge(self, snapshot):
+        """Add a snapshot() or drain() result from another registry"""
+        with self._lock:
+            for stage, data in snapshot.items():
+                histogram = self._histograms.get(stage)
+                if histogram is None:
+                    histogram = self._histograms[stage] = Histogram()
+                histogram.counts = [a + b for a, b in zip(histogram.counts, data['buckets'])]
+                histogram.total += data['sum']
+                histogram.count += data['count']
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def to_json(self):
+        """Bucket bounds and every stage's histogram"""
+        return {'buckets': list(BUCKETS) + ['+Inf'], 'stages': self.snapshot()}
+
+    def to_prometheus(self, name='prescription_stage_seconds'):
+        """Prometheus text exposition format, one histogram labelled by stage"""
+        lines = [
+            f"# HELP {name} Time spent in each verification pipeline stage.",
+            f"# TYPE {name} histogram"
+        ]
+        for stage, histogram in self.histograms().items():
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else repr(bound)
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def profile_call(func, *args, sort='cumulative', limit=30, **kwargs):
+    """Run one call under cProfile; returns (result, report text of the top `limit` functions)"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+    return result, report.getvalue()
+
+
+# Process-wide registry used by the analyzer, the CLI, the service and the app
+STAGE_TIMINGS = StageTimings(enabled=os.environ.get('PRESCRIPTION_TIMING') == '1')
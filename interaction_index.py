@@ -0,0 +1,88 @@
+class InteractionIndex:
+    """Drug interactions stored as per-drug neighbor maps over interned integer IDs.
+
+    Keys are normalized once at load time (lowercased, order-independent), so
+    ('omeprazole', 'aspirin') and ('aspirin', 'omeprazole') are the same pair.
+    """
+
+    def __init__(self, interactions=None):
+        self.ids = {}           # drug name -> integer ID
+        self.names = []         # integer ID -> drug name
+        self.neighbors = []     # integer ID -> {neighbor ID: interaction}
+        self.pair_count = 0
+        for (drug1, drug2), interaction in (interactions or {}).items():
+            self.add(drug1, drug2, interaction)
+
+    def intern(self, name):
+        """Return the ID for a drug name, assigning a new one if needed"""
+        name = name.strip().lower()
+        drug_id = self.ids.get(name)
+        if drug_id is None:
+            drug_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.neighbors.append({})
+        return drug_id
+
+    def add(self, drug1, drug2, interaction):
+        """Register an interaction; either order of the pair finds it"""
+        id1 = self.intern(drug1)
+        id2 = self.intern(drug2)
+        if id2 not in self.neighbors[id1]:
+            self.pair_count += 1
+        self.neighbors[id1][id2] = interaction
+        self.neighbors[id2][id1] = interaction
+
+    def pairs(self):
+        """Every interaction once, as (drug1, drug2, interaction)"""
+        for id1, neighbors in enumerate(self.neighbors):
+            for id2, interaction in neighbors.items():
+                if id1 <= id2:
+                    yield self.names[id1], self.names[id2], interaction
+
+    def drug_names(self):
+        """Every drug name in at least one interaction"""
+        return [name for name, neighbors in zip(self.names, self.neighbors) if neighbors]
+
+    def lookup(self, drug1, drug2):
+        """Interaction between two drugs, or None"""
+        id1 = self.ids.get(drug1.lower())
+        id2 = self.ids.get(drug2.lower())
+        if id1 is None or id2 is None:
+            return None
+        return self.neighbors[id1].get(id2)
+
+    def find_interactions(self, drug_names):
+        """All interacting pairs on a prescription as (i, j, interaction), i < j.
+
+        `drug_names` are lowercased names; i and j index into it. Each drug
+        only visits its own neighbors, or the rest of the prescription when
+        that is the shorter list.
+        """
+        ids = [self.ids.get(name) for name in drug_names]
+        positions = {}
+        for position, drug_id in enumerate(ids):
+            if drug_id is not None:
+                positions.setdefault(drug_id, []).append(position)
+
+        found = []
+        for i, drug_id in enumerate(ids):
+            if drug_id is None:
+                continue
+            neighbors = self.neighbors[drug_id]
+            if not neighbors:
+                continue
+            if len(neighbors) < len(ids) - i:
+                for neighbor_id, interaction in neighbors.items():
+                    for j in positions.get(neighbor_id, ()):
+                        if j > i:
+                            found.append((i, j, interaction))
+            else:
+                for j in range(i + 1, len(ids)):
+                    interaction = neighbors.get(ids[j])
+                    if interaction is not None:
+                        found.append((i, j, interaction))
+        found.sort(key=lambda pair: (pair[0], pair[1]))
+        return found
+
+    def __len__(self):
+        return self.pair_count
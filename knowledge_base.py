@@ -0,0 +1,243 @@
+"""Compiled on-disk knowledge base for MedicalAnalyzer
+
+Build step (offline), from JSON drug records and a CSV of interaction pairs:
+
+    python knowledge_base.py data/drugs.json data/interactions.csv knowledge_base.sqlite
+
+The result is a read-only SQLite file opened with memory-mapped I/O. Drug and
+interaction records are decoded only when a prescription references them, so
+startup cost and memory stay flat as the formulary grows.
+"""
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+SCHEMA = """
+CREATE TABLE drugs (name TEXT PRIMARY KEY, record TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE keywords (keyword TEXT PRIMARY KEY, drug TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE interactions (
+    drug1 TEXT NOT NULL,
+    drug2 TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    message TEXT NOT NULL,
+    score_impact REAL NOT NULL,
+    PRIMARY KEY (drug1, drug2)
+) WITHOUT ROWID;
+CREATE INDEX interactions_by_drug2 ON interactions (drug2);
+"""
+
+# Cap on how much of the file SQLite maps into memory (pages are faulted in on demand)
+MMAP_SIZE = 1 << 30
+
+
+def load_source(drugs_path, interactions_path):
+    """Read JSON drug records and CSV interactions into plain tables
+
+    drugs.json maps each standard name to its record; an optional "synonyms"
+    list feeds text extraction and is not part of the clinical record.
+    interactions.csv has columns drug1, drug2, severity, message, score_impact.
+    """
+    with open(drugs_path, encoding='utf-8') as f:
+        source = json.load(f)
+
+    drug_database = {}
+    drug_keywords = {}
+    for name, record in source.items():
+        name = name.strip().lower()
+        record = dict(record)
+        drug_keywords[name] = [k.lower() for k in record.pop('synonyms', [name])]
+        if record:
+            drug_database[name] = record
+
+    interactions = {}
+    with open(interactions_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            pair = tuple(sorted((row['drug1'].strip().lower(), row['drug2'].strip().lower())))
+            interactions[pair] = {
+                'severity': row['severity'],
+                'message': row['message'],
+                'score_impact': float(row['score_impact'])
+            }
+    return drug_database, interactions, drug_keywords
+
+
+def build_knowledge_base(path, drug_database, interactions, drug_keywords):
+    """Write the tables to a fresh SQLite file at `path`"""
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO drugs VALUES (?, ?)",
+            ((name, json.dumps(record, separators=(',', ':'))) for name, record in drug_database.items())
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO keywords VALUES (?, ?)",
+            ((keyword.lower(), name) for name, keywords in drug_keywords.items() for keyword in keywords)
+        )
+        # Pairs are stored sorted so either order of lookup finds them
+        connection.executemany(
+            "INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?)",
+            (tuple(sorted((drug1.lower(), drug2.lower()))) +
+             (info['severity'], info['message'], info['score_impact'])
+             for (drug1, drug2), info in interactions.items())
+        )
+        connection.commit()
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+
+
+class _Connection:
+    """Read-only, memory-mapped SQLite connection shared across threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+
+    def query(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def close(self):
+        self._connection.close()
+
+
+class LazyDrugTable:
+    """Read-only mapping of drug name -> record, decoded on first access"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._decoded = {}
+
+    def get(self, name, default=None):
+        record = self._decoded.get(name)
+        if record is None:
+            rows = self._connection.query("SELECT record FROM drugs WHERE name = ?", (name,))
+            if not rows:
+                return default
+            record = self._decoded[name] = json.loads(rows[0][0])
+        return record
+
+    def __getitem__(self, name):
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __iter__(self):
+        return (row[0] for row in self._connection.query("SELECT name FROM drugs"))
+
+    def __len__(self):
+        return self._connection.query("SELECT COUNT(*) FROM drugs")[0][0]
+
+
+class SqliteInteractionIndex:
+    """Interaction lookups answered from the compiled file.
+
+    Same interface as InteractionIndex; one query per prescription fetches
+    only the pairs among the drugs on it.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def pairs(self):
+        """Every interaction once, as (drug1, drug2, interaction)"""
+        rows = self._connection.query("SELECT drug1, drug2, severity, message, score_impact FROM interactions")
+        for drug1, drug2, severity, message, score_impact in rows:
+            yield drug1, drug2, {'severity': severity, 'message': message, 'score_impact': score_impact}
+
+    def drug_names(self):
+        """Every drug name in at least one interaction, without reading the interactions"""
+        rows = self._connection.query("SELECT drug1 FROM interactions UNION SELECT drug2 FROM interactions")
+        return [row[0] for row in rows]
+
+    def lookup(self, drug1, drug2):
+        """Interaction between two drugs, or None"""
+        rows = self._connection.query(
+            "SELECT severity, message, score_impact FROM interactions WHERE drug1 = ? AND drug2 = ?",
+            tuple(sorted((drug1.lower(), drug2.lower())))
+        )
+        if not rows:
+            return None
+        severity, message, score_impact = rows[0]
+        return {'severity': severity, 'message': message, 'score_impact': score_impact}
+
+    def find_interactions(self, drug_names):
+        """All interacting pairs on a prescription as (i, j, interaction), i < j"""
+        positions = {}
+        for position, name in enumerate(drug_names):
+            positions.setdefault(name, []).append(position)
+        if len(drug_names) < 2:
+            return []
+
+        names = list(positions)
+        placeholders = ','.join('?' * len(names))
+        rows = self._connection.query(
+            f"SELECT drug1, drug2, severity, message, score_impact FROM interactions "
+            f"WHERE drug1 IN ({placeholders}) AND drug2 IN ({placeholders})",
+            names + names
+        )
+
+        found = []
+        for drug1, drug2, severity, message, score_impact in rows:
+            interaction = {'severity': severity, 'message': message, 'score_impact': score_impact}
+            for a in positions[drug1]:
+                for b in positions[drug2]:
+                    if a != b and (drug1 != drug2 or a < b):
+                        found.append((min(a, b), max(a, b), interaction))
+        found.sort(key=lambda pair: (pair[0], pair[1]))
+        return found
+
+    def __len__(self):
+        return self._connection.query("SELECT COUNT(*) FROM interactions")[0][0]
+
+
+class SqliteKnowledgeBase:
+    """Drug, interaction and keyword tables backed by a compiled SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = _Connection(path)
+        self.drug_database = LazyDrugTable(self._connection)
+        self.interaction_index = SqliteInteractionIndex(self._connection)
+
+    def load_drug_keywords(self):
+        """All {standard name: [keywords]}; only needed to compile the text matcher"""
+        drug_keywords = {}
+        for keyword, drug in self._connection.query("SELECT keyword, drug FROM keywords"):
+            drug_keywords.setdefault(drug, []).append(keyword)
+        return drug_keywords
+
+    def close(self):
+        self._connection.close()
+
+    def __reduce__(self):
+        # Worker processes reopen the file instead of copying its contents
+        return (SqliteKnowledgeBase, (self.path,))
+
+
+def main(argv):
+    if len(argv) != 3:
+        print("usage: python knowledge_base.py DRUGS_JSON INTERACTIONS_CSV OUTPUT_SQLITE", file=sys.stderr)
+        return 2
+    drugs_path, interactions_path, output_path = argv
+    drug_database, interactions, drug_keywords = load_source(drugs_path, interactions_path)
+    build_knowledge_base(output_path, drug_database, interactions, drug_keywords)
+    print(f"Built {output_path}: {len(drug_database)} drugs, {len(interactions)} interactions, "
+          f"{sum(len(k) for k in drug_keywords.values())} keywords")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,538 @@
+"""Prescription verification engine: drug extraction, interaction checks and safety scoring
+
+Has no UI dependencies, so the Streamlit app, the HTTP service and batch
+tools all share it.
+"""
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import findings
+from clinical_rules import AGE_WARNINGS, DRUG_ALTERNATIVES, DRUG_RECOMMENDATIONS, DRUG_WARNINGS, RuleTables
+from drug_matcher import DrugMatcher, DrugMention
+from dose_engine import DoseEngine
+from drug_resolver import DrugNameResolver
+from findings import ALTERNATIVES, INTERACTIONS, RECOMMENDATIONS, WARNINGS, Finding
+from instrumentation import STAGE_TIMINGS
+from interaction_index import InteractionIndex
+from knowledge_base import load_source
+from prescription_parser import default_dosage, extract_frequency, find_dosage, in_medication_context, split_drug_spans
+from risk_graph import RiskGraph
+
+# Source tables of the built-in knowledge base (also what knowledge_base.py compiles)
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+BUILTIN_DRUGS = os.path.join(DATA_DIRECTORY, 'drugs.json')
+BUILTIN_INTERACTIONS = os.path.join(DATA_DIRECTORY, 'interactions.csv')
+
+# Distinct per-drug findings kept for reuse before the cache is reset
+MAX_SHARED_FINDINGS = 100000
+
+# Distinct results analyze_many keeps for reuse; the least recently used go first
+MAX_BATCH_RESULTS = 100000
+
+# Patient ages a verification request may give, in years
+MIN_AGE = 0
+MAX_AGE = 130
+
+# Words in prescription text that may be misspelled drug names
+WORD_PATTERN = re.compile(r'[a-z][a-z-]{3,}')
+
+# Compact records: millions of these are held during batch runs.
+# dosage_assumed marks a dosage filled in by the text extractor, not written
+# in the prescription; daily dose totals leave such entries out. Records are
+# mutable and compare by value, so they are deliberately unhashable.
+class DrugInfo:
+    __slots__ = ('name', 'dosage', 'frequency', 'route', 'dosage_assumed')
+    
+    def __init__(self, name, dosage, frequency, route="oral", dosage_assumed=False):
+        self.name = name
+        self.dosage = dosage
+        self.frequency = frequency
+        self.route = route
+        self.dosage_assumed = dosage_assumed
+    
+    def __eq__(self, other):
+        if not isinstance(other, DrugInfo):
+            return NotImplemented
+        return (self.name, self.dosage, self.frequency, self.route, self.dosage_assumed) == \
+            (other.name, other.dosage, other.frequency, other.route, other.dosage_assumed)
+    
+    def __repr__(self):
+        assumed = ", dosage_assumed=True" if self.dosage_assumed else ""
+        return f"DrugInfo({self.name!r}, {self.dosage!r}, {self.frequency!r}, {self.route!r}{assumed})"
+
+class AnalysisResult:
+    """Safety score plus structured findings; report text is rendered on access"""
+    __slots__ = ('findings', 'safety_score')
+    
+    def __init__(self, findings, safety_score):
+        self.findings = findings
+        self.safety_score = safety_score
+    
+    def _render(self, section):
+        return [finding.render() for finding in self.findings if finding.section == section]
+    
+    @property
+    def interactions(self):
+        return self._render(INTERACTIONS)
+    
+    @property
+    def warnings(self):
+        return self._render(WARNINGS)
+    
+    @property
+    def recommendations(self):
+        return self._render(RECOMMENDATIONS)
+    
+    @property
+    def alternatives(self):
+        return self._render(ALTERNATIVES)
+    
+    def to_codes(self):
+        """Compact JSON-ready form: [safety_score, [finding code, ...]]"""
+        return [self.safety_score, [findings.encode_finding(finding) for finding in self.findings]]
+    
+    @classmethod
+    def from_codes(cls, codes):
+        safety_score, encoded = codes
+        return cls(tuple(findings.decode_finding(value) for value in encoded), safety_score)
+    
+    def __eq__(self, other):
+        if not isinstance(other, AnalysisResult):
+            return NotImplemented
+        return self.safety_score == other.safety_score and self.findings == other.findings
+    
+    def __repr__(self):
+        return f"AnalysisResult(safety_score={self.safety_score!r}, findings={len(self.findings)})"
+
+class MedicalAnalyzer:
+    def __init__(self, knowledge_base=None):
+        self.knowledge_base = knowledge_base
+        self._drug_matcher = None
+        self._drug_resolver = None
+        self._shared_findings = {}
+        
+        if knowledge_base is not None:
+            # Compiled on-disk tables: records are decoded only when a drug is referenced
+            self.interactions_db = None
+            self.interaction_index = knowledge_base.interaction_index
+            self.drug_database = knowledge_base.drug_database
+            self.drug_keywords = None
+            self.rules = RuleTables(self.drug_database, self._finding, eager=False)
+            self.risk_graph = RiskGraph(self.drug_database, self._finding, eager=False)
+            self.dose_engine = DoseEngine(self.drug_database, self._finding)
+            return
+        
+        # Built-in tables: the source files the knowledge base build step compiles
+        self.drug_database, self.interactions_db, self.drug_keywords = load_source(BUILTIN_DRUGS, BUILTIN_INTERACTIONS)
+        # Pair keys are normalized here once, so their order in the table doesn't matter
+        self.interaction_index = InteractionIndex(self.interactions_db)
+        
+        # Age and drug rules, compiled into per-age-band tables (see clinical_rules)
+        self.rules = RuleTables(self.drug_database, self._finding)
+        # Risk classes for cumulative checks (see risk_graph)
+        self.risk_graph = RiskGraph(self.drug_database, self._finding)
+        # Parsed dose quantities and daily limits (see dose_engine)
+        self.dose_engine = DoseEngine(self.drug_database, self._finding)
+    
+    @property
+    def drug_matcher(self):
+        """Single-pass drug name matcher, compiled on first use"""
+        if self._drug_matcher is None:
+            if self.knowledge_base is not None:
+                self._drug_matcher = DrugMatcher(self.knowledge_base.load_drug_keywords())
+            else:
+                self._drug_matcher = DrugMatcher(self.drug_keywords)
+        return self._drug_matcher
+    
+    @property
+    def drug_resolver(self):
+        """Misspelling-tolerant name index, built on first use over every known drug name and synonym"""
+        if self._drug_resolver is None:
+            if self.knowledge_base is not None:
+                vocabulary = self.knowledge_base.load_drug_keywords()
+            else:
+                vocabulary = {name: list(keywords) for name, keywords in self.drug_keywords.items()}
+            for name in self.drug_database:
+                vocabulary.setdefault(name, [name])
+            for name in self.interaction_index.drug_names():
+                vocabulary.setdefault(name, [name])
+            self._drug_resolver = DrugNameResolver(vocabulary)
+        return self._drug_resolver
+    
+    def resolve_drug_name(self, name):
+        """Standard name for a drug name, synonym or near-miss spelling, or None"""
+        return self.drug_resolver.resolve(name)
+    
+    def suggest_drug_names(self, name, limit=3):
+        """Closest standard names to an unrecognised name"""
+        return [candidate.drug for candidate in self.drug_resolver.candidates(name, limit=limit)]
+    
+    def _fuzzy_mentions(self, text_lower, mentions):
+        """Mentions for misspelled drug names in the words the exact matcher skipped
+
+        Only words written as a medication, next to a dose or frequency, are
+        tried: prose is full of words a typo or two from a drug name.
+        """
+        found = []
+        covered = iter(mentions)
+        mention = next(covered, None)
+        for word in WORD_PATTERN.finditer(text_lower):
+            while mention is not None and mention.end <= word.start():
+                mention = next(covered, None)
+            if mention is not None and mention.start < word.end():
+                continue
+            if not in_medication_context(text_lower, word.start(), word.end()):
+                continue
+            # Prose is full of near-misses: only an unambiguous match that keeps
+            # the first letter counts
+            candidates = self.drug_resolver.candidates(word.group(), limit=2)
+            if not candidates or candidates[0].keyword[0] != word.group()[0]:
+                continue
+            if len(candidates) > 1 and candidates[1].distance == candidates[0].distance:
+                continue
+            found.append(DrugMention(word.start(), word.end(), candidates[0].drug, candidates[0].keyword))
+        return found
+    
+    def extract_drugs_from_text(self, text):
+        """Extract drug information from prescription text"""
+        clock = STAGE_TIMINGS.clock()
+        drugs = []
+        text_lower = text.lower()
+        
+        # Tokenize once: one span of text per drug, in the order drugs first appear
+        mentions = self.drug_matcher.find_mentions(text_lower)
+        if clock:
+            clock.lap('extract.mentions')
+        fuzzy_mentions = self._fuzzy_mentions(text_lower, mentions)
+        if fuzzy_mentions:
+            mentions = sorted(mentions + fuzzy_mentions, key=lambda mention: mention.start)
+        if clock:
+            clock.lap('extract.fuzzy_mentions')
+        spans = split_drug_spans(text_lower, mentions)
+        if clock:
+            clock.lap('extract.spans')
+        for mention, span in spans:
+            dosage = self._extract_dosage_from_text(span, mention.drug)
+            dosage_assumed = dosage is None
+            if dosage_assumed:
+                dosage = default_dosage(mention.drug)
+            if clock:
+                clock.lap('extract.dosage')
+            frequency = self._extract_frequency_from_text(span, mention.drug)
+            if clock:
+                clock.lap('extract.frequency')
+            
+            drugs.append(DrugInfo(
+                name=mention.drug.capitalize(),
+                dosage=dosage,
+                frequency=frequency,
+                route='oral',
+                dosage_assumed=dosage_assumed
+            ))
+        
+        if clock:
+            clock.stop('extract')
+        return drugs[:5]  # Limit to 5 drugs for safety
+    
+    def _extract_dosage_from_text(self, span, drug_name):
+        """Extract dosage for a specific drug from its own span of text, or None if it gives none"""
+        return find_dosage(span)
+    
+    def _extract_frequency_from_text(self, span, drug_name):
+        """Extract frequency for a specific drug from its own span of text"""
+        return extract_frequency(span)
+    
+    def _finding(self, code, subject, detail, severity, score_delta):
+        """Shared Finding instance, so identical findings across results cost one pointer"""
+        finding = Finding(code, subject, detail, severity, score_delta)
+        shared = self._shared_findings.get(finding)
+        if shared is None:
+            if len(self._shared_findings) >= MAX_SHARED_FINDINGS:
+                self._shared_findings.clear()
+            shared = self._shared_findings[finding] = finding
+        return shared
+    
+    def analyze_prescription(self, drugs, age):
+        """Comprehensive prescription analysis"""
+        clock = STAGE_TIMINGS.clock()
+        drug_names = [drug.name.lower() for drug in drugs]
+        
+        # 1. Drug Interaction Analysis
+        interactions = [
+            self.interaction_finding(drug_names[i], drug_names[j], interaction)
+            for i, j, interaction in self.interaction_index.find_interactions(drug_names)
+        ]
+        if clock:
+            clock.lap('analyze.interactions')
+        
+        # 2-3. Per-drug checks, then the prescription-wide assembly
+        drug_parts = [self.drug_findings(drug, age) for drug in drugs]
+        if clock:
+            clock.lap('analyze.drug_rules')
+        result = self.assemble_result(interactions, drug_parts, age, clock)
+        if clock:
+            clock.stop('analyze')
+        return result
+    
+    def interaction_finding(self, drug1_name, drug2_name, interaction):
+        """Finding for one interacting pair (names lowercased, in prescription order)"""
+        return self._finding(
+            'interaction', (drug1_name, drug2_name), interaction['message'],
+            interaction['severity'], interaction['score_impact']
+        )
+    
+    def drug_findings(self, drug, age):
+        """Rule findings that depend on one drug and the age alone
+        
+        Returns (lowercased name, (report slot, finding, once) entries from
+        the compiled rule tables, daily amounts per ingredient).
+        """
+        return drug.name.lower(), self.rules.drug_findings(drug.name, age), self.dose_engine.daily_amounts(drug)
+    
+    def assemble_result(self, interactions, drug_parts, age, clock=None):
+        """Combine pair and per-drug findings with the age-band rules into a result
+        
+        `interactions` are interaction findings in (i, j) prescription order and
+        `drug_parts` are drug_findings() outputs in drug order. A STAGE_TIMINGS
+        clock, if given, times each phase.
+        """
+        safety_score = 0.9
+        
+        for finding in interactions:
+            safety_score += finding.score_delta
+        
+        # 2. Age-Specific Analysis
+        band_warnings, band_recommendations, band_deltas = self.rules.band_findings(age)
+        for score_delta in band_deltas:
+            safety_score += score_delta
+        if clock:
+            clock.lap('analyze.age_rules')
+        
+        # 3. Drug-Specific Analysis, each finding into its report slot
+        slots = ([], [], [], [])
+        reported_once = set()
+        for drug_name, entries, _ in drug_parts:
+            for slot, finding, once in entries:
+                if once:
+                    if (drug_name, finding) in reported_once:
+                        continue
+                    reported_once.add((drug_name, finding))
+                slots[slot].append(finding)
+                if finding.score_delta:
+                    safety_score += finding.score_delta
+        warnings = list(band_warnings) + slots[AGE_WARNINGS] + slots[DRUG_WARNINGS]
+        recommendations = list(band_recommendations) + slots[DRUG_RECOMMENDATIONS]
+        if clock:
+            clock.lap('analyze.drug_specific')
+        
+        # 3b. Daily totals per ingredient, across every entry that contains it
+        doses = [(drug_name, amounts) for drug_name, _, amounts in drug_parts]
+        for finding in self.dose_engine.regimen_findings(doses, age):
+            warnings.append(finding)
+            safety_score += finding.score_delta
+        if clock:
+            clock.lap('analyze.daily_doses')
+        
+        # 3c. Cumulative risk across the regimen, summed from cached per-drug vectors
+        names = [drug_name for drug_name, _, _ in drug_parts]
+        for finding in self.risk_graph.regimen_findings(names, self.interaction_index):
+            warnings.append(finding)
+            safety_score += finding.score_delta
+        if clock:
+            clock.lap('analyze.risk_burden')
+        
+        # 4. Generate Alternatives
+        alternatives = []
+        if safety_score < 0.7:
+            alternatives.append(findings.FIRST_LINE_PARACETAMOL)
+            alternatives.append(findings.TOPICAL_NSAIDS)
+            alternatives.append(findings.NON_PHARMACOLOGICAL)
+        alternatives.extend(slots[DRUG_ALTERNATIVES])
+        
+        # 5. Ensure minimum content
+        if not interactions:
+            interactions = [findings.NO_INTERACTIONS]
+        
+        if not warnings:
+            warnings.append(findings.STANDARD_PRECAUTIONS)
+        
+        if not recommendations:
+            recommendations.append(findings.DOSING_APPROPRIATE)
+        
+        if not alternatives:
+            alternatives.append(findings.CHOICES_SOUND)
+        
+        # 6. Ensure safety score bounds
+        safety_score = max(0.1, min(1.0, safety_score))
+        
+        result = AnalysisResult(tuple(interactions) + tuple(warnings + recommendations + alternatives), safety_score)
+        if clock:
+            clock.lap('analyze.alternatives')
+        return result
+    
+    def age_band(self, drugs, age):
+        """Bucket an age by the compiled thresholds that analysis of these drugs tests against
+        
+        One band index per cut list: the age-band rules, then each drug's rules
+        and the dose limits of its ingredients. Ages with the same bands get
+        the same analysis of these drugs, whatever thresholds the drug records
+        define.
+        """
+        point = (age, 0.5)
+        bands = [bisect_left(self.rules.band_cuts, point)]
+        for drug in drugs:
+            name = drug.name.lower()
+            bands.append(bisect_left(self.rules.drug_rules(name).cuts, point))
+            for ingredient in self.dose_engine.product(name).ingredients:
+                limits = self.dose_engine.limits(ingredient)
+                if limits is not None:
+                    bands.append(bisect_left(limits.cuts, point))
+        return tuple(bands)
+    
+    def analyze_many(self, prescriptions, workers=1, chunk_size=256, max_cached=MAX_BATCH_RESULTS):
+        """Analyze an iterable of (drugs, age) pairs, yielding results in input order
+        
+        Prescriptions with the same drugs, doses and age band are analyzed once
+        and share one AnalysisResult, among the max_cached most recently seen
+        cases. With workers > 1 (None = all cores) unique cases are spread over
+        a process pool, chunk_size cases per task.
+        """
+        cache = _BatchResults(max_cached)
+        
+        if workers == 1:
+            for drugs, age in prescriptions:
+                key = batch_key(self, drugs, age)
+                result = cache.get(key)
+                if result is None:
+                    result = self.analyze_prescription(drugs, age)
+                    cache.put(key, result)
+                yield result
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        prescriptions = iter(prescriptions)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(self.knowledge_base,)) as pool:
+            while True:
+                # Read the input a window at a time so memory stays bounded
+                window = list(islice(prescriptions, chunk_size * workers))
+                if not window:
+                    break
+                keys = [batch_key(self, drugs, age) for drugs, age in window]
+                known = {}
+                pending = {}
+                for key, (drugs, age) in zip(keys, window):
+                    if key in known or key in pending:
+                        continue
+                    result = cache.get(key)
+                    if result is None:
+                        pending[key] = (key[0], age)
+                    else:
+                        known[key] = result
+                known.update(zip(pending, pool.map(_analyze_in_worker, pending.values(), chunksize=chunk_size)))
+                for key in pending:
+                    cache.put(key, known[key])
+                for key in keys:
+                    yield known[key]
+
+class _BatchResults:
+    """Least-recently-used results of analyze_many, at most maxsize of them"""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
+    
+    def put(self, key, result):
+        self._entries[key] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+def batch_key(analyzer, drugs, age):
+    """Dedupe key for a prescription: drug name, dosage (and whether it was assumed) and frequency in order plus the analyzer's age band"""
+    return (tuple((drug.name, drug.dosage, drug.frequency, drug.dosage_assumed) for drug in drugs),
+            analyzer.age_band(drugs, age))
+
+def analysis_cache_key(analyzer, drugs, age):
+    """Cache key for a prescription (the app's ResultCache): the same exact fields as batch_key
+    
+    Names are not normalized: analysis looks drugs up by name as given and
+    findings show it as typed, so differently written names may differ in result.
+    """
+    return batch_key(analyzer, drugs, age)
+
+_batch_analyzer = None
+
+def _init_batch_worker(knowledge_base):
+    global _batch_analyzer
+    _batch_analyzer = MedicalAnalyzer(knowledge_base)
+
+def _analyze_in_worker(case):
+    # Only names, doses and age cross the process boundary; analysis never reads routes
+    entries, age = case
+    drugs = [DrugInfo(name, dosage, frequency, dosage_assumed=assumed) for name, dosage, frequency, assumed in entries]
+    return _batch_analyzer.analyze_prescription(drugs, age)
+
+def build_report(drugs, age, analysis, timestamp=None):
+    """The exported analysis report (the JSON download and service response schema)"""
+    return {
+        "patient_age": age,
+        "medications": [{"name": drug.name, "dosage": drug.dosage, "frequency": drug.frequency, "route": drug.route} for drug in drugs],
+        "safety_score": analysis.safety_score,
+        "analysis": {
+            "interactions": analysis.interactions,
+            "recommendations": analysis.recommendations,
+            "warnings": analysis.warnings,
+            "alternatives": analysis.alternatives
+        },
+        "analysis_timestamp": timestamp or time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def parse_verification_record(record):
+    """Validate one verification request -> (drugs, text, age)
+    
+    A record is {"age": ..., "medications": [{"name": ..., "dosage": ...}, ...]}
+    or {"age": ..., "text": "..."}. For free text, drugs is None and the caller
+    runs extract_drugs_from_text. Raises ValueError on malformed input.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("prescription must be a JSON object")
+    age = record.get('age')
+    if isinstance(age, bool) or not isinstance(age, (int, float)):
+        raise ValueError("'age' must be a number")
+    # Also rejects NaN and infinities, which JSON and CSV input can carry
+    if not MIN_AGE <= age <= MAX_AGE:
+        raise ValueError(f"'age' must be between {MIN_AGE} and {MAX_AGE}")
+    
+    if 'text' in record:
+        if not isinstance(record['text'], str):
+            raise ValueError("'text' must be a string")
+        return None, record['text'], age
+    
+    medications = record.get('medications')
+    if not isinstance(medications, list):
+        raise ValueError("provide 'medications' (a list) or 'text'")
+    drugs = []
+    for medication in medications:
+        if not isinstance(medication, dict) or not isinstance(medication.get('name'), str):
+            raise ValueError("each medication needs a 'name'")
+        for field in ('dosage', 'frequency', 'route'):
+            if not isinstance(medication.get(field, ''), str):
+                raise ValueError(f"'{field}' must be a string")
+        drugs.append(DrugInfo(
+            medication['name'],
+            medication.get('dosage', ''),
+            medication.get('frequency', ''),
+            medication.get('route', 'oral')
+        ))
+    return drugs, None, age
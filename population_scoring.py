@@ -0,0 +1,187 @@
+"""Columnar safety scoring for population-scale audits (requires NumPy)
+
+PopulationScorer reproduces the safety score of
+MedicalAnalyzer.analyze_prescription for many prescriptions at once:
+
+    scorer = PopulationScorer(analyzer)
+    drug_ids, ages, daily_doses = scorer.encode(prescriptions)    # [(drugs, age), ...]
+    scores = scorer.score(drug_ids, ages, daily_doses)
+
+Prescriptions become a padded (P, K) matrix of drug IDs (-1 = empty slot)
+and a (P, I) matrix of daily doses per limited ingredient. Score deltas of
+the compiled clinical rules (per age band, per drug), a sorted table of pair
+impacts, every drug's risk vector and the daily dose limits per age band are
+precomputed once, so scoring is array arithmetic; only the order of float
+additions differs from the scalar path.
+"""
+import numpy as np
+
+from clinical_rules import coarser_band
+from dose_engine import OVER_LIMIT_SCORE_DELTA
+from risk_graph import MIN_CONTRIBUTORS
+
+BASE_SCORE = 0.9
+MIN_SCORE = 0.1
+MAX_SCORE = 1.0
+
+
+class PopulationScorer:
+    """Precomputed per-drug and per-pair impact arrays for one analyzer's knowledge base"""
+
+    def __init__(self, analyzer):
+        self.ids = {}
+        pairs = list(analyzer.interaction_index.pairs())
+        for drug1, drug2, _ in pairs:
+            self._intern(drug1)
+            self._intern(drug2)
+        for name in analyzer.drug_database:
+            self._intern(name)
+        vocabulary = len(self.ids)
+
+        # One age partition over every rule threshold, then per band the score
+        # deltas of the age-band rules and of each drug's rules. Per-drug
+        # columns carry one extra trailing slot so padding (-1) reads 0.
+        rules = analyzer.rules
+        drug_rules = {name: rules.drug_rules(name) for name in self.ids}
+        cuts = set(rules.band_cuts)
+        for compiled in drug_rules.values():
+            cuts.update(compiled.cuts)
+        self.dose_engine = analyzer.dose_engine
+        dose_limits = {}
+        for name in self.ids:
+            limits = self.dose_engine.limits(name)
+            if limits is not None:
+                dose_limits[name] = limits
+                cuts.update(limits.cuts)
+        self.ingredients = {name: column for column, name in enumerate(dose_limits)}
+        self.cuts = sorted(cuts)
+        bands = len(self.cuts) + 1
+        self.band_delta = np.zeros(bands)
+        self.drug_delta = np.zeros((bands, vocabulary + 1))     # every listing counts
+        self.once_delta = np.zeros((bands, vocabulary + 1))     # counted once per prescription
+        self.dose_limits = np.full((bands, len(dose_limits)), np.inf)     # inf = no limit in that band
+        for band in range(bands):
+            self.band_delta[band] = sum(rules.band_tables[coarser_band(rules.band_cuts, self.cuts, band)][2])
+            for name, compiled in drug_rules.items():
+                for rule in compiled.bands[coarser_band(compiled.cuts, self.cuts, band)]:
+                    target = self.once_delta if rule.once else self.drug_delta
+                    target[band, self.ids[name]] += rule.score_delta
+            for name, limits in dose_limits.items():
+                limit = limits.bands[coarser_band(limits.cuts, self.cuts, band)]
+                if limit is not None:
+                    self.dose_limits[band, self.ingredients[name]] = limit
+
+        # Pair impacts keyed by lo * vocabulary + hi, sorted for searchsorted lookups
+        impacts = {}
+        for drug1, drug2, interaction in pairs:
+            id1, id2 = sorted((self.ids[drug1], self.ids[drug2]))
+            impacts[id1 * vocabulary + id2] = interaction['score_impact']
+        keys = np.fromiter(impacts.keys(), dtype=np.int64, count=len(impacts))
+        values = np.fromiter(impacts.values(), dtype=np.float64, count=len(impacts))
+        order = np.argsort(keys)
+        self.pair_keys = keys[order]
+        self.pair_impacts = values[order]
+        self.vocabulary = vocabulary
+
+        # Risk category weights per drug (trailing zero row for padding), with
+        # each category's threshold and score delta
+        graph = analyzer.risk_graph
+        self.risk = np.zeros((vocabulary + 1, len(graph.categories)))
+        for name, drug_id in self.ids.items():
+            for index, weight in graph.vector(name):
+                self.risk[drug_id, index] = weight
+        self.risk_thresholds = np.array([category['threshold'] for category in graph.categories])
+        self.risk_deltas = np.array([category['score_delta'] for category in graph.categories])
+
+    def _intern(self, name):
+        return self.ids.setdefault(name.lower(), len(self.ids))
+
+    def encode(self, prescriptions):
+        """(drug_ids, ages, daily_doses) arrays for an iterable of (drugs, age)
+
+        `drugs` may be DrugInfo objects or names. Drugs outside the knowledge
+        base cannot affect the score and are left as empty slots; names alone
+        carry no dose, so they add nothing to the daily totals.
+        """
+        rows = []
+        ages = []
+        doses = []
+        for drugs, age in prescriptions:
+            rows.append([self.ids.get((getattr(drug, 'name', drug)).lower(), -1) for drug in drugs])
+            ages.append(age)
+            totals = {}
+            for drug in drugs:
+                if hasattr(drug, 'dosage'):
+                    for ingredient, amount in self.dose_engine.daily_amounts(drug):
+                        totals[ingredient] = totals.get(ingredient, 0.0) + amount
+            doses.append(totals)
+        width = max((len(row) for row in rows), default=0)
+        drug_ids = np.full((len(rows), max(width, 1)), -1, dtype=np.int64)
+        daily_doses = np.zeros((len(rows), len(self.ingredients)))
+        for index, row in enumerate(rows):
+            drug_ids[index, :len(row)] = row
+            for ingredient, total in doses[index].items():
+                daily_doses[index, self.ingredients[ingredient]] = total
+        return drug_ids, np.asarray(ages, dtype=np.float64), daily_doses
+
+    def score(self, drug_ids, ages, daily_doses=None, chunk_size=65536):
+        """Safety scores for every row, processed chunk_size rows at a time to bound memory
+
+        Without daily_doses no daily totals are checked.
+        """
+        drug_ids = np.asarray(drug_ids, dtype=np.int64)
+        ages = np.asarray(ages, dtype=np.float64)
+        if daily_doses is None:
+            daily_doses = np.zeros((len(ages), len(self.ingredients)))
+        daily_doses = np.asarray(daily_doses, dtype=np.float64)
+        scores = np.empty(len(ages))
+        for start in range(0, len(ages), chunk_size):
+            stop = start + chunk_size
+            scores[start:stop] = self._score_chunk(drug_ids[start:stop], ages[start:stop], daily_doses[start:stop])
+        return scores
+
+    def _score_chunk(self, drug_ids, ages, daily_doses):
+        # 1. Interactions: every column pair (i < j) looked up in the sorted pair table
+        interaction_impact = np.zeros(len(ages))
+        left, right = np.triu_indices(drug_ids.shape[1], 1)
+        matched = np.zeros((len(ages), len(left)), dtype=bool)
+        if len(self.pair_keys) and len(left):
+            a = drug_ids[:, left]
+            b = drug_ids[:, right]
+            present = (a >= 0) & (b >= 0)
+            keys = np.minimum(a, b) * self.vocabulary + np.maximum(a, b)
+            slots = np.searchsorted(self.pair_keys, keys)
+            np.minimum(slots, len(self.pair_keys) - 1, out=slots)
+            matched = present & (self.pair_keys[slots] == keys)
+            interaction_impact = np.where(matched, self.pair_impacts[slots], 0.0).sum(axis=1)
+
+        # 2. Rule deltas for each row's age band; once-rules only at a drug's first listing
+        bands = np.zeros(len(ages), dtype=np.int64)
+        for value, side in self.cuts:
+            bands += (ages >= value) if side == 0 else (ages > value)
+        rows = bands[:, None]
+        first = np.ones(drug_ids.shape, dtype=bool)
+        for column in range(1, drug_ids.shape[1]):
+            first[:, column] = ~(drug_ids[:, :column] == drug_ids[:, column:column + 1]).any(axis=1)
+        age_penalty = (
+            self.band_delta[bands]
+            + self.drug_delta[rows, drug_ids].sum(axis=1)
+            + np.where(first, self.once_delta[rows, drug_ids], 0.0).sum(axis=1)
+        )
+
+        # 3. Daily dose totals over each row's age-band limits
+        dose_penalty = (daily_doses > self.dose_limits[bands]).sum(axis=1) * OVER_LIMIT_SCORE_DELTA
+
+        # 4. Cumulative risk: category loads over each row's distinct drugs, except
+        # loads whose contributors all interact pairwise (reported in step 1)
+        weights = np.where(first[:, :, None], self.risk[drug_ids], 0.0)
+        contributing = weights > 0
+        contributors = contributing.sum(axis=1)
+        interacting = (contributing[:, left] & contributing[:, right] & matched[:, :, None]).sum(axis=1)
+        explained = interacting == contributors * (contributors - 1) // 2
+        reached = ((contributors >= MIN_CONTRIBUTORS) & (weights.sum(axis=1) >= self.risk_thresholds)
+                   & ~explained)
+        risk_penalty = (reached * self.risk_deltas).sum(axis=1)
+
+        return np.clip(BASE_SCORE + interaction_impact + age_penalty + dose_penalty + risk_penalty,
+                       MIN_SCORE, MAX_SCORE)
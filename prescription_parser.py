@@ -0,0 +1,112 @@
+import re
+
+# Compiled once at import; applied only to the text belonging to a single drug
+DOSAGE_PATTERN = re.compile(r'(\d+(?:\.\d+)?(?:\s*/\s*\d+(?:\.\d+)?)?)\s*(mg|mcg|g|ml)\b')
+
+# Units taken per dose: "2 tablets", "2 x 500mg", "500mg x 2"
+UNIT_COUNT_PATTERN = re.compile(r'\b(\d+)\s*(?:x\s*)?(?:tablets?|tabs?|capsules?|caps?)\b')
+COUNT_BEFORE = re.compile(r'\b(\d+)\s*x\s*$')
+COUNT_AFTER = re.compile(r'\s*x\s*(\d+)\b')
+
+# One alternation so a single search finds the earliest frequency phrase in a span.
+# Where two phrases start at the same place, the more specific (listed first) wins.
+FREQUENCY_PATTERN = re.compile(
+    r'(?P<every_4_hours>\bevery\s*4\s*(?:hours|hrs|h)\b)'
+    r'|(?P<every_6_hours>\bevery\s*6\s*(?:hours|hrs|h)\b)'
+    r'|(?P<four_times>\b(?:four\s*times|4\s*(?:x|times))\s*(?:a\s*day|daily)\b|\b(?:qds|qid)\b)'
+    r'|(?P<three_times>\b(?:three\s*times|3\s*(?:x|times))\s*(?:a\s*day|daily)\b|\b(?:tds|tid)\b)'
+    r'|(?P<twice>\b(?:twice|2\s*(?:x|times))\s*(?:a\s*day|daily)\b|\b(?:bd|bid)\b)'
+    r'|(?P<as_needed>\bas\s*needed\b|\bprn\b|\bwhen\s*required\b)'
+    r'|(?P<once>\b(?:once|1\s*(?:x|times))\s*(?:a\s*day|daily)\b|\bdaily\b|\bod\b)'
+)
+
+# A dose or frequency right after a word, or a dose right before it, marks the word as
+# a medication rather than prose
+DOSE_OR_FREQUENCY_AFTER = re.compile(r'[\s:,(-]*(?:' + DOSAGE_PATTERN.pattern + '|' + FREQUENCY_PATTERN.pattern + ')')
+DOSE_BEFORE = re.compile(DOSAGE_PATTERN.pattern + r'[\s:,)-]*$')
+
+FREQUENCY_LABELS = {
+    'every_4_hours': 'Every 4 hours',
+    'every_6_hours': 'Every 6 hours',
+    'four_times': 'Four times daily',
+    'three_times': 'Three times daily',
+    'twice': 'Twice daily',
+    'as_needed': 'As needed',
+    'once': 'Once daily'
+}
+
+# Default dosages for common drugs
+DEFAULT_DOSAGES = {
+    'paracetamol': '500mg',
+    'ibuprofen': '400mg',
+    'aspirin': '75mg',
+    'codeine': '30mg',
+    'co-codamol': '8/500mg',
+    'tramadol': '50mg',
+    'omeprazole': '20mg'
+}
+
+
+def split_drug_spans(text, mentions):
+    """Split a document into one span per drug using mention offsets.
+
+    A drug's span runs from its first mention up to the next mention of a
+    different drug (or the end of the text). Returns (mention, span_text)
+    pairs in text order, one per distinct drug.
+    """
+    # Walk backwards once so each mention knows where the next other drug starts
+    span_ends = [len(text)] * len(mentions)
+    for index in range(len(mentions) - 2, -1, -1):
+        following = mentions[index + 1]
+        if following.drug != mentions[index].drug:
+            span_ends[index] = following.start
+        else:
+            span_ends[index] = span_ends[index + 1]
+
+    spans = []
+    seen = set()
+    for mention, end in zip(mentions, span_ends):
+        if mention.drug in seen:
+            continue
+        seen.add(mention.drug)
+        spans.append((mention, text[mention.start:end]))
+    return spans
+
+
+def in_medication_context(text, start, end):
+    """Whether the word at text[start:end] is directly followed by a dose or frequency, or preceded by a dose"""
+    return (DOSE_OR_FREQUENCY_AFTER.match(text, end) is not None
+            or DOSE_BEFORE.search(text, max(0, start - 24), start) is not None)
+
+
+def find_dosage(span):
+    """First dosage written inside a drug's span, with its unit count when one is given; None if absent"""
+    match = DOSAGE_PATTERN.search(span)
+    if not match:
+        return None
+    dosage = match.group(1) + match.group(2)
+    count = UNIT_COUNT_PATTERN.search(span)
+    if count:
+        return f"{dosage} {count.group(0)}"
+    count = COUNT_BEFORE.search(span, 0, match.start()) or COUNT_AFTER.match(span, match.end())
+    if count:
+        return f"{dosage} x {count.group(1)}"
+    return dosage
+
+
+def default_dosage(drug_name):
+    """Dosage assumed for a drug when the text gives none"""
+    return DEFAULT_DOSAGES.get(drug_name, '500mg')
+
+
+def extract_dosage(span, drug_name):
+    """First dosage inside a drug's span, or the drug's default"""
+    return find_dosage(span) or default_dosage(drug_name)
+
+
+def extract_frequency(span):
+    """Earliest frequency phrase inside a drug's span"""
+    match = FREQUENCY_PATTERN.search(span)
+    if match:
+        return FREQUENCY_LABELS[match.lastgroup]
+    return 'As prescribed'
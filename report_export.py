@@ -0,0 +1,471 @@
+"""Streaming report export for batch audits: JSONL, gzip JSONL or compact binary
+
+    with ReportExporter('audit.jsonl.gz') as exporter:     # format from the extension
+        for drugs, age in prescriptions:
+            exporter.submit(drugs, age, analyzer.analyze_prescription(drugs, age))
+
+    for report in read_reports('audit.jsonl.gz'):          # the report schema of build_report
+        ...
+
+Submitted reports are grouped into batches and handed to a background
+thread over a bounded queue. That thread encodes and writes, so analysis
+only waits when the queue is full. Targets are paths, binary file objects
+or connected sockets.
+
+The binary format ("RXB2") is a magic header followed by blocks:
+varint(record count), varint(payload bytes), payload. A block carries its
+own string table, so blocks can be encoded independently (one per worker
+chunk in verify_cli) and a drug name, dosage or finding code costs one byte
+after its first use in the block. Findings are stored structured and
+rendered to report text only when read back.
+"""
+import gzip
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+from findings import CONSTANT_FINDINGS, Finding
+from medical_analyzer import AnalysisResult, DrugInfo, build_report
+
+FORMATS = ('jsonl', 'jsonl.gz', 'binary')
+MAGIC = b'RXB2'
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Record tags in a binary block
+_REPORT_INT_AGE = 0
+_REPORT_FLOAT_AGE = 1
+_ERROR = 2
+
+# Finding flags
+_TUPLE_SUBJECT = 1      # subject is a tuple of drug names: its length, then each name
+_SCORE_DELTA = 2
+_CONSTANT = 4           # one of findings.CONSTANT_FINDINGS: only the code follows
+
+# String references: 0 = None, 1 = new string follows, n >= 2 = table[n - 2]
+_NONE = 0
+_NEW = 1
+
+_DOUBLE = struct.Struct('<d')
+
+
+def format_for_path(path):
+    """Export format implied by a file name"""
+    if path.endswith('.gz'):
+        return 'jsonl.gz'
+    if path.endswith(('.rxb', '.bin')):
+        return 'binary'
+    return 'jsonl'
+
+
+class ReportClock:
+    """Report timestamps, formatted once per second instead of once per report"""
+    __slots__ = ('_second', '_text')
+
+    def __init__(self):
+        self._second = None
+        self._text = None
+
+    def now(self):
+        """(epoch seconds, formatted local time)"""
+        second = int(time.time())
+        if second != self._second:
+            self._second = second
+            self._text = time.strftime(TIMESTAMP_FORMAT, time.localtime(second))
+        return second, self._text
+
+
+def report_line(report):
+    """One JSONL line (without the newline) for a report or error dict"""
+    return json.dumps(report, ensure_ascii=False, separators=(',', ':'))
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+class BlockEncoder:
+    """Builds one binary block; strings are interned per block"""
+
+    def __init__(self):
+        self._payload = bytearray()
+        self._strings = {}
+        self._count = 0
+        self._last_second = 0
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, value):
+        out = self._payload
+        if value is None:
+            out.append(_NONE)
+            return
+        index = self._strings.get(value)
+        if index is not None:
+            _write_varint(out, index + 2)
+            return
+        self._strings[value] = len(self._strings)
+        data = value.encode('utf-8')
+        out.append(_NEW)
+        _write_varint(out, len(data))
+        out += data
+
+    def report(self, drugs, age, analysis, second):
+        """Append one report; on failure the block is left as it was"""
+        mark = len(self._payload)
+        strings = len(self._strings)
+        last_second = self._last_second
+        try:
+            self._report(drugs, age, analysis, second)
+        except BaseException:
+            del self._payload[mark:]
+            for value in list(self._strings)[strings:]:
+                del self._strings[value]
+            self._last_second = last_second
+            raise
+        self._count += 1
+
+    def _report(self, drugs, age, analysis, second):
+        out = self._payload
+        if isinstance(age, int) and not isinstance(age, bool):
+            out.append(_REPORT_INT_AGE)
+            _write_varint(out, _zigzag(age))
+        else:
+            out.append(_REPORT_FLOAT_AGE)
+            out += _DOUBLE.pack(age)
+        _write_varint(out, _zigzag(second - self._last_second))
+        self._last_second = second
+        out += _DOUBLE.pack(analysis.safety_score)
+
+        _write_varint(out, len(drugs))
+        for drug in drugs:
+            self._string(drug.name)
+            self._string(drug.dosage)
+            self._string(drug.frequency)
+            self._string(drug.route)
+
+        _write_varint(out, len(analysis.findings))
+        for finding in analysis.findings:
+            if CONSTANT_FINDINGS.get(finding.code) == finding:
+                out.append(_CONSTANT)
+                self._string(finding.code)
+                continue
+            subject = finding.subject
+            names = isinstance(subject, tuple)
+            out.append((_TUPLE_SUBJECT if names else 0) | (_SCORE_DELTA if finding.score_delta else 0))
+            self._string(finding.code)
+            if names:
+                _write_varint(out, len(subject))
+                for name in subject:
+                    self._string(name)
+            else:
+                self._string(subject)
+            self._string(finding.detail)
+            self._string(finding.severity)
+            if finding.score_delta:
+                out += _DOUBLE.pack(finding.score_delta)
+
+    def error(self, line_number, message):
+        self._payload.append(_ERROR)
+        _write_varint(self._payload, line_number)
+        self._string(message)
+        self._count += 1
+
+    def finish(self):
+        """The encoded block"""
+        header = bytearray()
+        _write_varint(header, self._count)
+        _write_varint(header, len(self._payload))
+        return bytes(header + self._payload)
+
+
+class _BlockDecoder:
+    def __init__(self, payload):
+        self._payload = payload
+        self._position = 0
+        self._strings = []
+        self._second = 0
+
+    def _varint(self):
+        payload = self._payload
+        result = shift = 0
+        while True:
+            byte = payload[self._position]
+            self._position += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def _zigzag(self):
+        value = self._varint()
+        return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+    def _double(self):
+        value = _DOUBLE.unpack_from(self._payload, self._position)[0]
+        self._position += 8
+        return value
+
+    def _string(self):
+        ref = self._varint()
+        if ref == _NONE:
+            return None
+        if ref == _NEW:
+            length = self._varint()
+            value = bytes(self._payload[self._position:self._position + length]).decode('utf-8')
+            self._position += length
+            self._strings.append(value)
+            return value
+        return self._strings[ref - 2]
+
+    def records(self, count):
+        """Yield ('report', drugs, age, analysis, second) or ('error', line number, message)"""
+        for _ in range(count):
+            tag = self._payload[self._position]
+            self._position += 1
+            if tag == _ERROR:
+                yield 'error', self._varint(), self._string()
+                continue
+            age = self._zigzag() if tag == _REPORT_INT_AGE else self._double()
+            self._second += self._zigzag()
+            safety_score = self._double()
+            drugs = [
+                DrugInfo(self._string(), self._string(), self._string(), self._string())
+                for _ in range(self._varint())
+            ]
+            findings = []
+            for _ in range(self._varint()):
+                flags = self._payload[self._position]
+                self._position += 1
+                code = self._string()
+                if flags & _CONSTANT:
+                    findings.append(CONSTANT_FINDINGS[code])
+                    continue
+                if flags & _TUPLE_SUBJECT:
+                    subject = tuple(self._string() for _ in range(self._varint()))
+                else:
+                    subject = self._string()
+                detail = self._string()
+                severity = self._string()
+                score_delta = self._double() if flags & _SCORE_DELTA else 0.0
+                findings.append(Finding(code, subject, detail, severity, score_delta))
+            yield 'report', drugs, age, AnalysisResult(tuple(findings), safety_score), self._second
+
+
+def _read_varint(stream):
+    """Next varint in a stream, or None at a clean end of stream"""
+    result = shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise ValueError("truncated binary export")
+            return None
+        result |= (byte[0] & 0x7f) << shift
+        if byte[0] < 0x80:
+            return result
+        shift += 7
+
+
+def read_records(stream):
+    """Yield the records of a binary export: ('report', drugs, age, analysis, epoch seconds)
+    or ('error', line number, message)"""
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a binary report export")
+    while True:
+        count = _read_varint(stream)
+        if count is None:
+            return
+        length = _read_varint(stream)
+        payload = stream.read(length) if length is not None else b''
+        if length is None or len(payload) != length:
+            raise ValueError("truncated binary export")
+        yield from _BlockDecoder(payload).records(count)
+
+
+def read_reports(source, export_format=None):
+    """Yield report dicts (or {"line", "error"} dicts) from an export file path or binary stream"""
+    if isinstance(source, str):
+        export_format = export_format or format_for_path(source)
+        with open(source, 'rb') as stream:
+            yield from read_reports(stream, export_format)
+        return
+    export_format = export_format or 'jsonl'
+    if export_format == 'binary':
+        for record in read_records(source):
+            if record[0] == 'error':
+                yield {'line': record[1], 'error': record[2]}
+            else:
+                _, drugs, age, analysis, second = record
+                yield build_report(drugs, age, analysis, time.strftime(TIMESTAMP_FORMAT, time.localtime(second)))
+        return
+    if export_format == 'jsonl.gz':
+        source = gzip.GzipFile(fileobj=source, mode='rb')
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+_CLOSE = object()
+
+
+class ReportExporter:
+    """Writes reports to a path, binary file object or socket from a background thread
+
+    submit() batches reports and queues each full batch; at most queue_size
+    batches wait for the writer, which bounds memory when the target is
+    slower than analysis. Errors raised while writing surface on the next
+    submit() or on close().
+    """
+
+    def __init__(self, target, export_format=None, batch_size=256, queue_size=16, compresslevel=6):
+        if export_format is None:
+            export_format = format_for_path(target) if isinstance(target, str) else 'jsonl'
+        if export_format not in FORMATS:
+            raise ValueError(f"Unknown export format {export_format!r}; expected one of {', '.join(FORMATS)}")
+        self.format = export_format
+        self.batch_size = batch_size
+        self.reports = 0                # records written so far
+        self.bytes = 0                  # bytes handed to the target (after compression)
+        self._clock = ReportClock()
+        self._batch = []
+        self._error = None
+
+        self._owned = []
+        if isinstance(target, str):
+            target = open(target, 'wb')
+            self._owned.append(target)
+        elif isinstance(target, socket.socket):
+            target = target.makefile('wb')
+            self._owned.append(target)
+        self._raw = target
+        self._stream = self._counter = _CountingWriter(target)
+        if export_format == 'jsonl.gz':
+            self._stream = gzip.GzipFile(fileobj=self._stream, mode='wb', compresslevel=compresslevel)
+            self._owned.insert(0, self._stream)
+        if export_format == 'binary':
+            self._stream.write(MAGIC)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='report-export', daemon=True)
+        self._thread.start()
+
+    def submit(self, drugs, age, analysis):
+        """Queue one report; timestamped now, encoded and written in the background"""
+        self._batch.append((drugs, age, analysis, self._clock.now()))
+        if len(self._batch) >= self.batch_size:
+            self._put(('reports', self._batch))
+            self._batch = []
+
+    def submit_error(self, line_number, message):
+        """Queue a record for input that could not be verified"""
+        self._batch.append((line_number, message))
+        if len(self._batch) >= self.batch_size:
+            self._put(('reports', self._batch))
+            self._batch = []
+
+    def write_encoded(self, data, count):
+        """Queue `count` records already encoded in this format: JSONL text or a binary block"""
+        self.flush()
+        self._put(('encoded', (data, count)))
+
+    def flush(self):
+        """Queue the partial batch"""
+        if self._batch:
+            self._put(('reports', self._batch))
+            self._batch = []
+
+    def _put(self, item):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+            if self._error is not None:
+                continue                # drain so submitters never block on a dead writer
+            try:
+                kind, payload = item
+                if kind == 'reports':
+                    data, count = self._encode(payload), len(payload)
+                else:
+                    data, count = payload
+                self._stream.write(data.encode('utf-8') if isinstance(data, str) else data)
+                self.reports += count
+            except BaseException as e:
+                self._error = e
+
+    def _encode(self, batch):
+        if self.format == 'binary':
+            encoder = BlockEncoder()
+            for entry in batch:
+                if len(entry) == 2:
+                    encoder.error(*entry)
+                else:
+                    drugs, age, analysis, (second, _) = entry
+                    encoder.report(drugs, age, analysis, second)
+            return encoder.finish()
+        lines = []
+        for entry in batch:
+            if len(entry) == 2:
+                lines.append(report_line({'line': entry[0], 'error': entry[1]}))
+            else:
+                drugs, age, analysis, (_, timestamp) = entry
+                lines.append(report_line(build_report(drugs, age, analysis, timestamp)))
+        lines.append('')
+        return '\n'.join(lines)
+
+    def close(self):
+        """Write everything queued, then close what the exporter opened"""
+        if self._thread is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._thread = None
+            try:
+                for stream in self._owned:
+                    stream.close()
+                if self._raw not in self._owned:
+                    self._raw.flush()
+            finally:
+                self.bytes = self._counter.written
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _CountingWriter:
+    """Counts bytes on their way to the target"""
+
+    def __init__(self, target):
+        self.target = target
+        self.written = 0
+
+    def write(self, data):
+        self.target.write(data)
+        self.written += len(data)
+        return len(data)
+
+    def flush(self):
+        self.target.flush()
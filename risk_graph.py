@@ -0,0 +1,162 @@
+"""Class-level risk categories for cumulative (polypharmacy) checks
+
+Pairwise interactions miss risks that build up across a regimen: bleeding
+risk from an NSAID, an antiplatelet and an anticoagulant together, or
+serotonergic and CNS-depressant load across several opioids. Drug records
+list their pharmacological classes:
+
+    'tramadol': {..., 'classes': ['opioid', 'serotonergic_opioid']}
+
+and each class adds weight to one or more risk categories. A drug's risk
+vector (its nonzero category weights) is computed once and cached, so a
+regimen's load per category is a sum of cached vectors over its distinct
+drugs: linear in the number of drugs, with no search over combinations. A
+category is reported when at least two drugs contribute and the load
+reaches its threshold, unless every pair of contributors has a direct
+interaction of its own, which the pairwise check already reports.
+
+    python risk_graph.py [KB_SQLITE]      # classes, categories and drug vectors
+"""
+import sys
+
+from findings import Finding
+
+# Cumulative risk categories, in report order
+RISK_CATEGORIES = (
+    {'category': 'bleeding', 'label': 'bleeding risk', 'threshold': 3.0,
+     'severity': 'high', 'score_delta': -0.1},
+    {'category': 'serotonergic', 'label': 'serotonergic load (serotonin syndrome risk)', 'threshold': 2.0,
+     'severity': 'high', 'score_delta': -0.1},
+    {'category': 'cns_depressant', 'label': 'CNS depressant load (sedation, respiratory depression)',
+     'threshold': 2.0, 'severity': 'high', 'score_delta': -0.1},
+)
+
+# Drug class -> {risk category: weight}
+DRUG_CLASSES = {
+    'nsaid': {'bleeding': 1.0},
+    'antiplatelet': {'bleeding': 1.5},
+    'anticoagulant': {'bleeding': 2.0},
+    'ssri': {'serotonergic': 1.0, 'bleeding': 0.5},
+    'snri': {'serotonergic': 1.0, 'bleeding': 0.5},
+    'triptan': {'serotonergic': 1.0},
+    'maoi': {'serotonergic': 2.0},
+    'opioid': {'cns_depressant': 1.0},
+    'serotonergic_opioid': {'serotonergic': 1.0},
+    'benzodiazepine': {'cns_depressant': 1.0},
+    'gabapentinoid': {'cns_depressant': 1.0},
+    'sedating_antihistamine': {'cns_depressant': 0.5},
+}
+
+# Drugs that must contribute before a load counts as cumulative
+MIN_CONTRIBUTORS = 2
+
+_NO_RISK = ()
+
+
+class RiskGraph:
+    """Drug -> class -> risk category weights, with per-drug vectors cached
+
+    With eager=False (lazily decoded knowledge bases) a drug's vector is
+    computed the first time a prescription references it.
+    """
+
+    def __init__(self, drug_database, make_finding=Finding, eager=True, categories=RISK_CATEGORIES,
+                 drug_classes=DRUG_CLASSES):
+        self.drug_database = drug_database
+        self._make_finding = make_finding
+        self.categories = tuple(categories)
+        self.index = {category['category']: index for index, category in enumerate(self.categories)}
+        self.drug_classes = {}
+        for drug_class, weights in drug_classes.items():
+            unknown = set(weights) - set(self.index)
+            if unknown:
+                raise ValueError(f"Unknown risk category {sorted(unknown)} in drug class {drug_class!r}")
+            self.drug_classes[drug_class] = weights
+        self._vectors = {}
+        if eager:
+            for name in drug_database:
+                self.vector(name)
+
+    def vector(self, name):
+        """((category index, weight), ...) for a lowercased drug name; empty for drugs with no risk classes"""
+        vector = self._vectors.get(name)
+        if vector is None:
+            record = self.drug_database.get(name)
+            if record is None:
+                return _NO_RISK
+            weights = [0.0] * len(self.categories)
+            for drug_class in record.get('classes', ()):
+                if drug_class not in self.drug_classes:
+                    raise ValueError(f"Unknown drug class {drug_class!r} for {name!r}")
+                for category, weight in self.drug_classes[drug_class].items():
+                    weights[self.index[category]] += weight
+            for category, weight in record.get('risk', {}).items():
+                weights[self.index[category]] += weight
+            vector = self._vectors[name] = tuple((index, weight) for index, weight in enumerate(weights) if weight)
+        return vector
+
+    def load(self, names):
+        """(per-category totals, per-category contributing names) over the distinct lowercased names"""
+        totals = [0.0] * len(self.categories)
+        contributors = [[] for _ in self.categories]
+        seen = set()
+        for name in names:
+            if name in seen:
+                continue
+            seen.add(name)
+            for index, weight in self.vector(name):
+                totals[index] += weight
+                contributors[index].append(name)
+        return totals, contributors
+
+    def regimen_findings(self, names, interaction_index=None):
+        """'risk_burden' findings for every category whose cumulative load is reached
+
+        With an interaction_index, a load whose contributors all interact
+        pairwise is left to those interactions' own findings.
+        """
+        totals, contributors = self.load(names)
+        found = []
+        for index, category in enumerate(self.categories):
+            if len(contributors[index]) < MIN_CONTRIBUTORS or totals[index] < category['threshold']:
+                continue
+            if interaction_index is not None and all_interact(contributors[index], interaction_index):
+                continue
+            found.append(self._make_finding(
+                'risk_burden', tuple(contributors[index]), category['label'],
+                category['severity'], category['score_delta']
+            ))
+        return found
+
+
+def all_interact(names, interaction_index):
+    """Whether every pair of the names has a direct interaction"""
+    return all(
+        interaction_index.lookup(drug1, names[j]) is not None
+        for i, drug1 in enumerate(names)
+        for j in range(i + 1, len(names))
+    )
+
+
+def main(argv):
+    if len(argv) > 1:
+        print("usage: python risk_graph.py [KB_SQLITE]", file=sys.stderr)
+        return 2
+    from medical_analyzer import MedicalAnalyzer
+    if argv:
+        from knowledge_base import SqliteKnowledgeBase
+        analyzer = MedicalAnalyzer(SqliteKnowledgeBase(argv[0]))
+    else:
+        analyzer = MedicalAnalyzer()
+    graph = analyzer.risk_graph
+    print(f"{len(graph.drug_classes)} drug classes over {len(graph.categories)} risk categories")
+    for name in analyzer.drug_database:
+        vector = graph.vector(name)
+        if vector:
+            weights = ', '.join(f"{graph.categories[index]['category']} {weight:g}" for index, weight in vector)
+            print(f"  {name}: {weights}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,357 @@
+"""Knowledge base tables in one read-only memory-mapped segment shared by worker processes
+
+    kb = SharedKnowledgeBase.create(MedicalAnalyzer())     # parent: tables written once
+    analyzer = MedicalAnalyzer(kb)                          # workers: same interface as SqliteKnowledgeBase
+
+verify_cli and the HTTP service set their pool workers up through
+analyzer_for_worker() and SharedKnowledgeBase.from_knowledge_base().
+
+Drug records, interaction pairs and the keyword table are serialized into
+one file on /dev/shm (tmpfs, so its pages live in RAM) and mapped
+read-only. Forked workers inherit the mapping and spawned ones map the file
+again by path (pickling sends only the path), so every process reads the
+same physical pages. Lookups probe open-addressing hash tables inside the
+segment: one probe per drug on a prescription for its interaction
+neighbors, then one per pair that actually interacts. Records are decoded
+on first use into bounded per-process caches, so a worker's memory stays
+flat however large the knowledge base grows.
+
+Segment layout (little-endian):
+
+    header     magic, drugs / pairs / neighbors / keywords offsets
+    pair key   sorted lowercased names joined by NUL
+    neighbors  lowercased name -> JSON list of the names it interacts with
+    table      slot count, entry count, slot -> entry offset (0 = empty), entries in key order
+    entry      key length, value length, key (UTF-8), value (JSON)
+    keywords   length, JSON {standard name: [keywords]}
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+from zlib import crc32
+
+from instrumentation import STAGE_TIMINGS
+from knowledge_base import SqliteKnowledgeBase
+from medical_analyzer import MedicalAnalyzer
+
+MAGIC = b'RXK2'
+
+# Decoded records kept per process before the cache is reset
+MAX_DECODED = 10000
+
+# Where create() writes segments: tmpfs when the system has one
+SEGMENT_DIRECTORY = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+_HEADER = struct.Struct('<4sIIII')
+_TABLE = struct.Struct('<II')
+_SLOT = struct.Struct('<I')
+_ENTRY = struct.Struct('<II')
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def pair_key(drug1, drug2):
+    """Pairs table key of two lowercased drug names, either order"""
+    return f'{drug1}\0{drug2}' if drug1 <= drug2 else f'{drug2}\0{drug1}'
+
+
+def _table(entries, base):
+    """Bytes of one hash table over (key, value) byte pairs, placed at offset `base` of the segment"""
+    slots = 1 << max(1, (2 * len(entries)).bit_length())        # at most half full
+    index = [0] * slots
+    body = bytearray()
+    start = base + _TABLE.size + slots * _SLOT.size
+    for key, value in entries:
+        slot = crc32(key) & (slots - 1)
+        while index[slot]:
+            slot = (slot + 1) & (slots - 1)
+        index[slot] = start + len(body)
+        body += _ENTRY.pack(len(key), len(value))
+        body += key
+        body += value
+    if start + len(body) >= 1 << 32:
+        raise ValueError("Knowledge base does not fit in one segment (4 GiB)")
+    return _TABLE.pack(slots, len(entries)) + struct.pack(f'<{slots}I', *index) + body
+
+
+def write_segment(path, drug_database, interaction_pairs, drug_keywords):
+    """Write drug records, (drug1, drug2, interaction) pairs and keywords as a segment file at `path`"""
+    pairs = {pair_key(drug1.lower(), drug2.lower()): interaction for drug1, drug2, interaction in interaction_pairs}
+    neighbors = {}
+    for key in pairs:
+        drug1, drug2 = key.split('\0')
+        neighbors.setdefault(drug1, set()).add(drug2)
+        neighbors.setdefault(drug2, set()).add(drug1)
+
+    # Entries in key order, so iterating a table matches SqliteKnowledgeBase
+    drugs = [(name.encode('utf-8'), _encode(drug_database[name])) for name in sorted(drug_database)]
+    pair_entries = [(key.encode('utf-8'), _encode(pairs[key])) for key in sorted(pairs)]
+    neighbor_entries = [(name.encode('utf-8'), _encode(sorted(neighbors[name]))) for name in sorted(neighbors)]
+    keywords = _encode(drug_keywords)
+
+    drugs_offset = _HEADER.size
+    drugs_table = _table(drugs, drugs_offset)
+    pairs_offset = drugs_offset + len(drugs_table)
+    pairs_table = _table(pair_entries, pairs_offset)
+    neighbors_offset = pairs_offset + len(pairs_table)
+    neighbors_table = _table(neighbor_entries, neighbors_offset)
+    keywords_offset = neighbors_offset + len(neighbors_table)
+    if keywords_offset + _SLOT.size + len(keywords) >= 1 << 32:
+        raise ValueError("Knowledge base does not fit in one segment (4 GiB)")
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, drugs_offset, pairs_offset, neighbors_offset, keywords_offset))
+        f.write(drugs_table)
+        f.write(pairs_table)
+        f.write(neighbors_table)
+        f.write(_SLOT.pack(len(keywords)))
+        f.write(keywords)
+
+
+class _Table:
+    """One hash table of a mapped segment: UTF-8 keys to raw JSON values"""
+    __slots__ = ('_buffer', '_slots', '_mask', '_entries', 'count')
+
+    def __init__(self, buffer, offset):
+        slots, self.count = _TABLE.unpack_from(buffer, offset)
+        self._buffer = buffer
+        self._slots = offset + _TABLE.size
+        self._mask = slots - 1
+        self._entries = self._slots + slots * _SLOT.size
+
+    def find(self, key):
+        """JSON bytes stored under a key, or None"""
+        buffer = self._buffer
+        key = key.encode('utf-8')
+        slot = crc32(key) & self._mask
+        while True:
+            offset = _SLOT.unpack_from(buffer, self._slots + slot * _SLOT.size)[0]
+            if not offset:
+                return None
+            key_length, value_length = _ENTRY.unpack_from(buffer, offset)
+            start = offset + _ENTRY.size
+            if buffer[start:start + key_length] == key:
+                return buffer[start + key_length:start + key_length + value_length]
+            slot = (slot + 1) & self._mask
+
+    def keys(self):
+        """Every key, in key order, without copying the values"""
+        buffer = self._buffer
+        offset = self._entries
+        for _ in range(self.count):
+            key_length, value_length = _ENTRY.unpack_from(buffer, offset)
+            start = offset + _ENTRY.size
+            offset = start + key_length + value_length
+            yield buffer[start:start + key_length].decode('utf-8')
+
+    def __iter__(self):
+        """(key, JSON bytes) for every entry, in key order"""
+        buffer = self._buffer
+        offset = self._entries
+        for _ in range(self.count):
+            key_length, value_length = _ENTRY.unpack_from(buffer, offset)
+            start = offset + _ENTRY.size
+            offset = start + key_length + value_length
+            yield buffer[start:start + key_length].decode('utf-8'), buffer[start + key_length:offset]
+
+
+class SharedDrugTable:
+    """Read-only mapping of drug name -> record, decoded from the segment on first access"""
+
+    def __init__(self, table):
+        self._table = table
+        self._decoded = {}
+
+    def get(self, name, default=None):
+        record = self._decoded.get(name)
+        if record is None:
+            value = self._table.find(name)
+            if value is None:
+                return default
+            if len(self._decoded) >= MAX_DECODED:
+                self._decoded.clear()
+            record = self._decoded[name] = json.loads(value)
+        return record
+
+    def __getitem__(self, name):
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __contains__(self, name):
+        return name in self._decoded or self._table.find(name) is not None
+
+    def __iter__(self):
+        return self._table.keys()
+
+    def __len__(self):
+        return self._table.count
+
+
+class SharedInteractionIndex:
+    """Interaction lookups over the segment's pairs table
+
+    Same interface as InteractionIndex. Each drug on a prescription probes
+    its neighbor list once; only pairs that interact are probed and decoded.
+    """
+
+    def __init__(self, table, neighbor_table):
+        self._table = table
+        self._neighbor_table = neighbor_table
+        self._decoded = {}
+        self._neighbors = {}
+
+    def _interaction(self, key):
+        interaction = self._decoded.get(key)
+        if interaction is None:
+            value = self._table.find(key)
+            if value is None:
+                return None
+            if len(self._decoded) >= MAX_DECODED:
+                self._decoded.clear()
+            interaction = self._decoded[key] = json.loads(value)
+        return interaction
+
+    def neighbors(self, name):
+        """Lowercased names a lowercased drug interacts with (a frozenset, empty for none)"""
+        neighbors = self._neighbors.get(name)
+        if neighbors is None:
+            value = self._neighbor_table.find(name)
+            neighbors = frozenset(json.loads(value)) if value is not None else frozenset()
+            if len(self._neighbors) >= MAX_DECODED:
+                self._neighbors.clear()
+            self._neighbors[name] = neighbors
+        return neighbors
+
+    def pairs(self):
+        """Every interaction once, as (drug1, drug2, interaction)"""
+        for key, value in self._table:
+            drug1, drug2 = key.split('\0')
+            yield drug1, drug2, json.loads(value)
+
+    def drug_names(self):
+        """Every drug name in at least one interaction, without decoding the interactions"""
+        return list(self._neighbor_table.keys())
+
+    def lookup(self, drug1, drug2):
+        """Interaction between two drugs, or None"""
+        return self._interaction(pair_key(drug1.lower(), drug2.lower()))
+
+    def find_interactions(self, drug_names):
+        """All interacting pairs on a prescription as (i, j, interaction), i < j
+
+        Each drug visits its own neighbors, or the rest of the prescription
+        when that is the shorter list, as InteractionIndex does.
+        """
+        if len(drug_names) < 2:
+            return []
+        positions = {}
+        for position, name in enumerate(drug_names):
+            positions.setdefault(name, []).append(position)
+
+        found = []
+        for i, drug1 in enumerate(drug_names):
+            neighbors = self.neighbors(drug1)
+            if not neighbors:
+                continue
+            if len(neighbors) < len(drug_names) - i:
+                for drug2 in neighbors:
+                    for j in positions.get(drug2, ()):
+                        if j > i:
+                            found.append((i, j, self._interaction(pair_key(drug1, drug2))))
+            else:
+                for j in range(i + 1, len(drug_names)):
+                    if drug_names[j] in neighbors:
+                        found.append((i, j, self._interaction(pair_key(drug1, drug_names[j]))))
+        found.sort(key=lambda pair: (pair[0], pair[1]))
+        return found
+
+    def __len__(self):
+        return self._table.count
+
+
+class SharedKnowledgeBase:
+    """Drug, interaction and keyword tables in a read-only memory-mapped segment file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._owner = False
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, drugs, pairs, neighbors, self._keywords = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a knowledge base segment")
+        self.drug_database = SharedDrugTable(_Table(self._buffer, drugs))
+        self.interaction_index = SharedInteractionIndex(_Table(self._buffer, pairs), _Table(self._buffer, neighbors))
+
+    @classmethod
+    def create(cls, analyzer, directory=SEGMENT_DIRECTORY):
+        """Write an analyzer's tables to a new segment and map it; close() removes the file"""
+        if analyzer.drug_keywords is not None:
+            drug_keywords = analyzer.drug_keywords
+        else:
+            drug_keywords = analyzer.knowledge_base.load_drug_keywords()
+        descriptor, path = tempfile.mkstemp(prefix='prescription-kb-', suffix='.seg', dir=directory)
+        os.close(descriptor)
+        try:
+            write_segment(path, analyzer.drug_database, analyzer.interaction_index.pairs(), drug_keywords)
+            knowledge_base = cls(path)
+        except BaseException:
+            os.remove(path)
+            raise
+        knowledge_base._owner = True
+        return knowledge_base
+
+    @classmethod
+    def from_knowledge_base(cls, kb_path=None, directory=SEGMENT_DIRECTORY):
+        """create() from the SQLite knowledge base at kb_path, or the built-in tables when None"""
+        source = open_knowledge_base(kb_path)
+        try:
+            return cls.create(MedicalAnalyzer(source), directory)
+        finally:
+            if source is not None:
+                source.close()
+
+    def load_drug_keywords(self):
+        """All {standard name: [keywords]}; only needed to compile the text matcher"""
+        length = _SLOT.unpack_from(self._buffer, self._keywords)[0]
+        start = self._keywords + _SLOT.size
+        return json.loads(self._buffer[start:start + length])
+
+    @property
+    def size(self):
+        """Segment size in bytes"""
+        return len(self._buffer)
+
+    def close(self):
+        self._buffer.close()
+        if self._owner:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __reduce__(self):
+        # Worker processes map the same file instead of copying its contents
+        return (SharedKnowledgeBase, (self.path,))
+
+
+def open_knowledge_base(kb_path):
+    """SqliteKnowledgeBase at kb_path, or None (the built-in tables) without one"""
+    return SqliteKnowledgeBase(kb_path) if kb_path else None
+
+
+def analyzer_for_worker(kb_path=None, timing=False, shared_kb=None):
+    """Analyzer for one pool worker: over the mapped segment when given, else over kb_path
+
+    timing turns on STAGE_TIMINGS in the worker process.
+    """
+    if timing:
+        STAGE_TIMINGS.enable()
+    return MedicalAnalyzer(shared_kb if shared_kb is not None else open_knowledge_base(kb_path))
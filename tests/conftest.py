@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knowledge_base import SqliteKnowledgeBase, build_knowledge_base, load_source
+from medical_analyzer import BUILTIN_DRUGS, BUILTIN_INTERACTIONS, MedicalAnalyzer
+
+
+@pytest.fixture(scope='session')
+def data_kb_path(tmp_path_factory):
+    """SQLite knowledge base compiled from data/, as knowledge_base.py builds it"""
+    path = str(tmp_path_factory.mktemp('kb') / 'kb.sqlite')
+    build_knowledge_base(path, *load_source(BUILTIN_DRUGS, BUILTIN_INTERACTIONS))
+    return path
+
+
+@pytest.fixture(params=['built-in', 'sqlite'])
+def any_analyzer(request, data_kb_path):
+    """The built-in analyzer, then one over the compiled knowledge base"""
+    if request.param == 'built-in':
+        yield MedicalAnalyzer()
+        return
+    knowledge_base = SqliteKnowledgeBase(data_kb_path)
+    yield MedicalAnalyzer(knowledge_base)
+    knowledge_base.close()
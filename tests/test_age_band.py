@@ -0,0 +1,54 @@
+"""Dedupe and cache keys: exact drug fields, and ages split at the thresholds the knowledge base defines"""
+import pytest
+
+from knowledge_base import SqliteKnowledgeBase, build_knowledge_base
+from medical_analyzer import DrugInfo, MedicalAnalyzer, analysis_cache_key, batch_key
+
+DRUGS = {
+    'calmex': {
+        'rules': [{'code': 'contraindication', 'detail': 'under 6', 'age': {'lt': 6},
+                   'severity': 'high', 'score_delta': -0.3}],
+    },
+    'dolorin': {'max_daily_dose': '4000mg', 'dose_limits': [{'age': {'le': 40}, 'max_daily_dose': '3000mg'}]},
+}
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    path = str(tmp_path / 'kb.sqlite')
+    build_knowledge_base(path, DRUGS, {}, {name: [name] for name in DRUGS})
+    knowledge_base = SqliteKnowledgeBase(path)
+    yield MedicalAnalyzer(knowledge_base)
+    knowledge_base.close()
+
+
+def test_rule_threshold_splits_keys(analyzer):
+    drugs = [DrugInfo('Calmex', '10mg', 'Once daily')]
+    assert batch_key(analyzer, drugs, 4) != batch_key(analyzer, drugs, 8)
+    assert analysis_cache_key(analyzer, drugs, 4) != analysis_cache_key(analyzer, drugs, 8)
+    assert batch_key(analyzer, drugs, 8) == batch_key(analyzer, drugs, 9)
+
+    batch = [(drugs, 4), (drugs, 8)]
+    results = list(analyzer.analyze_many(batch))
+    assert results == [analyzer.analyze_prescription(drugs, age) for drugs, age in batch]
+    assert results[0].safety_score < results[1].safety_score
+
+
+def test_dose_limit_threshold_splits_keys(analyzer):
+    drugs = [DrugInfo('Dolorin', '1g', 'Four times daily')]
+    assert batch_key(analyzer, drugs, 40) != batch_key(analyzer, drugs, 41)
+
+    batch = [(drugs, 40), (drugs, 41)]
+    results = list(analyzer.analyze_many(batch))
+    assert results == [analyzer.analyze_prescription(drugs, age) for drugs, age in batch]
+    assert results[0].safety_score < results[1].safety_score
+
+
+def test_cache_key_keeps_names_as_written():
+    analyzer = MedicalAnalyzer()
+    padded = [DrugInfo('Warfarin ', '5mg', 'Once daily'), DrugInfo('Aspirin', '75mg', 'Once daily')]
+    exact = [DrugInfo('Warfarin', '5mg', 'Once daily'), DrugInfo('Aspirin', '75mg', 'Once daily')]
+    lower = [DrugInfo('warfarin', '5mg', 'Once daily'), DrugInfo('aspirin', '75mg', 'Once daily')]
+    keys = {analysis_cache_key(analyzer, drugs, 40) for drugs in (padded, exact, lower)}
+    assert len(keys) == 3
+    assert analyzer.analyze_prescription(padded, 40) != analyzer.analyze_prescription(exact, 40)
@@ -0,0 +1,58 @@
+"""AnalysisSession edits give the same result as a full analyze_prescription"""
+import random
+
+import pytest
+
+from analysis_session import AnalysisSession
+from medical_analyzer import DrugInfo
+
+NAMES = ['Paracetamol', 'Ibuprofen', 'Aspirin', 'Codeine', 'Tramadol', 'Co-codamol', 'Warfarin', 'Omeprazole', 'Unlisted']
+DOSAGES = ['500mg', '1g', '75mg', '30mg', '8/500mg', '500mg 2 tablets', '']
+FREQUENCIES = ['Once daily', 'Twice daily', 'Four times daily', 'Every 4 hours', 'As needed']
+AGES = [1, 2, 5, 11.5, 12, 15, 16, 17.5, 18, 40, 65, 65.5, 70, 70.5, 75, 75.5, 90]
+
+
+def random_drug(rng):
+    return DrugInfo(rng.choice(NAMES), rng.choice(DOSAGES), rng.choice(FREQUENCIES))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_edits_match_full_analysis(any_analyzer, seed):
+    analyzer = any_analyzer
+    rng = random.Random(seed)
+    age = rng.choice(AGES)
+    drugs = [random_drug(rng) for _ in range(rng.randint(0, 4))]
+    session = AnalysisSession(analyzer, age, drugs)
+    assert session.result() == analyzer.analyze_prescription(drugs, age)
+
+    for step in range(200):
+        kind = rng.choice(['add', 'remove', 'replace', 'replace', 'age'])
+        if kind == 'age':
+            age = rng.choice(AGES)
+            session.set_age(age)
+        elif kind == 'add' or not drugs:
+            drug = random_drug(rng)
+            session.add(drug)
+            drugs.append(drug)
+        elif kind == 'remove':
+            index = rng.randrange(len(drugs))
+            session.remove(index)
+            drugs.pop(index)
+        else:
+            index = rng.randrange(len(drugs))
+            drug = random_drug(rng)
+            session.replace(index, drug)
+            drugs[index] = drug
+        assert session.drugs == drugs
+        assert session.result() == analyzer.analyze_prescription(drugs, age), (step, kind)
+
+
+def test_sync_matches_full_analysis(any_analyzer):
+    analyzer = any_analyzer
+    rng = random.Random(42)
+    session = AnalysisSession(analyzer, 40)
+    for _ in range(100):
+        drugs = [random_drug(rng) for _ in range(rng.randint(0, 6))]
+        age = rng.choice(AGES)
+        session.sync(drugs, age)
+        assert session.result() == analyzer.analyze_prescription(drugs, age)
@@ -0,0 +1,61 @@
+"""PopulationScorer gives the same safety scores as analyze_prescription"""
+import random
+
+import pytest
+
+from medical_analyzer import DrugInfo
+from population_scoring import PopulationScorer
+
+NAMES = ['Paracetamol', 'Ibuprofen', 'Aspirin', 'Codeine', 'Tramadol', 'Co-codamol', 'Warfarin', 'Omeprazole',
+         'Simvastatin', 'Unlisted']
+DOSAGES = ['500mg', '1g', '0.5 g', '75mg', '30mg', '400 mg', '1000mg', '8/500mg', '500mg 2 tablets',
+           '2 tablets', '10 ml', '75mcg', '']
+FREQUENCIES = ['Once daily', 'Twice daily', 'Three times a day', 'Four times daily', 'Every 4 hours',
+               'Every 6 hrs', 'As needed', '']
+# Both sides of every age threshold in the rules and dose limits
+AGES = [0, 1, 2, 5, 11.5, 12, 15.9, 16, 17.5, 18, 40, 64.5, 65, 65.5, 70, 70.5, 75, 75.5, 76, 90, 130]
+
+
+def assert_same_scores(analyzer, batch):
+    scorer = PopulationScorer(analyzer)
+    scores = scorer.score(*scorer.encode(batch))
+    expected = [analyzer.analyze_prescription(drugs, age).safety_score for drugs, age in batch]
+    assert list(scores) == pytest.approx(expected, rel=0, abs=1e-9)
+
+
+def drug(rng, name=None):
+    return DrugInfo(name or rng.choice(NAMES), rng.choice(DOSAGES), rng.choice(FREQUENCIES))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_regimens(any_analyzer, seed):
+    rng = random.Random(seed)
+    batch = [([drug(rng) for _ in range(rng.randint(0, 6))], rng.choice(AGES)) for _ in range(2000)]
+    assert_same_scores(any_analyzer, batch)
+
+
+def test_doses_at_every_age(any_analyzer):
+    # Each drug alone and doubled up at every dose, so over-limit deltas land in every band
+    batch = [
+        ([DrugInfo(name, dosage, frequency)] * copies, age)
+        for name in NAMES for dosage in DOSAGES for frequency in ('Four times daily', 'Every 4 hours')
+        for copies in (1, 2) for age in AGES
+    ]
+    assert_same_scores(any_analyzer, batch)
+
+
+def test_duplicate_drugs(any_analyzer):
+    rng = random.Random(7)
+    batch = []
+    for _ in range(1000):
+        names = rng.choices(NAMES[:4], k=rng.randint(2, 6))
+        batch.append(([drug(rng, name) for name in names], rng.choice(AGES)))
+    batch.append(([DrugInfo('Aspirin', '75mg', 'Once daily'), DrugInfo('aspirin', '', ''),
+                   DrugInfo('ASPIRIN', '300mg', 'Four times daily'), DrugInfo('Warfarin', '5mg', 'Once daily')], 70))
+    assert_same_scores(any_analyzer, batch)
+
+
+def test_empty_and_unknown(any_analyzer):
+    batch = [([], 40), ([DrugInfo('Unlisted', '10mg', 'Once daily')], 70),
+             ([DrugInfo('Unlisted', '', ''), DrugInfo('Unlisted', '', '')], 2)]
+    assert_same_scores(any_analyzer, batch)
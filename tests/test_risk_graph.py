@@ -0,0 +1,46 @@
+"""Cumulative risk findings are kept unless direct interactions already cover the load"""
+import pytest
+
+from medical_analyzer import DrugInfo, MedicalAnalyzer
+from population_scoring import PopulationScorer
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return MedicalAnalyzer()
+
+
+def burden(analyzer, names, age=40):
+    result = analyzer.analyze_prescription([DrugInfo(name, '', '') for name in names], age)
+    return [finding for finding in result.findings if finding.code == 'risk_burden'], result.safety_score
+
+
+def test_pair_without_interaction_is_flagged(analyzer):
+    # NSAID + anticoagulant: bleeding load 3.0, and no interaction entry for the pair
+    assert analyzer.interaction_index.lookup('ibuprofen', 'warfarin') is None
+    found, score = burden(analyzer, ['Ibuprofen', 'Warfarin'])
+    assert [finding.subject for finding in found] == [('ibuprofen', 'warfarin')]
+    assert score == pytest.approx(0.8)
+
+
+def test_pair_with_interaction_is_left_to_the_interaction(analyzer):
+    assert analyzer.interaction_index.lookup('aspirin', 'warfarin') is not None
+    found, score = burden(analyzer, ['Aspirin', 'Warfarin'])
+    assert found == []
+    assert score == pytest.approx(0.5)
+
+
+def test_load_with_one_uncovered_pair_is_flagged(analyzer):
+    found, _ = burden(analyzer, ['Aspirin', 'Ibuprofen', 'Warfarin'])
+    assert [finding.subject for finding in found] == [('aspirin', 'ibuprofen', 'warfarin')]
+
+
+@pytest.mark.parametrize('names', [
+    ['Ibuprofen', 'Warfarin'], ['Aspirin', 'Warfarin'], ['Codeine', 'Co-codamol'], ['Tramadol', 'Codeine'],
+    ['Aspirin', 'Ibuprofen', 'Warfarin'], ['Warfarin', 'Ibuprofen', 'Warfarin'],
+])
+def test_vectorized_score_agrees(analyzer, names):
+    scorer = PopulationScorer(analyzer)
+    drug_ids, ages, daily_doses = scorer.encode([(names, 40)])
+    _, score = burden(analyzer, names)
+    assert scorer.score(drug_ids, ages, daily_doses)[0] == pytest.approx(score)
@@ -0,0 +1,53 @@
+"""The shared segment answers like the in-memory tables it was built from"""
+import random
+
+import pytest
+
+from interaction_index import InteractionIndex
+from shared_kb import SharedKnowledgeBase
+
+NAMES = [f'drug{i}' for i in range(60)]
+
+
+class _Tables:
+    """The parts of an analyzer SharedKnowledgeBase.create() reads"""
+
+    def __init__(self, interaction_index):
+        self.drug_database = {name: {'classes': []} for name in NAMES}
+        self.interaction_index = interaction_index
+        self.drug_keywords = {name: [name] for name in NAMES}
+
+
+@pytest.fixture(scope='module')
+def index():
+    rng = random.Random(7)
+    index = InteractionIndex()
+    for name in NAMES[1:]:
+        # drug0 is a hub that interacts with everything
+        index.add('drug0', name, {'severity': 'high', 'message': f'drug0 + {name}', 'score_impact': -0.1})
+    for _ in range(150):
+        drug1, drug2 = rng.sample(NAMES[1:], 2)
+        index.add(drug1, drug2, {'severity': 'low', 'message': f'{drug1} + {drug2}', 'score_impact': -0.05})
+    return index
+
+
+@pytest.fixture(scope='module')
+def shared(index, tmp_path_factory):
+    knowledge_base = SharedKnowledgeBase.create(_Tables(index), directory=str(tmp_path_factory.mktemp('segment')))
+    yield knowledge_base.interaction_index
+    knowledge_base.close()
+
+
+def test_find_interactions_matches_interaction_index(index, shared):
+    rng = random.Random(11)
+    for _ in range(500):
+        names = [rng.choice(NAMES + ['unknown']) for _ in range(rng.randint(0, 12))]
+        assert shared.find_interactions(names) == index.find_interactions(names), names
+
+
+def test_names_and_lookups(index, shared):
+    assert sorted(shared.drug_names()) == sorted(index.drug_names())
+    for drug1, drug2, interaction in index.pairs():
+        assert shared.lookup(drug2, drug1) == interaction
+        assert drug2 in shared.neighbors(drug1) and drug1 in shared.neighbors(drug2)
+    assert shared.neighbors('unknown') == frozenset()
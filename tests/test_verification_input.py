@@ -0,0 +1,55 @@
+"""Malformed records become 400 responses and error lines, never reports"""
+import json
+from http import HTTPStatus
+
+import pytest
+
+import verification_server
+import verify_cli
+
+BAD_AGES = ['NaN', 'Infinity', '-Infinity', '1e308', '-1', '131']
+
+
+@pytest.fixture(scope='module', autouse=True)
+def workers():
+    verification_server._init_worker(None)
+    verify_cli._init_worker(None)
+
+
+def record(age, medications='[{"name": "Aspirin", "dosage": "75mg", "frequency": "Once daily"}]'):
+    return f'{{"age": {age}, "medications": {medications}}}'
+
+
+@pytest.mark.parametrize('age', BAD_AGES)
+def test_server_rejects_bad_age(age):
+    status, body = verification_server._handle('/verify', record(age).encode(), False)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert 'age' in json.loads(body)['error']
+
+
+def test_server_rejects_non_string_dosage():
+    status, _ = verification_server._handle('/verify', record(40, '[{"name": "Aspirin", "dosage": 500}]').encode(), False)
+    assert status == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize('age', [0, 0.5, 40, 130])
+def test_server_accepts_ages_in_range(age):
+    status, body = verification_server._handle('/verify', record(age).encode(), False)
+    assert status == HTTPStatus.OK
+    assert json.loads(body)['patient_age'] == age
+
+
+def test_cli_turns_bad_ages_into_error_lines():
+    chunk = list(enumerate([record(age) for age in BAD_AGES] + [record(40)], 1))
+    output, count, errors = verify_cli.verify_chunk(chunk, 'jsonl')[:3]
+    lines = [json.loads(line) for line in output.splitlines()]
+    assert (count, errors) == (len(BAD_AGES) + 1, len(BAD_AGES))
+    assert [line['line'] for line in lines[:-1]] == list(range(1, len(BAD_AGES) + 1))
+    assert lines[-1]['patient_age'] == 40
+
+
+def test_cli_rejects_non_finite_csv_age():
+    chunk = [(2, {'age': 'nan', 'drugs': 'Aspirin'}), (3, {'age': 'inf', 'drugs': 'Aspirin'})]
+    output, _, errors = verify_cli.verify_chunk(chunk, 'csv')[:3]
+    assert errors == 2
+    assert 'NaN' not in output and 'Infinity' not in output
@@ -0,0 +1,305 @@
+"""Headless HTTP/JSON verification service (no Streamlit)
+
+    python verification_server.py --port 8080 [--workers 4] [--max-concurrency 64] [--kb kb.sqlite] [--shared-kb]
+
+Endpoints (all take and return JSON):
+    POST /verify        {"age": 70, "medications": [{"name": "Aspirin", "dosage": "75mg", ...}]}
+                        or {"age": 70, "text": "aspirin 75mg once daily ..."}
+                        -> the same report as the app's JSON export
+    POST /verify/batch  {"prescriptions": [<verify body>, ...]} -> {"reports": [...]}
+    POST /extract       {"text": "..."} -> {"medications": [...]}
+    GET  /health        -> {"status": "ok"}
+    GET  /metrics       -> per-stage latency histograms, Prometheus text format (with --timing)
+    GET  /metrics.json  -> the same histograms as JSON
+
+Any POST accepts ?profile=1: the response then carries a "profile" key with
+the cProfile report for that one request.
+
+Connections are kept alive (HTTP/1.1). Request parsing, analysis and JSON
+encoding run in a process pool so the event loop only moves bytes.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs
+
+from instrumentation import STAGE_TIMINGS, profile_call
+from medical_analyzer import build_report, parse_verification_record
+from shared_kb import SharedKnowledgeBase, analyzer_for_worker
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_HEADER_LINES = 100
+KEEP_ALIVE_TIMEOUT = 15.0
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_worker_analyzer = None
+
+
+def _init_worker(kb_path, timing=False, shared_kb=None):
+    global _worker_analyzer
+    _worker_analyzer = analyzer_for_worker(kb_path, timing, shared_kb)
+
+
+def _parse_prescription(payload):
+    """(drugs, age) from a /verify body; raises ValueError on bad input"""
+    drugs, text, age = parse_verification_record(payload)
+    if drugs is None:
+        drugs = _worker_analyzer.extract_drugs_from_text(text)
+    return drugs, age
+
+
+def verify(payload):
+    drugs, age = _parse_prescription(payload)
+    return build_report(drugs, age, _worker_analyzer.analyze_prescription(drugs, age))
+
+
+def verify_batch(payload):
+    if not isinstance(payload, dict) or not isinstance(payload.get('prescriptions'), list):
+        raise ValueError("'prescriptions' must be a list")
+    cases = [_parse_prescription(item) for item in payload['prescriptions']]
+    results = _worker_analyzer.analyze_many(cases)
+    return {'reports': [build_report(drugs, age, result) for (drugs, age), result in zip(cases, results)]}
+
+
+def extract(payload):
+    if not isinstance(payload, dict) or not isinstance(payload.get('text'), str):
+        raise ValueError("'text' must be a string")
+    drugs = _worker_analyzer.extract_drugs_from_text(payload['text'])
+    return {'medications': [
+        {"name": drug.name, "dosage": drug.dosage, "frequency": drug.frequency, "route": drug.route}
+        for drug in drugs
+    ]}
+
+
+ROUTES = {
+    '/verify': verify,
+    '/verify/batch': verify_batch,
+    '/extract': extract
+}
+
+
+def handle_request(path, body, profile=False):
+    """Decode, dispatch and encode one POST; runs inside a pool worker
+
+    Returns (status, body, stage timings recorded in this worker since its
+    last request, or None while timing is disabled).
+    """
+    with STAGE_TIMINGS.stage('request' + path):
+        status, response = _handle(path, body, profile)
+    return status, response, STAGE_TIMINGS.drain() if STAGE_TIMINGS.enabled else None
+
+
+def _handle(path, body, profile):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return HTTPStatus.BAD_REQUEST, _encode({'error': 'request body is not valid JSON'})
+    try:
+        if not profile:
+            return HTTPStatus.OK, _encode(ROUTES[path](payload))
+        result, report = profile_call(ROUTES[path], payload)
+        return HTTPStatus.OK, _encode(dict(result, profile=report))
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, _encode({'error': str(e)})
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class VerificationServer:
+    """asyncio HTTP/1.1 front end over a pool of analyzer processes"""
+
+    def __init__(self, workers=None, max_concurrency=64, kb_path=None, timing=False, shared_kb=False):
+        self.kb_path = kb_path
+        self._shared_kb = None
+        self.max_concurrency = max_concurrency
+        self._limit = None
+        self._stopping = None
+        self._handlers = set()
+        self._writers = set()
+        if workers == 0:
+            # Analyze on the event loop's default thread pool (handy for debugging)
+            _init_worker(kb_path, timing)
+            self._executor = None
+        else:
+            if shared_kb:
+                # Built once here; each spawned worker maps the segment by path
+                self._shared_kb = SharedKnowledgeBase.from_knowledge_base(kb_path)
+            # Spawned, not forked: forked workers would inherit the listening socket
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(kb_path, timing, self._shared_kb)
+            )
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """Serve until SIGINT/SIGTERM, then let open connections finish their request"""
+        loop = asyncio.get_running_loop()
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on this platform; Ctrl-C still interrupts
+
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        await self._stopping.wait()
+        server.close()
+        # Closing idle connections ends their handlers; busy ones finish the current response
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await server.wait_closed()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        if self._shared_kb is not None:
+            self._shared_kb.close()
+
+    async def _handle_connection(self, reader, writer):
+        self._handlers.add(asyncio.current_task())
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    break
+                if isinstance(request, HTTPStatus):
+                    await self._respond(writer, request, _encode({'error': request.phrase}), False)
+                    break
+
+                method, path, query, keep_alive, body = request
+                status, payload, content_type = await self._dispatch(method, path, query, body)
+                await self._respond(writer, status, payload, keep_alive, content_type)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+
+    async def _read_request(self, reader):
+        """(method, path, query, keep_alive, body), an error status, or None at EOF"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            return HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            return HTTPStatus.NOT_IMPLEMENTED
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST
+        if length < 0:
+            return HTTPStatus.BAD_REQUEST
+        if length > MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        body = await reader.readexactly(length) if length else b''
+
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            keep_alive = connection == 'keep-alive'
+        else:
+            keep_alive = connection != 'close'
+        path, _, query = target.partition('?')
+        return method, path, query, keep_alive, body
+
+    async def _dispatch(self, method, path, query, body):
+        """(status, body, content type) for one request"""
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, _encode({'status': 'ok'}), JSON_CONTENT_TYPE
+        if method == 'GET' and path == '/metrics':
+            return HTTPStatus.OK, STAGE_TIMINGS.to_prometheus().encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+        if method == 'GET' and path == '/metrics.json':
+            return HTTPStatus.OK, _encode(STAGE_TIMINGS.to_json()), JSON_CONTENT_TYPE
+        if path not in ROUTES:
+            return HTTPStatus.NOT_FOUND, _encode({'error': f'no route for {path}'}), JSON_CONTENT_TYPE
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, _encode({'error': 'use POST'}), JSON_CONTENT_TYPE
+        profile = parse_qs(query).get('profile') == ['1']
+
+        # Bound in-flight analyses; excess requests wait here rather than piling onto the pool
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            try:
+                status, payload, timings = await loop.run_in_executor(
+                    self._executor, handle_request, path, body, profile
+                )
+            except Exception as e:
+                error = _encode({'error': f'analysis failed: {e}'})
+                return HTTPStatus.INTERNAL_SERVER_ERROR, error, JSON_CONTENT_TYPE
+        if timings:
+            STAGE_TIMINGS.merge(timings)
+        return status, payload, JSON_CONTENT_TYPE
+
+    async def _respond(self, writer, status, body, keep_alive, content_type=JSON_CONTENT_TYPE):
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prescription verification HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='analysis processes (default: all cores; 0 = threads in this process)')
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help='requests analyzed at once; the rest wait')
+    parser.add_argument('--kb', default=os.environ.get('PRESCRIPTION_KB'),
+                        help='compiled knowledge base (default: built-in tables)')
+    parser.add_argument('--shared-kb', action='store_true',
+                        help='build the knowledge base once into a memory-mapped segment all workers share')
+    parser.add_argument('--timing', action='store_true', default=STAGE_TIMINGS.enabled,
+                        help='record per-stage latency histograms for /metrics (or PRESCRIPTION_TIMING=1)')
+    args = parser.parse_args()
+
+    if args.timing:
+        STAGE_TIMINGS.enable()
+    server = VerificationServer(args.workers, args.max_concurrency, args.kb, args.timing, args.shared_kb)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
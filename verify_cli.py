@@ -0,0 +1,283 @@
+"""Bulk prescription verification: JSONL or CSV in, one JSON report per line out
+
+    python verify_cli.py prescriptions.jsonl > reports.jsonl
+    zcat export.csv.gz | python verify_cli.py --format csv --workers 4 --stats - > reports.jsonl
+    python verify_cli.py --workers 0 prescriptions.jsonl -o audit.rxb      # compact binary
+    python verify_cli.py --workers 0 --shared-kb --kb kb.sqlite prescriptions.jsonl > reports.jsonl
+
+JSONL input: one object per line, {"age": 70, "text": "..."} or
+{"age": 70, "medications": [{"name": "Aspirin", "dosage": "75mg", ...}]}.
+
+CSV input: an `age` column plus either `text`, or `drugs` with names separated
+by ';' and optional `dosages`, `frequencies` and `routes` columns in the same
+order.
+
+Each output line is the report schema of the app's JSON export. Lines that
+cannot be verified produce {"line": N, "error": "..."} instead. Output can
+also be gzip-compressed JSONL or the binary format of report_export (chosen
+by --output-format or the output file extension); workers encode it and a
+background thread writes it. Input is read and processed a bounded window at
+a time, so memory does not grow with file size.
+
+With --shared-kb the knowledge base is written once into a memory-mapped
+segment (shared_kb) that every worker maps, instead of each worker loading
+its own copy of the tables.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from instrumentation import STAGE_TIMINGS
+from medical_analyzer import build_report, parse_verification_record
+from report_export import FORMATS, BlockEncoder, ReportClock, ReportExporter, format_for_path, report_line
+from shared_kb import SharedKnowledgeBase, analyzer_for_worker
+
+STAGES = ('parse', 'extract', 'analyze', 'encode')
+
+_worker_analyzer = None
+
+
+def _init_worker(kb_path, timing=False, shared_kb=None):
+    global _worker_analyzer
+    _worker_analyzer = analyzer_for_worker(kb_path, timing, shared_kb)
+
+
+def read_records(stream, input_format):
+    """Yield (line number, raw record) lazily; JSONL lines stay unparsed for the workers"""
+    if input_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_number, line
+
+
+def csv_row_to_record(row):
+    """Turn a CSV row into the same record shape as a JSONL line"""
+    try:
+        age = float(row.get('age') or '')
+    except ValueError:
+        raise ValueError("'age' must be a number")
+    age = int(age) if age.is_integer() else age
+
+    if row.get('text'):
+        return {'age': age, 'text': row['text']}
+
+    names = [name.strip() for name in (row.get('drugs') or '').split(';') if name.strip()]
+    columns = {
+        field: [value.strip() for value in (row.get(column) or '').split(';')]
+        for field, column in (('dosage', 'dosages'), ('frequency', 'frequencies'), ('route', 'routes'))
+    }
+    medications = []
+    for index, name in enumerate(names):
+        medication = {'name': name}
+        for field, values in columns.items():
+            if index < len(values) and values[index]:
+                medication[field] = values[index]
+        medications.append(medication)
+    return {'age': age, 'medications': medications}
+
+
+def verify_chunk(chunk, input_format, output_format='jsonl'):
+    """Verify a list of (line number, raw record)
+
+    Returns the encoded output (JSONL text, or one block of the binary
+    format), record and error counts, stage timings and the worker's drained
+    STAGE_TIMINGS histograms (None while timing is disabled).
+    """
+    analyzer = _worker_analyzer
+    timings = dict.fromkeys(STAGES, 0.0)
+    binary = output_format == 'binary'
+    encoder = BlockEncoder() if binary else None
+    report_clock = ReportClock()
+    lines = []
+    errors = 0
+    clock = time.perf_counter
+    for line_number, raw in chunk:
+        started = clock()
+        try:
+            record = csv_row_to_record(raw) if input_format == 'csv' else json.loads(raw)
+            drugs, text, age = parse_verification_record(record)
+            parsed = clock()
+            timings['parse'] += parsed - started
+
+            if drugs is None:
+                drugs = analyzer.extract_drugs_from_text(text)
+            extracted = clock()
+            timings['extract'] += extracted - parsed
+
+            analysis = analyzer.analyze_prescription(drugs, age)
+            analyzed = clock()
+            timings['analyze'] += analyzed - extracted
+
+            second, timestamp = report_clock.now()
+            if binary:
+                encoder.report(drugs, age, analysis, second)
+            else:
+                lines.append(report_line(build_report(drugs, age, analysis, timestamp)))
+            timings['encode'] += clock() - analyzed
+        except Exception as e:
+            # One bad record must not end the run: it becomes an error line
+            message = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+            if binary:
+                encoder.error(line_number, message)
+            else:
+                lines.append(report_line({'line': line_number, 'error': message}))
+            errors += 1
+
+    if binary:
+        output, count = encoder.finish(), len(encoder)
+    else:
+        lines.append('')
+        output, count = '\n'.join(lines), len(lines) - 1
+    return output, count, errors, timings, STAGE_TIMINGS.drain() if STAGE_TIMINGS.enabled else None
+
+
+def _chunks(records, chunk_size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_pipeline(records, input_format, workers=1, chunk_size=500, preserve_order=True, kb_path=None,
+                 timing=False, output_format='jsonl', shared_kb=False):
+    """Yield verify_chunk() results per chunk of input
+
+    At most two chunks per worker are in flight, which bounds memory. With
+    shared_kb and several workers the tables are built once, in this
+    process, into a segment the workers map.
+    """
+    chunks = _chunks(records, chunk_size)
+    if workers == 1:
+        _init_worker(kb_path, timing)
+        for chunk in chunks:
+            yield verify_chunk(chunk, input_format, output_format)
+        return
+
+    shared = None
+    if shared_kb:
+        shared = SharedKnowledgeBase.from_knowledge_base(kb_path)
+    try:
+        yield from _run_pool(chunks, input_format, workers, preserve_order, output_format,
+                             (kb_path, timing, shared))
+    finally:
+        if shared is not None:
+            shared.close()
+
+
+def _run_pool(chunks, input_format, workers, preserve_order, output_format, initargs):
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        if preserve_order:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(verify_chunk, chunk, input_format, output_format))
+                if len(in_flight) >= max_in_flight:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        else:
+            in_flight = set()
+            for chunk in chunks:
+                in_flight.add(pool.submit(verify_chunk, chunk, input_format, output_format))
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in list(in_flight):
+                yield future.result()
+
+
+def print_stats(stats, elapsed, workers, stream):
+    records = stats['records']
+    print(f"records:    {records} ({stats['errors']} errors)", file=stream)
+    print(f"elapsed:    {elapsed:.2f} s with {workers} worker(s)", file=stream)
+    print(f"throughput: {records / elapsed if elapsed else 0:,.0f} records/s", file=stream)
+    print("stage time (summed over workers):", file=stream)
+    for stage in STAGES + ('write',):
+        seconds = stats[stage]
+        per_record = seconds / records * 1e6 if records else 0
+        print(f"  {stage:8} {seconds:8.3f} s  {per_record:8.1f} us/record", file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify prescriptions in bulk (JSONL/CSV in, JSONL out)")
+    parser.add_argument('input', nargs='?', default='-', help="input file, or '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default='-', help="output file, or '-' for stdout (default)")
+    parser.add_argument('--output-format', choices=FORMATS,
+                        help='report encoding (default: from the output file extension, else jsonl)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help='input format (default: from the file extension, else jsonl)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (0 = all cores)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='records per worker task')
+    parser.add_argument('--order', choices=['preserve', 'completed'], default='preserve',
+                        help='keep input order, or write chunks as they finish')
+    parser.add_argument('--kb', default=os.environ.get('PRESCRIPTION_KB'),
+                        help='compiled knowledge base (default: built-in tables)')
+    parser.add_argument('--shared-kb', action='store_true',
+                        help='build the knowledge base once into a memory-mapped segment all workers share')
+    parser.add_argument('--stats', action='store_true', help='print throughput and stage timings to stderr')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='write per-stage latency histograms as JSON (Prometheus text if PATH ends in .prom)')
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    output_format = args.output_format or ('jsonl' if args.output == '-' else format_for_path(args.output))
+    workers = args.workers or os.cpu_count() or 1
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    if args.output == '-':
+        sys.stdout.flush()
+        exporter = ReportExporter(sys.stdout.buffer, output_format)
+    else:
+        exporter = ReportExporter(args.output, output_format)
+    stats = dict.fromkeys(STAGES + ('write',), 0.0)
+    stats.update(records=0, errors=0)
+    started = time.perf_counter()
+    try:
+        results = run_pipeline(
+            read_records(source, input_format), input_format, workers, args.chunk_size,
+            args.order == 'preserve', args.kb, args.metrics is not None, output_format, args.shared_kb
+        )
+        for output, count, errors, timings, stage_timings in results:
+            # Only waits when the writer thread has a full queue
+            write_started = time.perf_counter()
+            exporter.write_encoded(output, count)
+            stats['write'] += time.perf_counter() - write_started
+            stats['records'] += count
+            stats['errors'] += errors
+            for stage, seconds in timings.items():
+                stats[stage] += seconds
+            if stage_timings:
+                STAGE_TIMINGS.merge(stage_timings)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        write_started = time.perf_counter()
+        exporter.close()
+        stats['write'] += time.perf_counter() - write_started
+
+    if args.stats:
+        print_stats(stats, time.perf_counter() - started, workers, sys.stderr)
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            if args.metrics.endswith('.prom'):
+                f.write(STAGE_TIMINGS.to_prometheus())
+            else:
+                json.dump(STAGE_TIMINGS.to_json(), f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())